@@ -0,0 +1,551 @@
+# backend/asyncapi.py
+"""
+asyncio serving mode for the public API.
+
+The catalog reads (/api/courses, /api/internships, /api/projects and their
+slug lookups) and the three submission endpoints (/api/payments,
+/api/project-enrollments, /api/internship-applications) spend nearly all
+their time waiting on PostgreSQL and SMTP. Here they are coroutines on one
+event loop, so a process holds thousands of slow clients during an
+admission rush instead of one per gunicorn thread:
+
+    pip install starlette uvicorn python-multipart asyncpg aiosmtplib a2wsgi
+    uvicorn asyncapi:app --host 0.0.0.0 --port 7000 --workers 2 --backlog 4096
+
+The routes use the models, serializers and submission helpers of
+connection.py through SQLAlchemy's asyncio extension; DATABASE_URL / the
+DB_* settings are reused with the driver swapped for asyncpg (aiosqlite
+for sqlite URLs). Catalog responses go through the same response cache,
+keys and JSON encoding as the Flask views, so ETags match between the two.
+
+Blocking work stays off the event loop: multipart bodies are parsed as
+they arrive, uploads are stored by uploads.py and srcset manifests are read
+in worker threads, and with MAIL_DELIVERY=inline the notification goes out
+over aiosmtplib. With the default MAIL_DELIVERY=queue the outbox row is
+written in the same transaction as the submission.
+
+Every other path (admin, uploads, /pclinfo, ...) is passed to the Flask
+app, mounted as WSGI on a thread pool, so this replaces wsgi.py as a whole.
+Set ASYNC_MOUNT_FLASK=false to serve only the public routes and send the
+rest to gunicorn at the proxy.
+"""
+import os
+import logging
+from contextlib import asynccontextmanager
+from functools import wraps
+
+from sqlalchemy import func, select, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from werkzeug.datastructures import FileStorage
+from werkzeug.http import http_date
+from werkzeug.sansio.http import is_resource_modified
+
+from cache import CACHE_ENABLED, CachedResponse, MemoryResponseCache, body_etag, response_cache
+from connection import (
+    INTERNSHIP_APPLICATION_REQUIRED, MAIL_DELIVERY, PROJECT_VALIDATION_CODE, SQLALCHEMY_DATABASE_URI,
+    Course, InternshipPosting, ProjectPosting,
+    add_outbox_entry, add_submission, catalog_last_modified, configure_engine, create_app, engine_options,
+    new_internship_application, new_payment, new_project_enrollment,
+)
+from logconfig import REQUEST_ID_HEADER, SAMPLED, new_request_id, reset_request_id, set_request_id
+from mailconnect import build_notify_message, deliver_message_async
+from metrics import SERVER_TIMING, current_timings, end_request, server_timing, start_request
+from serializers import COURSE_PUBLIC, INTERNSHIP_DETAIL, INTERNSHIP_SUMMARY, PROJECT_DETAIL, PROJECT_SUMMARY, dumps
+from uploads import MAX_REQUEST_SIZE, UploadError, claim_direct_upload, ingest_upload
+
+ASYNC_DB_POOL_SIZE = int(os.environ.get("ASYNC_DB_POOL_SIZE", 10))
+ASYNC_DB_MAX_OVERFLOW = int(os.environ.get("ASYNC_DB_MAX_OVERFLOW", 20))
+ASYNC_MOUNT_FLASK = os.environ.get("ASYNC_MOUNT_FLASK", "true").lower() == "true"
+ASYNC_WSGI_THREADS = int(os.environ.get("ASYNC_WSGI_THREADS", 10))
+
+# SQLAlchemy dialect -> asyncio driver
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+logger = logging.getLogger(__name__)
+
+
+def async_database_url(url):
+    """The app's database URL with its driver replaced by the asyncio one"""
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+
+def create_engine():
+    # Same pre-ping / recycle / statement_timeout / PgBouncer settings as the Flask engine
+    url = async_database_url(SQLALCHEMY_DATABASE_URI)
+    engine = create_async_engine(
+        url, **engine_options(url, pool_size=ASYNC_DB_POOL_SIZE, max_overflow=ASYNC_DB_MAX_OVERFLOW))
+    configure_engine(engine.sync_engine, 'async')
+    return engine
+
+
+# --------------- responses -----------------
+def json_response(payload, status=200):
+    # Same encoder as the Flask app's jsonify (serializers.JSONProvider), so
+    # both apps produce the same bodies and ETags for the shared cache
+    body = dumps(payload)
+    return Response(body, status_code=status, media_type='application/json')
+
+
+def error_response(message, status):
+    return json_response({'error': message}, status)
+
+
+async def cache_call(method, *args):
+    # The memory cache answers in microseconds; Redis is a network round trip
+    if isinstance(response_cache, MemoryResponseCache):
+        return method(*args)
+    return await run_in_threadpool(method, *args)
+
+
+def cached_json(namespace):
+    """
+    Async counterpart of cache.cached_response: cache 200 responses under
+    `namespace`, keyed like request.full_path in Flask, and answer
+    conditional requests with 304. Views may set `response.last_modified`.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request):
+            key = f"{request.url.path}?{request.url.query}"
+            cached, generation = (await cache_call(response_cache.get, namespace, key) if CACHE_ENABLED
+                                  else (None, None))
+            cache_status = 'HIT'
+
+            if cached is None:
+                response = await view(request)
+                if response.status_code != 200:
+                    return response
+                cached = CachedResponse(response.body, body_etag(response.body),
+                                        getattr(response, 'last_modified', None))
+                if CACHE_ENABLED:
+                    await cache_call(response_cache.set, namespace, key, cached, generation)
+                cache_status = 'MISS'
+
+            headers = {
+                'ETag': f'"{cached.etag}"',
+                # Let browsers and CDNs store the body but revalidate every time
+                'Cache-Control': 'public, no-cache',
+                'X-Cache': cache_status,
+            }
+            if cached.last_modified:
+                headers['Last-Modified'] = http_date(cached.last_modified)
+            modified = is_resource_modified(
+                http_if_none_match=request.headers.get('if-none-match'),
+                http_if_modified_since=request.headers.get('if-modified-since'),
+                etag=cached.etag,
+                last_modified=cached.last_modified,
+            )
+            if not modified:
+                return Response(status_code=304, headers=headers)
+            return Response(cached.body, media_type='application/json', headers=headers)
+        return wrapper
+    return decorator
+
+
+# --------------- catalog -----------------
+async def catalog_list(request, model, serializer, name):
+    async with request.app.state.sessions() as session:
+        # Deferred columns cannot lazy-load on the event loop; select all the serializer reads
+        items = (await session.scalars(
+            select(model).options(serializer.load_only(model)).filter_by(is_active=True))).all()
+        last_modified = await session.scalar(select(func.max(model.updated_at)))
+    # image_srcset may read manifests from storage (a bucket) on a manifest cache miss
+    payload, response_last_modified = await run_in_threadpool(
+        lambda: ({'success': True, name: serializer.many(items)}, catalog_last_modified(last_modified, items)))
+    response = json_response(payload)
+    response.last_modified = response_last_modified
+    return response
+
+
+async def catalog_detail(request, model, serializer, name):
+    async with request.app.state.sessions() as session:
+        item = await session.scalar(
+            select(model).options(serializer.load_only(model, 'updated_at'))
+            .filter_by(slug=request.path_params['slug'], is_active=True).limit(1))
+    if item is None:
+        return error_response(f"{name.capitalize()} not found", 404)
+    payload, last_modified = await run_in_threadpool(
+        lambda: ({'success': True, name: serializer(item)}, catalog_last_modified(item.updated_at, [item])))
+    response = json_response(payload)
+    response.last_modified = last_modified
+    return response
+
+
+@cached_json("courses")
+async def get_public_courses(request):
+    try:
+        return await catalog_list(request, Course, COURSE_PUBLIC, 'courses')
+    except Exception as e:
+        logger.error("Error fetching public courses: %s", e)
+        return error_response('Failed to fetch courses', 500)
+
+
+@cached_json("courses")
+async def get_course_by_slug(request):
+    try:
+        return await catalog_detail(request, Course, COURSE_PUBLIC, 'course')
+    except Exception as e:
+        logger.error("Error fetching course: %s", e)
+        return error_response('Failed to fetch course', 500)
+
+
+@cached_json("internships")
+async def get_public_internships(request):
+    try:
+        return await catalog_list(request, InternshipPosting, INTERNSHIP_SUMMARY, 'internships')
+    except Exception as e:
+        logger.error("Error fetching public internships: %s", e)
+        return error_response('Failed to fetch internships', 500)
+
+
+@cached_json("internships")
+async def get_internship_by_slug(request):
+    try:
+        return await catalog_detail(request, InternshipPosting, INTERNSHIP_DETAIL, 'internship')
+    except Exception as e:
+        logger.error("Error fetching internship: %s", e)
+        return error_response('Failed to fetch internship', 500)
+
+
+@cached_json("projects")
+async def get_public_projects(request):
+    try:
+        return await catalog_list(request, ProjectPosting, PROJECT_SUMMARY, 'projects')
+    except Exception as e:
+        logger.error("Error fetching public projects: %s", e)
+        return error_response('Failed to fetch projects', 500)
+
+
+@cached_json("projects")
+async def get_project_by_slug(request):
+    try:
+        return await catalog_detail(request, ProjectPosting, PROJECT_DETAIL, 'project')
+    except Exception as e:
+        logger.error("Error fetching project: %s", e)
+        return error_response('Failed to fetch project', 500)
+
+
+# --------------- submissions -----------------
+class RequestTooLarge(Exception):
+    pass
+
+
+def capped_receive(receive, limit):
+    """ASGI receive that raises RequestTooLarge once more than `limit` body bytes arrived"""
+    received = 0
+
+    async def receive_capped():
+        nonlocal received
+        message = await receive()
+        if message['type'] == 'http.request':
+            received += len(message.get('body', b''))
+            if received > limit:
+                raise RequestTooLarge()
+        return message
+    return receive_capped
+
+
+async def read_form(request):
+    """
+    Parsed form body; None if it is over MAX_REQUEST_SIZE. The bytes are
+    counted as they arrive: chunked bodies have no Content-Length and a
+    declared one is only used to refuse early.
+    """
+    if int(request.headers.get('content-length') or 0) > MAX_REQUEST_SIZE:
+        return None
+    try:
+        return await Request(request.scope, capped_receive(request.receive, MAX_REQUEST_SIZE)).form()
+    except RequestTooLarge:
+        return None
+
+
+async def find_posting(request, model, slug):
+    # Short session: the connection goes back to the pool before any upload is stored
+    async with request.app.state.sessions() as session:
+        return await session.scalar(select(model).filter_by(slug=slug).limit(1))
+
+
+async def submitted_upload(form, field, kind):
+    """
+    URL of the file sent as `field`, or of the direct upload claimed with
+    `<field>_token`; None if neither. Raises UploadError.
+    """
+    upload = form.get(field)
+    if upload is not None and not isinstance(upload, str) and upload.filename:
+        file_obj = FileStorage(stream=upload.file, filename=upload.filename, content_type=upload.content_type)
+        return (await run_in_threadpool(ingest_upload, file_obj, kind)).url
+    if form.get(f"{field}_token"):
+        return (await run_in_threadpool(claim_direct_upload, form[f"{field}_token"], kind)).url
+    return None
+
+
+async def save_submission(request, kind, record, email_data, counter=None):
+    """
+    Insert `record` (see connection.add_submission) and, with queued mail,
+    its outbox entry in one transaction; `counter` is an extra statement
+    for the same transaction. Inline mail is sent after the commit.
+    """
+    def write(session):
+        add_submission(kind, record, session)
+        if MAIL_DELIVERY != "inline":
+            add_outbox_entry(email_data, session=session)
+
+    async with request.app.state.sessions() as session:
+        async with session.begin():
+            if counter is not None:
+                await session.execute(counter)
+            await session.run_sync(write)
+    logger.info("Saved %s %s", kind, record.id, extra=SAMPLED)
+
+    if MAIL_DELIVERY == "inline":
+        try:
+            await deliver_message_async(build_notify_message(email_data))
+        except Exception as e:
+            logger.error("Email notification error: %s", e)
+
+
+async def create_payment(request):
+    try:
+        form = await read_form(request)
+        if form is None:
+            return error_response('Upload exceeds the maximum request size', 413)
+
+        course = await find_posting(request, Course, form.get('course_slug'))
+        if not course:
+            return error_response('Course not found', 404)
+
+        try:
+            payment_screenshot_path = await submitted_upload(form, 'payment_screenshot', 'payment_screenshot')
+        except UploadError as e:
+            return error_response(str(e), e.status)
+
+        payment, email_data = new_payment(form, course, payment_screenshot_path)
+        await save_submission(request, 'payment', payment, email_data)
+
+        return json_response({
+            'success': True,
+            'payment_id': payment.payment_id,
+            'course': course.title,
+            'amount': course.total_amount
+        }, 201)
+    except Exception:
+        logger.exception("Error creating payment")
+        return error_response('Failed to process payment request', 500)
+
+
+async def create_project_enrollment(request):
+    try:
+        form = await read_form(request)
+        if form is None:
+            return error_response('Upload exceeds the maximum request size', 413)
+
+        if not form.get('project_slug'):
+            return error_response('Project slug is required', 400)
+        project = await find_posting(request, ProjectPosting, form.get('project_slug'))
+        if not project:
+            return error_response('Project not found', 404)
+
+        if form.get('validation_code', '').lower() != PROJECT_VALIDATION_CODE:
+            return error_response('Invalid validation code', 400)
+
+        try:
+            payment_screenshot_path = await submitted_upload(form, 'payment_screenshot', 'payment_screenshot')
+        except UploadError as e:
+            return error_response(str(e), e.status)
+
+        enrollment, email_data = new_project_enrollment(form, project, payment_screenshot_path)
+        # In SQL, so concurrent enrollments do not overwrite each other's count
+        counter = (update(ProjectPosting).where(ProjectPosting.id == project.id)
+                   .values(total_enrollments=func.coalesce(ProjectPosting.total_enrollments, 0) + 1))
+        await save_submission(request, 'project_enrollment', enrollment, email_data, counter)
+        await cache_call(response_cache.invalidate, "projects")
+
+        return json_response({
+            'success': True,
+            'enrollment_id': enrollment.enrollment_id,
+            'project': project.title,
+            'amount': enrollment.amount,
+            'message': 'Enrollment submitted successfully'
+        }, 201)
+    except Exception:
+        logger.exception("Error creating project enrollment")
+        return error_response('Failed to process enrollment request', 500)
+
+
+async def create_internship_application(request):
+    try:
+        form = await read_form(request)
+        if form is None:
+            return error_response('Upload exceeds the maximum request size', 413)
+
+        if not form.get('internship_slug'):
+            return error_response('Internship slug is required', 400)
+        internship = await find_posting(request, InternshipPosting, form.get('internship_slug'))
+        if not internship:
+            return error_response('Internship not found', 404)
+
+        if form.get('validation_code', '').strip().lower() != PROJECT_VALIDATION_CODE:
+            return error_response('Invalid validation code', 400)
+
+        missing_fields = [field for field in INTERNSHIP_APPLICATION_REQUIRED if not form.get(field)]
+        if missing_fields:
+            return error_response(f'Missing required fields: {", ".join(missing_fields)}', 400)
+
+        try:
+            resume_path = await submitted_upload(form, 'resume', 'resume')
+        except UploadError as e:
+            return error_response(str(e), e.status)
+        if resume_path is None:
+            return error_response('Resume is required', 400)
+
+        application, email_data = new_internship_application(form, internship, resume_path)
+        counter = (update(InternshipPosting).where(InternshipPosting.id == internship.id)
+                   .values(total_applications=func.coalesce(InternshipPosting.total_applications, 0) + 1))
+        await save_submission(request, 'internship_application', application, email_data, counter)
+
+        return json_response({
+            'success': True,
+            'enrollment_id': application.enrollment_id,
+            'internship': internship.title,
+            'message': 'Application submitted successfully'
+        }, 201)
+    except Exception:
+        logger.exception("Error creating internship application")
+        return error_response('Failed to submit application. Please try again.', 500)
+
+
+# --------------- app -----------------
+class MetricsMiddleware:
+    """
+    Request timing (metrics.py) for the routes above; requests passed on
+    to the mounted Flask app are timed by Flask itself.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        token = start_request()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                if SERVER_TIMING and isinstance(scope.get('route'), Route):
+                    message.setdefault('headers', [])
+                    message['headers'] = list(message['headers']) + [
+                        (b'server-timing', server_timing(current_timings()).encode('latin-1'))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            route = scope.get('route')
+            end_request(token, scope['method'], route.path if isinstance(route, Route) else None, status)
+
+
+class RequestIdMiddleware:
+    """
+    Request ids (logconfig.py) for every request. The id is written back
+    into the request headers, so the mounted Flask app logs under the same
+    one.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        header = REQUEST_ID_HEADER.lower().encode('latin-1')
+        incoming = dict(scope['headers']).get(header)
+        request_id = new_request_id(incoming.decode('latin-1') if incoming else None)
+        scope = dict(scope, headers=[(name, value) for name, value in scope['headers'] if name != header]
+                     + [(header, request_id.encode('latin-1'))])
+
+        async def send_with_request_id(message):
+            if message['type'] == 'http.response.start':
+                headers = list(message.get('headers', []))
+                if not any(name.lower() == header for name, value in headers):
+                    headers.append((header, request_id.encode('latin-1')))
+                message['headers'] = headers
+            await send(message)
+
+        token = set_request_id(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            reset_request_id(token)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    engine = create_engine()
+    # expire_on_commit=False: rows stay readable after commit without a
+    # (forbidden) lazy load on the event loop
+    app.state.sessions = async_sessionmaker(engine, expire_on_commit=False)
+    try:
+        yield
+    finally:
+        await engine.dispose()
+
+
+def flask_fallback():
+    """The Flask app as an ASGI app, run on ASYNC_WSGI_THREADS threads"""
+    try:
+        from a2wsgi import WSGIMiddleware
+        return WSGIMiddleware(flask_app, workers=ASYNC_WSGI_THREADS)
+    except ImportError:
+        from starlette.middleware.wsgi import WSGIMiddleware
+        return WSGIMiddleware(flask_app)
+
+
+# Also migrates the schema on startup, like wsgi.py
+flask_app = create_app(initialize=os.environ.get("APP_INITIALIZE", "true").lower() == "true")
+
+routes = [
+    Route("/api/courses", get_public_courses, methods=["GET"]),
+    Route("/api/courses/{slug}", get_course_by_slug, methods=["GET"]),
+    Route("/api/internships", get_public_internships, methods=["GET"]),
+    Route("/api/internships/{slug}", get_internship_by_slug, methods=["GET"]),
+    Route("/api/projects", get_public_projects, methods=["GET"]),
+    Route("/api/projects/{slug}", get_project_by_slug, methods=["GET"]),
+    Route("/api/payments", create_payment, methods=["POST"]),
+    Route("/api/project-enrollments", create_project_enrollment, methods=["POST"]),
+    Route("/api/internship-applications", create_internship_application, methods=["POST"]),
+]
+if ASYNC_MOUNT_FLASK:
+    routes.append(Mount("/", app=flask_fallback()))
+
+app = Starlette(
+    routes=routes,
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"]),
+        Middleware(RequestIdMiddleware),
+        Middleware(MetricsMiddleware),
+    ],
+    lifespan=lifespan,
+)
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run("asyncapi:app", host="0.0.0.0", port=7000, backlog=4096)
@@ -0,0 +1,212 @@
+# backend/cache.py
+"""
+Response cache for the public catalog endpoints.
+
+Serialized JSON bodies are kept per namespace ('courses', 'internships',
+'projects') with a TTL and LRU eviction. Admin write routes call
+invalidate(namespace) after committing, so readers never see stale data
+for longer than it takes the write to finish.
+
+Each namespace has a generation that invalidate() advances. get() returns
+it with the entry and set() takes it back: a body rendered before an
+invalidation is never stored as current, even when the view lost a race
+with the write.
+
+Every cached entry also carries a strong ETag (hash of the body) and the
+Last-Modified time the view reported, so clients and CDNs revalidate with
+If-None-Match / If-Modified-Since and get a 304 instead of the full body.
+
+By default the cache lives in process memory. Set CACHE_REDIS_URL (and
+install `redis`) to share it between workers/hosts. An in-memory cache
+is only invalidated in the process that handled the write, which is why
+gunicorn.conf.py shortens CACHE_TTL when several workers run without Redis.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+from functools import wraps
+
+from flask import Response, make_response, request
+
+CACHE_ENABLED = os.environ.get("CACHE_ENABLED", "true").lower() == "true"
+CACHE_TTL = int(os.environ.get("CACHE_TTL", 300))  # seconds
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 512))
+CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL")
+
+CachedResponse = namedtuple('CachedResponse', ['body', 'etag', 'last_modified'])
+
+
+class MemoryResponseCache:
+    """Thread-safe TTL + LRU cache (holds CachedResponse entries for views)"""
+
+    def __init__(self, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0, 'invalidations': 0}
+
+    def get(self, namespace, key):
+        """(entry or None, namespace generation to pass to set)"""
+        with self._lock:
+            generation = self._generations.get(namespace, 0)
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                self._stats['misses'] += 1
+                return None, generation
+            expires_at, cached = entry
+            if expires_at < time.monotonic():
+                del self._entries[(namespace, key)]
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return None, generation
+            self._entries.move_to_end((namespace, key))
+            self._stats['hits'] += 1
+            return cached, generation
+
+    def set(self, namespace, key, cached, generation):
+        with self._lock:
+            if self._generations.get(namespace, 0) != generation:
+                # Invalidated since the lookup: `cached` may predate the write
+                return
+            self._entries[(namespace, key)] = (time.monotonic() + self.ttl, cached)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, namespace):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            for cache_key in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[cache_key]
+            self._stats['invalidations'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['backend'] = 'memory'
+        return stats
+
+
+class RedisResponseCache:
+    """
+    Shared variant backed by Redis. Each namespace has a version counter
+    (its generation) that is part of every key, so invalidation is a single
+    INCR and old entries simply age out. LRU eviction is left to Redis'
+    maxmemory policy.
+    """
+
+    def __init__(self, url, ttl=CACHE_TTL, prefix="tp:cache"):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _key(self, namespace, generation, key):
+        return f"{self.prefix}:{namespace}:{generation}:{key}"
+
+    def get(self, namespace, key):
+        """(entry or None, namespace generation to pass to set)"""
+        generation = int(self.client.get(f"{self.prefix}:{namespace}:version") or 0)
+        raw = self.client.get(self._key(namespace, generation, key))
+        self._count('hits' if raw is not None else 'misses')
+        if raw is None:
+            return None, generation
+        meta, body = raw.split(b"\n", 1)
+        meta = json.loads(meta)
+        last_modified = meta['last_modified']
+        return CachedResponse(
+            body,
+            meta['etag'],
+            datetime.fromisoformat(last_modified) if last_modified else None,
+        ), generation
+
+    def set(self, namespace, key, cached, generation):
+        meta = json.dumps({
+            'etag': cached.etag,
+            'last_modified': cached.last_modified.isoformat() if cached.last_modified else None,
+        }).encode()
+        # Under the generation of the lookup: after an invalidation nobody
+        # reads that key again and it simply ages out
+        self.client.set(self._key(namespace, generation, key), meta + b"\n" + cached.body, ex=self.ttl)
+
+    def invalidate(self, namespace):
+        self.client.incr(f"{self.prefix}:{namespace}:version")
+        self._count('invalidations')
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['backend'] = 'redis'
+        return stats
+
+
+def create_response_cache():
+    if CACHE_REDIS_URL:
+        return RedisResponseCache(CACHE_REDIS_URL)
+    return MemoryResponseCache()
+
+
+response_cache = create_response_cache()
+
+
+def body_etag(body):
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def cached_response(namespace):
+    """
+    Cache successful responses of a GET view under `namespace`, keyed by
+    path and query string, and answer conditional requests with 304.
+    Views may set `response.last_modified` to feed Last-Modified.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.full_path
+            cached, generation = response_cache.get(namespace, key) if CACHE_ENABLED else (None, None)
+            cache_status = 'HIT'
+
+            if cached is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                cached = CachedResponse(body, body_etag(body), response.last_modified)
+                if CACHE_ENABLED:
+                    response_cache.set(namespace, key, cached, generation)
+                cache_status = 'MISS'
+
+            response = Response(cached.body, mimetype='application/json')
+            response.set_etag(cached.etag)
+            if cached.last_modified:
+                response.last_modified = cached.last_modified
+            # Let browsers and CDNs store the body but revalidate every time
+            response.cache_control.public = True
+            response.cache_control.no_cache = True
+            response.headers['X-Cache'] = cache_status
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+
+def invalidate_cache(*namespaces):
+    for namespace in namespaces:
+        response_cache.invalidate(namespace)
@@ -1,14 +1,14 @@
 # backend/connection.py (Extended)
 import os
-import logging
-from datetime import datetime
+import time
+from collections import Counter
+from datetime import datetime, timedelta
 from sqlalchemy import JSON
-from werkzeug.utils import secure_filename
+from sqlalchemy.engine import make_url
 import uuid
 import json
 
-from PIL import Image
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Blueprint, Flask, Request, current_app, jsonify, request, send_from_directory
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
@@ -16,189 +16,29 @@ from werkzeug.security import generate_password_hash, check_password_hash
 
 # Keep your existing mail helpers
 from mailconnect import send_email_notification, send_email_notify
-
-# Add this constant with your other configurations
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
-MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5MB
-
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-def save_course_image(file_obj):
-    """Save uploaded course image and return the URL path"""
-    if not file_obj or file_obj.filename == "":
-        return None
-    
-    if not allowed_file(file_obj.filename):
-        raise ValueError("Invalid file type")
-    
-    # Generate unique filename
-    filename = secure_filename(file_obj.filename)
-    ext = filename.rsplit('.', 1)[1].lower()
-    unique_filename = f"{uuid.uuid4().hex}.{ext}"
-    
-    # Create courses subdirectory if it doesn't exist
-    courses_dir = os.path.join(UPLOAD_FOLDER, 'courses')
-    os.makedirs(courses_dir, exist_ok=True)
-    
-    filepath = os.path.join(courses_dir, unique_filename)
-    
-    # Save and optimize image
-    file_obj.save(filepath)
-    
-    # Optional: Resize/optimize the image
-    try:
-        with Image.open(filepath) as img:
-            # Convert to RGB if necessary
-            if img.mode in ('RGBA', 'LA', 'P'):
-                img = img.convert('RGB')
-            
-            # Resize if too large (max 1200px width)
-            max_width = 1200
-            if img.width > max_width:
-                ratio = max_width / img.width
-                new_size = (max_width, int(img.height * ratio))
-                img = img.resize(new_size, Image.Resampling.LANCZOS)
-            
-            # Save optimized
-            img.save(filepath, quality=85, optimize=True)
-    except Exception as e:
-        app.logger.warning(f"Image optimization failed: {e}")
-    
-    # Return URL path (relative to uploads folder)
-    return f"/uploads/courses/{unique_filename}"
-
-# --------------- INTERNSHIP MANAGEMENT ENDPOINTS -----------------
-
-def save_internship_image(file_obj):
-    """Save uploaded internship image and return the URL path"""
-    if not file_obj or file_obj.filename == "":
-        return None
-    
-    if not allowed_file(file_obj.filename):
-        raise ValueError("Invalid file type")
-    
-    filename = secure_filename(file_obj.filename)
-    ext = filename.rsplit('.', 1)[1].lower()
-    unique_filename = f"{uuid.uuid4().hex}.{ext}"
-    
-    internships_dir = os.path.join(UPLOAD_FOLDER, 'internships')
-    os.makedirs(internships_dir, exist_ok=True)
-    
-    filepath = os.path.join(internships_dir, unique_filename)
-    file_obj.save(filepath)
-    
-    # Optional: Optimize image
-    try:
-        with Image.open(filepath) as img:
-            if img.mode in ('RGBA', 'LA', 'P'):
-                img = img.convert('RGB')
-            
-            max_width = 1200
-            if img.width > max_width:
-                ratio = max_width / img.width
-                new_size = (max_width, int(img.height * ratio))
-                img = img.resize(new_size, Image.Resampling.LANCZOS)
-            
-            img.save(filepath, quality=85, optimize=True)
-    except Exception as e:
-        app.logger.warning(f"Image optimization failed: {e}")
-    
-    return f"/uploads/internships/{unique_filename}"
-
-def save_uploaded_file(file_obj, dest_folder=None):
-    """Save uploaded file with proper directory creation"""
-    if dest_folder is None:
-        dest_folder = UPLOAD_FOLDER
-    
-    if not file_obj or file_obj.filename == "":
-        return None
-    
-    # Create directory if it doesn't exist
-    os.makedirs(dest_folder, exist_ok=True)
-    
-    filename = secure_filename(file_obj.filename)
-    ts = datetime.utcnow().strftime("%Y%m%d%H%M%S")
-    safe_name = f"{ts}_{filename}"
-    path = os.path.join(dest_folder, safe_name)
-    
-    file_obj.save(path)
-    return path
-
-#  after the save_project_image function
-def save_payment_screenshot(file_obj):
-    """Save uploaded payment screenshot and return the URL path"""
-    if not file_obj or file_obj.filename == "":
-        return None
-    
-    if not allowed_file(file_obj.filename):
-        raise ValueError("Invalid file type")
-    
-    filename = secure_filename(file_obj.filename)
-    ext = filename.rsplit('.', 1)[1].lower()
-    unique_filename = f"{uuid.uuid4().hex}.{ext}"
-    
-    payment_screenshots_dir = os.path.join(UPLOAD_FOLDER, 'payment_screenshots')
-    os.makedirs(payment_screenshots_dir, exist_ok=True)
-    
-    filepath = os.path.join(payment_screenshots_dir, unique_filename)
-    file_obj.save(filepath)
-    
-    # Optional: Optimize image
-    try:
-        with Image.open(filepath) as img:
-            if img.mode in ('RGBA', 'LA', 'P'):
-                img = img.convert('RGB')
-            
-            max_width = 1200
-            if img.width > max_width:
-                ratio = max_width / img.width
-                new_size = (max_width, int(img.height * ratio))
-                img = img.resize(new_size, Image.Resampling.LANCZOS)
-            
-            img.save(filepath, quality=85, optimize=True)
-    except Exception as e:
-        app.logger.warning(f"Image optimization failed: {e}")
-    
-    return f"/uploads/payment_screenshots/{unique_filename}"
-
-# --------------- PROJECT MANAGEMENT ENDPOINTS -----------------
-
-def save_project_image(file_obj):
-    """Save uploaded project image and return the URL path"""
-    if not file_obj or file_obj.filename == "":
-        return None
-    
-    if not allowed_file(file_obj.filename):
-        raise ValueError("Invalid file type")
-    
-    filename = secure_filename(file_obj.filename)
-    ext = filename.rsplit('.', 1)[1].lower()
-    unique_filename = f"{uuid.uuid4().hex}.{ext}"
-    
-    projects_dir = os.path.join(UPLOAD_FOLDER, 'projects')
-    os.makedirs(projects_dir, exist_ok=True)
-    
-    filepath = os.path.join(projects_dir, unique_filename)
-    file_obj.save(filepath)
-    
-    # Optional: Optimize image
-    try:
-        with Image.open(filepath) as img:
-            if img.mode in ('RGBA', 'LA', 'P'):
-                img = img.convert('RGB')
-            
-            max_width = 1200
-            if img.width > max_width:
-                ratio = max_width / img.width
-                new_size = (max_width, int(img.height * ratio))
-                img = img.resize(new_size, Image.Resampling.LANCZOS)
-            
-            img.save(filepath, quality=85, optimize=True)
-    except Exception as e:
-        app.logger.warning(f"Image optimization failed: {e}")
-    
-    return f"/uploads/projects/{unique_filename}"
+from logconfig import SAMPLED, setup_logging
+from dbpool import (
+    TimedAsyncAdaptedQueuePool, TimedQueuePool, instrument_engine, pool_stats, set_statement_timeout_per_transaction,
+)
+import logconfig
+import metrics
+import querywatch
+from querywatch import query_budget
+from cache import MemoryResponseCache, cached_response, invalidate_cache, response_cache
+from pagination import PaginationError, apply_filters, keyset_paginate
+from migrate import run_migrations
+from slugs import add_with_unique_slug, slugify
+from serving import send_upload
+from serializers import (
+    COURSE_ADMIN, COURSE_PUBLIC, INTERNSHIP_ADMIN, INTERNSHIP_APPLICATION_ADMIN, INTERNSHIP_DETAIL,
+    INTERNSHIP_SUMMARY, PAYMENT_ADMIN, PROJECT_ADMIN, PROJECT_DETAIL, PROJECT_ENROLLMENT_ADMIN, PROJECT_SUMMARY,
+    JSONProvider, images_last_modified,
+)
+from storage import check_storage_config, get_storage
+from uploads import (
+    MAX_REQUEST_SIZE, UploadError, UploadFormDataParser, claim_direct_upload, delete_upload_files, ingest_upload,
+    iter_stored_uploads, key_for_reference, presign_direct_upload, receive_direct_upload, upload_fields,
+)
 
 # --------------- basic paths & folders -----------------
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -207,16 +47,33 @@ UPLOAD_FOLDER = os.path.join(BASE_DIR, "uploads")
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(FRONTEND_DIR, exist_ok=True)
 
-# --------------- Flask app + logging -------------------
-app = Flask(__name__, static_folder=FRONTEND_DIR, static_url_path="")
-CORS(app)
-
-# JWT Configuration
-app.config['JWT_SECRET_KEY'] = 'your-secret-key-change-this'  # Change this in production
-jwt = JWTManager(app)
-
-logging.basicConfig(level=logging.DEBUG)
-app.logger.setLevel(logging.DEBUG)
+# --------------- Flask extensions + blueprint -----------
+# The app itself is built by create_app() (bottom of this file); routes,
+# hooks and CLI commands hang off the `api` blueprint
+db = SQLAlchemy()
+jwt = JWTManager()
+api = Blueprint('api', __name__, cli_group=None)
+
+class UploadRequest(Request):
+    """Request whose multipart parser writes the view's @upload_fields straight into staging files"""
+    form_data_parser_class = UploadFormDataParser
+
+    def make_form_data_parser(self):
+        parser = super().make_form_data_parser()
+        view = current_app.view_functions.get(self.endpoint)
+        parser.upload_kinds = getattr(view, 'upload_fields', None) or {}
+        return parser
+
+@api.before_app_request
+def parse_uploads_early():
+    # Parse multipart bodies before the view, so an oversized upload becomes a
+    # 413 instead of being swallowed by the view's broad except
+    if request.mimetype == 'multipart/form-data':
+        request.files
+
+@api.app_errorhandler(413)
+def request_too_large(e):
+    return jsonify({'error': 'Upload exceeds the maximum request size'}), 413
 
 # --------------- load DB config -----------
 try:
@@ -234,12 +91,63 @@ except Exception:
     DB_PASSWORD = os.environ.get("DB_PASSWORD", "")
 
 # --------------- SQLAlchemy config -----------------------
-app.config["SQLALCHEMY_DATABASE_URI"] = (
+# DATABASE_URL (any SQLAlchemy URL) takes precedence over the DB_* settings
+SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL") or (
     f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 )
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
-db = SQLAlchemy(app)
+# Connection pool, per process: keep workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+# below the server's max_connections
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 10))  # seconds to wait for a free connection
+# Reconnect before server / firewall / proxy idle timeouts drop the socket
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))  # seconds
+# Test each connection on checkout, so a Postgres restart costs a reconnect instead of 500s
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+# Server-side cap per statement; 0 disables. Migrations lift it (migrate.py)
+DB_STATEMENT_TIMEOUT = int(os.environ.get("DB_STATEMENT_TIMEOUT", 30000))  # milliseconds
+# Connecting through PgBouncer in transaction mode: no startup options
+# (the timeout is set per transaction) and no server-side prepared statements.
+# Run migrate.py against the server itself; its advisory lock needs a session
+DB_PGBOUNCER = os.environ.get("DB_PGBOUNCER", "false").lower() == "true"
+
+def engine_options(url, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW):
+    """create_engine() keyword arguments for `url` (also used by asyncapi.py)"""
+    url = make_url(url)
+    options = {'pool_pre_ping': DB_POOL_PRE_PING}
+    if url.get_backend_name() != 'postgresql':
+        return options
+
+    is_asyncpg = url.get_driver_name() == 'asyncpg'
+    options.update(
+        poolclass=TimedAsyncAdaptedQueuePool if is_asyncpg else TimedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    if DB_PGBOUNCER:
+        if is_asyncpg:
+            options['connect_args'] = {
+                'statement_cache_size': 0,
+                'prepared_statement_cache_size': 0,
+                'prepared_statement_name_func': lambda: f"__asyncpg_{uuid.uuid4()}__",
+            }
+    elif DB_STATEMENT_TIMEOUT:
+        if is_asyncpg:
+            options['connect_args'] = {'server_settings': {'statement_timeout': str(DB_STATEMENT_TIMEOUT)}}
+        else:
+            options['connect_args'] = {'options': f"-c statement_timeout={DB_STATEMENT_TIMEOUT}"}
+    return options
+
+def configure_engine(engine, name='default'):
+    """Pool metrics for `engine` and, behind PgBouncer, the per-transaction statement timeout"""
+    instrument_engine(engine, name)
+    metrics.instrument_queries(engine)
+    querywatch.instrument_queries(engine)
+    if DB_PGBOUNCER and DB_STATEMENT_TIMEOUT and engine.dialect.name == 'postgresql':
+        set_statement_timeout_per_transaction(engine, DB_STATEMENT_TIMEOUT)
 
 # --------------- Extended ORM models ---------------------
 # Existing models (keep as is)
@@ -277,6 +185,7 @@ class PclInfo(db.Model):
     email = db.Column(db.String(50), nullable=False)
     mobile = db.Column(db.String(20), nullable=False)
     message = db.Column(db.Text)
+    attachment_path = db.Column(db.Text)
     date = db.Column(db.DateTime, server_default=db.func.now())
 
 # --------------- NEW MODELS for Course Management ---------------
@@ -289,12 +198,15 @@ class Admin(db.Model):
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     is_active = db.Column(db.Boolean, default=True)
 
+# Long text and JSON columns of the catalog models are deferred (group
+# 'details'); views select the columns their field set needs with
+# Serializer.load_only (serializers.py)
 class Course(db.Model):
     __tablename__ = "courses"
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
-    detailed_description = db.Column(db.Text)
+    detailed_description = db.deferred(db.Column(db.Text), group='details')
     level = db.Column(db.String(50))
     rating = db.Column(db.Float, default=4.5)
     students = db.Column(db.String(20), default="0")
@@ -309,7 +221,7 @@ class Course(db.Model):
     course_fees = db.Column(db.String(20))
     course_code = db.Column(db.String(50), unique=True)
     total_amount = db.Column(db.String(20))
-    features = db.Column(db.JSON)  # Store as JSON array
+    features = db.deferred(db.Column(db.JSON), group='details')  # Store as JSON array
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
@@ -339,6 +251,9 @@ class Payment(db.Model):
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
     
+    # Return server defaults (created_at) from the INSERT, needed for rollups
+    __mapper_args__ = {'eager_defaults': True}
+    
     # Relationship
     course = db.relationship('Course', backref='payments')
 # ----------- NEW MODEL FOR INTERNSHIP APPLICATIONS -----------
@@ -369,7 +284,7 @@ class InternshipApplication(db.Model):
     experience_level = db.Column(db.String(50), default='Fresher')
     portfolio_url = db.Column(db.String(500))
     github_url = db.Column(db.String(500))
-    motivation = db.Column(db.Text, nullable=False)
+    motivation = db.deferred(db.Column(db.Text, nullable=False))
     resume_path = db.Column(db.Text)
     gstin = db.Column(db.String(50))
     billing_address = db.Column(db.Text)
@@ -384,6 +299,9 @@ class InternshipApplication(db.Model):
     date = db.Column(db.DateTime, server_default=db.func.now())
     updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
     
+    # Return server defaults (date) from the INSERT, needed for rollups
+    __mapper_args__ = {'eager_defaults': True}
+    
     # Relationship
     internship = db.relationship('InternshipPosting', backref='applications')
 
@@ -394,14 +312,14 @@ class InternshipPosting(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
-    detailed_description = db.Column(db.Text)
+    detailed_description = db.deferred(db.Column(db.Text), group='details')
     category = db.Column(db.String(100))
     duration = db.Column(db.String(50))
     internship_type = db.Column(db.String(50))  # remote, onsite, hybrid
     location = db.Column(db.String(200))
-    skills = db.Column(db.JSON)  # Array of skills
-    eligibility = db.Column(db.Text)
-    perks = db.Column(db.JSON)  # Array of perks
+    skills = db.deferred(db.Column(db.JSON), group='details')  # Array of skills
+    eligibility = db.deferred(db.Column(db.Text), group='details')
+    perks = db.deferred(db.Column(db.JSON), group='details')  # Array of perks
     image_url = db.Column(db.String(500))
     internship_code = db.Column(db.String(50), unique=True)
     slug = db.Column(db.String(200), unique=True)
@@ -447,14 +365,14 @@ class ProjectPosting(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
-    detailed_description = db.Column(db.Text)
+    detailed_description = db.deferred(db.Column(db.Text), group='details')
     category = db.Column(db.String(100))
     duration = db.Column(db.String(50))
     project_type = db.Column(db.String(50))
     technologies = db.Column(JSON)
     difficulty_level = db.Column(db.String(50))
-    prerequisites = db.Column(JSON)
-    learning_outcomes = db.Column(JSON)
+    prerequisites = db.deferred(db.Column(JSON), group='details')
+    learning_outcomes = db.deferred(db.Column(JSON), group='details')
     image_url = db.Column(db.String(500))
     project_code = db.Column(db.String(50), unique=True)
     slug = db.Column(db.String(200), unique=True, nullable=False)
@@ -475,17 +393,77 @@ class ProjectPosting(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
-@app.route("/pclinfo", methods=["POST"])
+# ----------- EMAIL OUTBOX (drained by mailworker.py) -----------
+class EmailOutbox(db.Model):
+    __tablename__ = 'email_outbox'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # 'notify' or 'notification'
+    payload = db.Column(db.JSON, nullable=False)
+    attachment_path = db.Column(db.Text)
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+
+# ----------- DASHBOARD ROLLUPS (one row per day x kind x item x status) -----------
+class DashboardRollup(db.Model):
+    __tablename__ = 'dashboard_rollups'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    kind = db.Column(db.String(30), nullable=False)  # payment, project_enrollment, internship_application
+    ref_id = db.Column(db.Integer, nullable=False)  # course / project / internship id
+    status = db.Column(db.String(50), nullable=False)
+    count = db.Column(db.Integer, default=0, nullable=False)
+    amount = db.Column(db.Float, default=0, nullable=False)
+    
+    __table_args__ = (
+        db.UniqueConstraint('day', 'kind', 'ref_id', 'status', name='uq_dashboard_rollups_key'),
+    )
+
+
+# ----------- UPLOAD BLOBS (reference count per content-addressed upload) -----------
+class UploadBlob(db.Model):
+    __tablename__ = 'upload_blobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(300), unique=True, nullable=False)  # <folder>/ab/cd/<sha256>.<ext>
+    ref_count = db.Column(db.Integer, default=0, nullable=False)
+    released_at = db.Column(db.DateTime)  # when ref_count last dropped to 0
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_upload_blobs_unreferenced', 'released_at', postgresql_where=db.text('ref_count <= 0')),
+    )
+
+
+@api.route("/pclinfo", methods=["POST"])
+@upload_fields(file='attachment')
 def save_pclinfo():
     data = parse_request_data()
-    app.logger.debug("/pclinfo data: %s", data)
+    # Field names only: the values are personal data
+    current_app.logger.debug("/pclinfo fields: %s", sorted(data))
     
     attachment_path = None
+    upload = None
     if "file" in request.files:
-        attachment_path = save_uploaded_file(request.files["file"])
-
-    # Send enhanced email notification with attachment
-    handle_email_notification(data, attachment_path, use_enhanced=True)
+        try:
+            upload = ingest_upload(request.files["file"], 'attachment')
+        except UploadError as e:
+            return jsonify({'error': str(e)}), e.status
+        attachment_path = upload.url if upload else None
+        if upload:
+            # Stored under its content hash; mails use the name it was sent with
+            data['attachment_name'] = upload.original_name
 
     try:
         entry = PclInfo(
@@ -494,25 +472,27 @@ def save_pclinfo():
             email=data.get("email") or "",
             mobile=data.get("mobile") or "",
             message=data.get("message"),
+            attachment_path=attachment_path,
         )
         db.session.add(entry)
+        retain_upload(entry.attachment_path)
+        enqueue_email_notification(data, attachment_path, use_enhanced=True)
         db.session.commit()
-        app.logger.info(f"PclInfo saved with ID: {entry.id}")
-        return jsonify({"success": True, "id": entry.id}), 201
+        current_app.logger.info("PclInfo saved with ID: %s", entry.id, extra=SAMPLED)
     except Exception as e:
         db.session.rollback()
-        app.logger.error("DB insert error /pclinfo: %s", e)
+        current_app.logger.error("DB insert error /pclinfo: %s", e)
         return jsonify({"error": "Database insert failed"}), 500
 
+    # Send enhanced email notification with attachment
+    handle_email_notification(data, attachment_path, use_enhanced=True)
+    return jsonify({"success": True, "id": entry.id}), 201
+
 # Update the create_project_enrollment endpoint to handle payment screenshot
-@app.route("/api/project-enrollments", methods=["POST"])
+@api.route("/api/project-enrollments", methods=["POST"])
+@upload_fields(payment_screenshot='payment_screenshot')
 def create_project_enrollment():
     try:
-        app.logger.info("=== Starting Project Enrollment Submission ===")
-        
-        # Generate unique enrollment ID
-        enrollment_id = f"PROJ_ENR_{str(uuid.uuid4())[:12].upper()}"
-        
         # Get project slug from form data
         project_slug = request.form.get('project_slug')
         if not project_slug:
@@ -525,176 +505,109 @@ def create_project_enrollment():
         
         # Validate validation code
         validation_code = request.form.get('validation_code', '').lower()
-        if validation_code != 'm2nz':
+        if validation_code != PROJECT_VALIDATION_CODE:
             return jsonify({'error': 'Invalid validation code'}), 400
         
         # Handle payment screenshot upload
         payment_screenshot_path = None
         if 'payment_screenshot' in request.files:
             screenshot_file = request.files['payment_screenshot']
-            app.logger.info(f"Screenshot file received: {screenshot_file.filename}")
             
             if screenshot_file and screenshot_file.filename:
                 try:
-                    # Validate file
-                    if screenshot_file.content_length and screenshot_file.content_length > 5 * 1024 * 1024:
-                        return jsonify({'error': 'Screenshot file size exceeds 5MB limit'}), 400
-                    
-                    allowed_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
-                    file_ext = os.path.splitext(screenshot_file.filename)[1].lower()
-                    
-                    if file_ext not in allowed_extensions:
-                        return jsonify({'error': 'Invalid screenshot format. Please upload JPG, PNG, GIF, or WebP'}), 400
-                    
-                    payment_screenshot_path = save_payment_screenshot(screenshot_file)
-                    app.logger.info(f"Payment screenshot saved: {payment_screenshot_path}")
-                    
-                except ValueError as e:
-                    return jsonify({'error': str(e)}), 400
+                    # Size cap and type are checked on the bytes while streaming
+                    payment_screenshot_path = ingest_upload(screenshot_file, 'payment_screenshot').url
+                except UploadError as e:
+                    return jsonify({'error': str(e)}), e.status
                 except Exception as e:
-                    app.logger.error(f"Error saving screenshot: {e}")
+                    current_app.logger.error("Error saving screenshot: %s", e)
                     return jsonify({'error': 'Failed to upload screenshot'}), 500
-        
-        # Parse preferred start date
-        preferred_start_date = None
-        date_str = request.form.get('preferred_start_date')
-        if date_str:
-            try:
-                preferred_start_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-            except ValueError:
-                pass
-            
-                    # Calculate amount from project price (NEW LOGIC)
-        amount = None
-        if project.price:
+        elif request.form.get('payment_screenshot_token'):
+            # Uploaded straight to storage (see /api/uploads/presign)
             try:
-                # Remove any currency symbols and convert to float
-                amount = float(project.price.replace('₹', '').replace(',', '').strip())
-            except (ValueError, AttributeError):
-                app.logger.warning(f"Could not parse price: {project.price}")
-
+                payment_screenshot_path = claim_direct_upload(
+                    request.form['payment_screenshot_token'], 'payment_screenshot').url
+            except UploadError as e:
+                return jsonify({'error': str(e)}), e.status
         
-        # Create enrollment
-        enrollment = ProjectEnrollment(
-            enrollment_id=enrollment_id,
-            project_id=project.id,
-            student_name=request.form.get('name'),
-            email=request.form.get('email'),
-            mobile=request.form.get('mobile'),
-            gstin=request.form.get('gstin'),
-            billing_address=request.form.get('billing_address'),
-            landmark=request.form.get('landmark'),
-            district=request.form.get('district'),
-            state=request.form.get('state'),
-            preferred_start_date=preferred_start_date,
-            preferred_time=request.form.get('preferred_time'),
-            team_size=request.form.get('team_size'),
-            payment_method=request.form.get('payment_method'),
-            validation_code=validation_code,
-            payment_screenshot=payment_screenshot_path , # Save screenshot path
-            amount=amount  # SET AMOUNT FROM PROJECT PRICE
-        )
+        if project.price and parse_price(project.price) is None:
+            current_app.logger.warning("Could not parse price: %s", project.price)
         
-        db.session.add(enrollment)
+        # Create enrollment
+        enrollment, email_data = new_project_enrollment(request.form, project, payment_screenshot_path)
         
         # Update project enrollment count
         project.total_enrollments = (project.total_enrollments or 0) + 1
         
+        add_submission('project_enrollment', enrollment)
+        enqueue_email_notification(email_data)
         db.session.commit()
+        invalidate_cache("projects")
+        current_app.logger.info("Project enrollment %s submitted for %s", enrollment.enrollment_id, project.slug,
+                                extra=SAMPLED)
         
         # Send email notification
-        email_data = {
-            'fullName': request.form.get('name'),
-            'email': request.form.get('email'),
-            'mobile': request.form.get('mobile'),
-            'project': project.title,
-            'enrollment_id': enrollment_id,
-            'team_size': request.form.get('team_size'),
-            'start_date': request.form.get('preferred_start_date'),
-            'amount': amount  # Include amount in email
-        }
         handle_email_notification(email_data)
         
         return jsonify({
             'success': True,
-            'enrollment_id': enrollment_id,
+            'enrollment_id': enrollment.enrollment_id,
             'project': project.title,
-            'amount': amount,
+            'amount': enrollment.amount,
             'message': 'Enrollment submitted successfully'
         }), 201
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        app.logger.error(f"Error creating project enrollment: {e}")
-        import traceback
-        app.logger.error(traceback.format_exc())
+        current_app.logger.exception("Error creating project enrollment")
         return jsonify({'error': 'Failed to process enrollment request'}), 500
 
 
 # Update the get_all_project_enrollments endpoint to include payment_screenshot
-@app.route("/admin/project-enrollments", methods=["GET"])
+@api.route("/admin/project-enrollments", methods=["GET"])
 @jwt_required()
+@query_budget(1)
 def get_all_project_enrollments():
     try:
-        enrollments = db.session.query(ProjectEnrollment, ProjectPosting).join(ProjectPosting).all()
-        enrollments_list = []
-        
-        for enrollment, project in enrollments:
-            # Build full screenshot URL
-            screenshot_url = None
-            if enrollment.payment_screenshot:
-                screenshot_url = enrollment.payment_screenshot
-                if not screenshot_url.startswith('http'):
-                    screenshot_url = f"http://localhost:7000{screenshot_url}"
-            
-            enrollments_list.append({
-                'id': enrollment.id,
-                'enrollment_id': enrollment.enrollment_id,
-                'student_name': enrollment.student_name,
-                'email': enrollment.email,
-                'mobile': enrollment.mobile,
-                'project_title': project.title,
-                'project_code': project.project_code,
-                'team_size': enrollment.team_size,
-                'preferred_time': enrollment.preferred_time,
-                'preferred_start_date': enrollment.preferred_start_date.isoformat() if enrollment.preferred_start_date else None,
-                'payment_method': enrollment.payment_method,
-                'payment_status': enrollment.payment_status,
-                'amount': enrollment.amount,
-                'district': enrollment.district,
-                'state': enrollment.state,
-                'payment_screenshot': screenshot_url,  # NEW FIELD
-                'created_at': enrollment.created_at.isoformat()
-            })
-        
-        return jsonify({'success': True, 'enrollments': enrollments_list})
+        query = db.session.query(ProjectEnrollment, ProjectPosting).join(ProjectPosting).options(
+            PROJECT_ENROLLMENT_ADMIN.load_only(ProjectEnrollment),
+            db.load_only(ProjectPosting.title, ProjectPosting.project_code),
+        )
+        query = apply_filters(query, status_column=ProjectEnrollment.payment_status,
+                              date_column=ProjectEnrollment.created_at,
+                              search_columns=(ProjectEnrollment.student_name, ProjectEnrollment.email,
+                                              ProjectEnrollment.enrollment_id, ProjectPosting.title))
+        enrollments, pagination = keyset_paginate(
+            query, ProjectEnrollment.id,
+            {'id': ProjectEnrollment.id, 'created_at': ProjectEnrollment.created_at,
+             'student_name': ProjectEnrollment.student_name},
+            default_sort='-created_at',
+            primary=lambda row: row[0],
+        )
+        enrollments_list = [
+            PROJECT_ENROLLMENT_ADMIN(enrollment, project_title=project.title, project_code=project.project_code)
+            for enrollment, project in enrollments
+        ]
+        
+        return jsonify({'success': True, 'enrollments': enrollments_list, 'pagination': pagination})
         
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        app.logger.error(f"Error fetching project enrollments: {e}")
+        current_app.logger.error("Error fetching project enrollments: %s", e)
         return jsonify({'error': 'Failed to fetch enrollments'}), 500
 
 
 # Add endpoint to serve payment screenshots
-@app.route("/uploads/payment_screenshots/<filename>")
+@api.route("/uploads/payment_screenshots/<filename>")
 def serve_payment_screenshot(filename):
-    try:
-        screenshots_dir = os.path.join(UPLOAD_FOLDER, 'payment_screenshots')
-        if not os.path.exists(screenshots_dir):
-            app.logger.error(f"Payment screenshots directory does not exist: {screenshots_dir}")
-            return jsonify({'error': 'Screenshots directory not found'}), 404
-        
-        file_path = os.path.join(screenshots_dir, filename)
-        if not os.path.exists(file_path):
-            app.logger.error(f"Payment screenshot file not found: {file_path}")
-            return jsonify({'error': 'Screenshot file not found'}), 404
-        
-        return send_from_directory(screenshots_dir, filename)
-    except Exception as e:
-        app.logger.error(f"Error serving payment screenshot {filename}: {e}")
-        return jsonify({'error': 'Failed to serve screenshot'}), 500
+    response = send_upload(f"payment_screenshots/{filename}")
+    if response is None:
+        return jsonify({'error': 'Screenshot file not found'}), 404
+    return response
 
 
-@app.route("/admin/project-enrollments/<int:enrollment_id>/status", methods=["PUT"])
+@api.route("/admin/project-enrollments/<int:enrollment_id>/status", methods=["PUT"])
 @jwt_required()
 def update_project_enrollment_status(enrollment_id):
     data = parse_request_data()
@@ -704,70 +617,49 @@ def update_project_enrollment_status(enrollment_id):
         if not enrollment:
             return jsonify({'error': 'Enrollment not found'}), 404
         
+        old_status = enrollment.payment_status
         enrollment.payment_status = data.get('status', 'pending')
         enrollment.transaction_id = data.get('transaction_id')
         enrollment.updated_at = datetime.utcnow()
+        move_rollup('project_enrollment', enrollment.created_at, enrollment.project_id,
+                    old_status, enrollment.payment_status, enrollment.amount)
         
         db.session.commit()
+        invalidate_admin_stats()
         
         return jsonify({'success': True, 'message': 'Enrollment status updated'})
         
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"Error updating enrollment status: {e}")
+        current_app.logger.error("Error updating enrollment status: %s", e)
         return jsonify({'error': 'Failed to update enrollment status'}), 500
 
 
 
 # Also ensure the get_project_by_slug returns pricing fields
-@app.route("/api/projects/<slug>", methods=["GET"])
+@api.route("/api/projects/<slug>", methods=["GET"])
+@cached_response("projects")
 def get_project_by_slug(slug):
     try:
-        project = ProjectPosting.query.filter_by(slug=slug, is_active=True).first()
+        project = (ProjectPosting.query.options(PROJECT_DETAIL.load_only(ProjectPosting, 'updated_at'))
+                   .filter_by(slug=slug, is_active=True).first())
         if not project:
             return jsonify({'error': 'Project not found'}), 404
         
-        image_url = project.image_url
-        if image_url and not image_url.startswith('http'):
-            image_url = f"http://localhost:7000{image_url}"
-        
-        project_data = {
-            'id': project.id,
-            'title': project.title,
-            'description': project.description,
-            'detailed_description': project.detailed_description,
-            'category': project.category,
-            'duration': project.duration,
-            'project_type': project.project_type,
-            'difficulty_level': project.difficulty_level,
-            'technologies': project.technologies or [],
-            'prerequisites': project.prerequisites or [],
-            'learning_outcomes': project.learning_outcomes or [],
-            'image_url': image_url,
-            'slug': project.slug,
-            'project_code': project.project_code,
-            'total_enrollments': project.total_enrollments,
-            # Pricing fields
-            'price': project.price,
-            'original_price': project.original_price,
-            'course_fees': project.course_fees,
-            'total_amount': project.total_amount,
-            'discount': project.discount,
-            'level': project.level,
-            'rating': project.rating,
-            'students_count': project.students_count
-        }
-        return jsonify({'success': True, 'project': project_data})
+        response = jsonify({'success': True, 'project': PROJECT_DETAIL(project)})
+        response.last_modified = catalog_last_modified(project.updated_at, [project])
+        return response
     except Exception as e:
-        app.logger.error(f"Error fetching project: {e}")
+        current_app.logger.error("Error fetching project: %s", e)
         return jsonify({'error': 'Failed to fetch project'}), 500
     
     
-# --------------- create tables ---------------------
-with app.app_context():
+# --------------- migrate schema ---------------------
+def initialize_database():
+    """Apply migrations and create the default admin; create_app runs this in an app context"""
     try:
-        db.create_all()
-        app.logger.info("Database tables created / verified")
+        run_migrations(db, current_app.logger)
+        current_app.logger.info("Database schema migrated / verified")
         
         # Create default admin if not exists
         admin = Admin.query.filter_by(username='admin').first()
@@ -779,9 +671,9 @@ with app.app_context():
             )
             db.session.add(admin)
             db.session.commit()
-            app.logger.info("Default admin created")
+            current_app.logger.info("Default admin created")
     except Exception as e:
-        app.logger.error("Error creating tables: %s", e)
+        current_app.logger.error("Error migrating database: %s", e)
 
 # --------------- helper functions --------------
 def parse_request_data():
@@ -789,29 +681,343 @@ def parse_request_data():
         return request.get_json() or {}
     return request.form.to_dict(flat=True)
 
-def save_uploaded_file(file_obj, dest_folder=UPLOAD_FOLDER):
-    if not file_obj or file_obj.filename == "":
+def table_last_modified(model):
+    """Latest updated_at in a catalog table, including soft-deleted rows"""
+    return db.session.query(db.func.max(model.updated_at)).scalar()
+
+def catalog_last_modified(updated_at, items):
+    """
+    Last-Modified of a catalog response: its rows' updated_at, or later if a
+    srcset manifest for one of their images was published since (the body
+    then gains image_srcset without any row changing)
+    """
+    images_published = images_last_modified(item.image_url for item in items)
+    return max(filter(None, (updated_at, images_published)), default=None)
+
+# --------------- public submissions --------------
+# Shared by the Flask views and the asyncio API (asyncapi.py), so both
+# serving modes write the same rows (response field sets: serializers.py)
+
+PROJECT_VALIDATION_CODE = 'm2nz'
+INTERNSHIP_APPLICATION_REQUIRED = ['fname', 'lname', 'email', 'mobile', 'motivation']
+
+def parse_form_date(value):
+    """'YYYY-MM-DD' form value as a date; None if empty or malformed"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+def parse_price(price):
+    """'₹4,999' -> 4999.0; None if it is not a number"""
+    try:
+        return float(price.replace('₹', '').replace(',', '').strip())
+    except (ValueError, AttributeError):
         return None
-    filename = secure_filename(file_obj.filename)
-    ts = datetime.utcnow().strftime("%Y%m%d%H%M%S")
-    safe_name = f"{ts}_{filename}"
-    path = os.path.join(dest_folder, safe_name)
-    file_obj.save(path)
-    return path
+
+def new_payment(form, course, payment_screenshot):
+    """Unsaved Payment for a /api/payments form, plus its notification data"""
+    payment = Payment(
+        payment_id=f"PAY_{str(uuid.uuid4())[:12].upper()}",
+        course_id=course.id,
+        student_name=form.get('name'),
+        email=form.get('email'),
+        mobile=form.get('mobile'),
+        gstin=form.get('gstin'),
+        billing_address=form.get('billing_address'),
+        landmark=form.get('landmark'),
+        district=form.get('district'),
+        state=form.get('state'),
+        preferred_start_date=datetime.strptime(form.get('start_date'), '%Y-%m-%d').date() if form.get('start_date') else None,
+        training_mode=form.get('training_mode'),
+        batch_preference=form.get('batch_preference'),
+        payment_method=form.get('payment_method'),
+        amount=float(course.total_amount),
+        payment_screenshot=payment_screenshot
+    )
+    email_data = {
+        'fullName': form.get('name'),
+        'email': form.get('email'),
+        'mobile': form.get('mobile'),
+        'course': course.title,
+        'amount': course.total_amount,
+        'payment_id': payment.payment_id
+    }
+    return payment, email_data
+
+def new_project_enrollment(form, project, payment_screenshot):
+    """Unsaved ProjectEnrollment for a /api/project-enrollments form, plus its notification data"""
+    # Amount comes from the project price, not from the form
+    amount = parse_price(project.price) if project.price else None
+    enrollment = ProjectEnrollment(
+        enrollment_id=f"PROJ_ENR_{str(uuid.uuid4())[:12].upper()}",
+        project_id=project.id,
+        student_name=form.get('name'),
+        email=form.get('email'),
+        mobile=form.get('mobile'),
+        gstin=form.get('gstin'),
+        billing_address=form.get('billing_address'),
+        landmark=form.get('landmark'),
+        district=form.get('district'),
+        state=form.get('state'),
+        preferred_start_date=parse_form_date(form.get('preferred_start_date')),
+        preferred_time=form.get('preferred_time'),
+        team_size=form.get('team_size'),
+        payment_method=form.get('payment_method'),
+        validation_code=form.get('validation_code', '').lower(),
+        payment_screenshot=payment_screenshot,
+        amount=amount
+    )
+    email_data = {
+        'fullName': form.get('name'),
+        'email': form.get('email'),
+        'mobile': form.get('mobile'),
+        'project': project.title,
+        'enrollment_id': enrollment.enrollment_id,
+        'team_size': form.get('team_size'),
+        'start_date': form.get('preferred_start_date'),
+        'amount': amount
+    }
+    return enrollment, email_data
+
+def new_internship_application(form, internship, resume_path):
+    """Unsaved InternshipApplication for a /api/internship-applications form, plus its notification data"""
+    application = InternshipApplication(
+        enrollment_id=f"INT_APP_{str(uuid.uuid4())[:12].upper()}",
+        internship_id=internship.id,
+        fname=form.get('fname').strip(),
+        lname=form.get('lname').strip(),
+        email=form.get('email').strip(),
+        mobile=form.get('mobile').strip(),
+        experience_level=form.get('experience_level', 'Fresher'),
+        portfolio_url=form.get('portfolio_url', '').strip() or None,
+        github_url=form.get('github_url', '').strip() or None,
+        motivation=form.get('motivation').strip(),
+        resume_path=resume_path,
+        gstin=form.get('gstin', '').strip() or None,
+        billing_address=form.get('billing_address', '').strip() or None,
+        landmark=form.get('landmark', '').strip() or None,
+        district=form.get('district', '').strip() or None,
+        state=form.get('state', '').strip() or None,
+        preferred_start_date=parse_form_date(form.get('preferred_start_date')),
+        preferred_time=form.get('preferred_time', 'Full-Time'),
+        availability=form.get('availability', 'Immediate'),
+        payment_status='pending',
+        validation_code=form.get('validation_code', '').strip().lower()
+    )
+    email_data = {
+        'fullName': f"{form.get('fname')} {form.get('lname')}",
+        'email': form.get('email'),
+        'mobile': form.get('mobile'),
+        'internship': internship.title,
+        'enrollment_id': application.enrollment_id,
+        'experience_level': form.get('experience_level', 'Fresher')
+    }
+    return application, email_data
+
+def add_submission(kind, record, session=None):
+    """
+    Add a new payment / project enrollment / internship application (a
+    ROLLUP_SOURCES kind) with its rollup and upload reference, without
+    committing. `session` defaults to db.session; the asyncio API passes
+    the sync side of its AsyncSession (AsyncSession.run_sync).
+    """
+    session = session or db.session
+    _, ref_column, day_column, amount_column = ROLLUP_SOURCES[kind]
+    session.add(record)
+    session.flush()
+    record_rollup(kind, getattr(record, day_column.key), getattr(record, ref_column.key), record.payment_status,
+                  1, getattr(record, amount_column.key) if amount_column is not None else None, session=session)
+    retain_upload(record.resume_path if kind == 'internship_application' else record.payment_screenshot,
+                  session=session)
+
+# 'queue' stores the notification in email_outbox for mailworker.py,
+# 'inline' sends it from the request thread (handy without a worker)
+MAIL_DELIVERY = os.environ.get("MAIL_DELIVERY", "queue").lower()
+
+def add_outbox_entry(data, attachment_path=None, use_enhanced=False, session=None):
+    """Add a notification to the outbox in the current transaction"""
+    session = session or db.session
+    entry = EmailOutbox(
+        kind='notification' if use_enhanced else 'notify',
+        payload=json.loads(json.dumps(data, default=str)),
+        attachment_path=attachment_path,
+    )
+    session.add(entry)
+    # Keep the attachment alive until the worker has sent it
+    retain_upload(attachment_path, session=session)
+    return entry
+
+def enqueue_email_notification(data, attachment_path=None, use_enhanced=False):
+    """
+    With queued mail, add the notification to the outbox in the current
+    transaction, so it is committed together with the row it is about
+    """
+    if MAIL_DELIVERY != "inline":
+        add_outbox_entry(data, attachment_path, use_enhanced)
 
 def handle_email_notification(data, attachment_path=None, use_enhanced=False):
+    """Send the notification with inline mail; call it after the commit"""
+    if MAIL_DELIVERY != "inline":
+        return True
     try:
         if use_enhanced:
-            success = send_email_notification(data, attachment_path)
-        else:
-            success = send_email_notify(data)
-        return success
+            return send_email_notification(data, attachment_path)
+        return send_email_notify(data)
     except Exception as e:
-        app.logger.error(f"Email notification error: {e}")
+        current_app.logger.error("Email notification error: %s", e)
         return False
 
+# --------------- UPLOAD STORAGE -----------------
+# Unreferenced uploads are kept this long before deletion; covers the gap
+# between storing a file and committing the row that references it
+UPLOAD_GC_GRACE = int(os.environ.get("UPLOAD_GC_GRACE", 3600))  # seconds
+UPLOAD_GC_INTERVAL = int(os.environ.get("UPLOAD_GC_INTERVAL", 600))  # seconds
+upload_gc_state = {'last_run': 0.0}
+
+# Columns that hold upload URLs; each non-empty value is one reference
+UPLOAD_REFERENCES = [
+    Course.image_url,
+    InternshipPosting.image_url,
+    ProjectPosting.image_url,
+    Payment.payment_screenshot,
+    ProjectEnrollment.payment_screenshot,
+    InternshipApplication.resume_path,
+    PclInfo.attachment_path,
+]
+
+def upsert_upload_blob(key, delta, session=None):
+    """Atomically add `delta` to an upload's reference count (creating the row if needed)"""
+    session = session or db.session
+    if session.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    table = UploadBlob.__table__
+    now = datetime.utcnow()
+    stmt = insert(table).values(
+        key=key, ref_count=delta, released_at=now if delta <= 0 else None, created_at=now,
+    )
+    new_count = table.c.ref_count + stmt.excluded.ref_count
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['key'],
+        set_={
+            'ref_count': new_count,
+            'released_at': db.case((new_count <= 0, now), else_=None),
+        },
+    )
+    session.execute(stmt)
+
+def retain_upload(reference, session=None):
+    """Count one more record pointing at an upload (URL or path), in the current transaction"""
+    key = key_for_reference(reference)
+    if key:
+        upsert_upload_blob(key, 1, session)
+
+def release_upload(reference):
+    """Drop one reference; the file is collected once the count stays at 0 for UPLOAD_GC_GRACE"""
+    key = key_for_reference(reference)
+    if key:
+        upsert_upload_blob(key, -1)
+
+def swap_upload_reference(old_reference, new_reference):
+    if old_reference != new_reference:
+        release_upload(old_reference)
+        retain_upload(new_reference)
+
+def collect_upload_garbage(grace=UPLOAD_GC_GRACE, sweep_orphans=False):
+    """
+    Delete uploads that have been unreferenced for longer than `grace`.
+    With sweep_orphans, also delete stored files that never got a
+    reference (the request failed after the upload). Returns files removed.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=grace)
+    cutoff_ts = time.time() - grace
+    removed = 0
+
+    released = (
+        db.session.query(UploadBlob.id, UploadBlob.key)
+        .filter(UploadBlob.ref_count <= 0, UploadBlob.released_at < cutoff)
+        .all()
+    )
+    storage = get_storage()
+    for blob_id, key in released:
+        mtime = storage.modified_time(key)
+        if mtime is not None and mtime > cutoff_ts:
+            continue  # the same bytes were just uploaded again
+        # Re-check the count in the DELETE so a reference added meanwhile wins
+        deleted = (
+            UploadBlob.query
+            .filter(UploadBlob.id == blob_id, UploadBlob.ref_count <= 0)
+            .delete(synchronize_session=False)
+        )
+        db.session.commit()
+        if deleted:
+            delete_upload_files(key)
+            removed += 1
+
+    if sweep_orphans:
+        tracked = {key for (key,) in db.session.query(UploadBlob.key)}
+        for key, mtime in iter_stored_uploads():
+            if key not in tracked and mtime < cutoff_ts:
+                delete_upload_files(key)
+                removed += 1
+    return removed
+
+def maybe_collect_upload_garbage():
+    """Run the released-uploads GC after references were dropped, at most every UPLOAD_GC_INTERVAL"""
+    now = time.monotonic()
+    if now - upload_gc_state['last_run'] < UPLOAD_GC_INTERVAL:
+        return
+    upload_gc_state['last_run'] = now
+    try:
+        removed = collect_upload_garbage()
+        if removed:
+            current_app.logger.info("Upload GC removed %s files", removed)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error("Upload GC failed: %s", e)
+
+def rebuild_upload_refs():
+    """Recompute upload_blobs reference counts from the referencing columns"""
+    counts = Counter()
+    for column in UPLOAD_REFERENCES:
+        for (reference,) in db.session.query(column).filter(column.isnot(None)):
+            key = key_for_reference(reference)
+            if key:
+                counts[key] += 1
+    # Attachments of mails the worker has not sent yet
+    unsent = db.session.query(EmailOutbox.attachment_path).filter(
+        EmailOutbox.attachment_path.isnot(None), EmailOutbox.status.in_(['pending', 'sending'])
+    )
+    for (reference,) in unsent:
+        key = key_for_reference(reference)
+        if key:
+            counts[key] += 1
+
+    now = datetime.utcnow()
+    for blob in UploadBlob.query:
+        blob.ref_count = counts.pop(blob.key, 0)
+        blob.released_at = (blob.released_at or now) if blob.ref_count <= 0 else None
+    for key, count in counts.items():
+        db.session.add(UploadBlob(key=key, ref_count=count))
+    db.session.commit()
+    return UploadBlob.query.count()
+
+@api.cli.command("rebuild-upload-refs")
+def rebuild_upload_refs_command():
+    """Recount references to content-addressed uploads"""
+    print(f"Rebuilt upload references: {rebuild_upload_refs()} files tracked")
+
+@api.cli.command("gc-uploads")
+def gc_uploads_command():
+    """Delete unreferenced uploads, including files that never got a reference"""
+    print(f"Removed {collect_upload_garbage(sweep_orphans=True)} unreferenced uploads")
+
 # --------------- AUTH ENDPOINTS -----------------
-@app.route("/admin/login", methods=["POST"])
+@api.route("/admin/login", methods=["POST"])
 def admin_login():
     data = parse_request_data()
     username = data.get('username')
@@ -837,67 +1043,72 @@ def admin_login():
     return jsonify({'error': 'Invalid credentials'}), 401
 
 # --------------- COURSE MANAGEMENT ENDPOINTS -----------------
-@app.route("/admin/courses", methods=["GET"])
+@api.route("/admin/courses", methods=["GET"])
 @jwt_required()
+@query_budget(1)
 def get_all_courses_admin():
     try:
-        courses = Course.query.all()
-        courses_list = []
-        for course in courses:
-            courses_list.append({
-                'id': course.id,
-                'title': course.title,
-                'description': course.description,
-                'detailed_description': course.detailed_description,
-                'level': course.level,
-                'rating': course.rating,
-                'students': course.students,
-                'duration': course.duration,
-                'price': course.price,
-                'original_price': course.original_price,
-                'discount': course.discount,
-                'image_url': course.image_url,
-                'category': course.category,
-                'instructor': course.instructor,
-                'slug': course.slug,
-                'course_fees': course.course_fees,
-                'course_code': course.course_code,
-                'total_amount': course.total_amount,
-                'features': course.features,
-                'is_active': course.is_active,
-                'created_at': course.created_at.isoformat(),
-                'updated_at': course.updated_at.isoformat()
-            })
-        return jsonify({'success': True, 'courses': courses_list})
+        query = apply_filters(Course.query.options(COURSE_ADMIN.load_only(Course)),
+                              status_column=Course.is_active, date_column=Course.created_at,
+                              search_columns=(Course.title, Course.category))
+        courses, pagination = keyset_paginate(
+            query, Course.id,
+            {'id': Course.id, 'title': Course.title, 'created_at': Course.created_at, 'updated_at': Course.updated_at},
+            default_sort='-created_at',
+        )
+        courses_list = COURSE_ADMIN.many(courses)
+        return jsonify({'success': True, 'courses': courses_list, 'pagination': pagination})
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        app.logger.error(f"Error fetching courses: {e}")
+        current_app.logger.error("Error fetching courses: %s", e)
         return jsonify({'error': 'Failed to fetch courses'}), 500
 
 # Add this to your backend/connection.py - Replace the upload file serving section
 
 # Add CORS headers for uploaded files
-@app.after_request
+@api.after_app_request
 def after_request(response):
     response.headers.add('Access-Control-Allow-Origin', '*')
     response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
     return response
 
-# Fix the uploaded file serving endpoint
-@app.route("/uploads/<path:filename>")
+# Uploaded files; cache headers and proxy offload are decided in serving.py
+@api.route("/uploads/<path:filename>")
 def uploaded_file(filename):
-    try:
-        return send_from_directory(UPLOAD_FOLDER, filename)
-    except Exception as e:
-        app.logger.error(f"Error serving file {filename}: {e}")
+    response = send_upload(filename)
+    if response is None:
         return jsonify({'error': 'File not found'}), 404
+    return response
+
+# Direct uploads: the browser sends resumes / screenshots to storage itself
+# and submits the returned token with the form instead of the file
+@api.route("/api/uploads/presign", methods=["POST"])
+def presign_upload():
+    data = request.get_json(silent=True) or {}
+    try:
+        result = presign_direct_upload(data.get('kind'), data.get('filename'), data.get('size'), data.get('sha256'))
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    return jsonify({'success': True, **result})
+
+# Target of the local storage backend's pre-signed URLs
+@api.route("/uploads/direct/<token>", methods=["PUT"])
+def direct_upload(token):
+    try:
+        receive_direct_upload(token, request.stream)
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    return jsonify({'success': True})
 
 # Updated create_course endpoint with better error handling
-@app.route("/admin/courses", methods=["POST"])
+@api.route("/admin/courses", methods=["POST"])
 @jwt_required()
+@upload_fields(image='course_image')
 def create_course():
     try:
-        app.logger.info("Creating new course...")
+        current_app.logger.info("Creating new course...")
         
         # Handle file upload
         image_url = None
@@ -905,14 +1116,14 @@ def create_course():
             file = request.files['image']
             if file and file.filename:
                 try:
-                    image_url = save_course_image(file)
-                    app.logger.info(f"Image saved: {image_url}")
-                except ValueError as e:
-                    return jsonify({'error': str(e)}), 400
+                    image_url = ingest_upload(file, 'course_image').url
+                    current_app.logger.info("Image saved: %s", image_url)
+                except UploadError as e:
+                    return jsonify({'error': str(e)}), e.status
         
         # Get form data
         data = request.form.to_dict()
-        app.logger.info(f"Form data received: {list(data.keys())}")
+        current_app.logger.info("Form data received: %s", list(data.keys()))
         
         # Parse JSON fields - handle both string and array formats
         features = []
@@ -927,13 +1138,8 @@ def create_course():
             elif isinstance(features_data, list):
                 features = features_data
         
-        # Generate unique slug
-        base_slug = data.get('title', '').lower().replace(' ', '-')
-        slug = base_slug
-        counter = 1
-        while Course.query.filter_by(slug=slug).first():
-            slug = f"{base_slug}-{counter}"
-            counter += 1
+        # Base slug; the free suffix is allocated on insert (see slugs.py)
+        base_slug = slugify(data.get('title', ''))
         
         # Generate course code if not provided
         course_code = data.get('course_code')
@@ -961,17 +1167,19 @@ def create_course():
             image_url=final_image_url,
             category=data.get('category', ''),
             instructor=data.get('instructor', ''),
-            slug=slug,
             course_fees=data.get('course_fees', '0'),
             course_code=course_code,
             total_amount=data.get('total_amount', '0'),
             features=features
         )
         
-        db.session.add(course)
+        add_with_unique_slug(db.session, course, base_slug)
+        retain_upload(course.image_url)
         db.session.commit()
+        invalidate_cache("courses")
+        invalidate_admin_stats()
         
-        app.logger.info(f"Course created successfully: {course.id}")
+        current_app.logger.info("Course created successfully: %s", course.id)
         
         return jsonify({
             'success': True, 
@@ -983,32 +1191,32 @@ def create_course():
         
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"Error creating course: {e}")
-        import traceback
-        app.logger.error(traceback.format_exc())
+        current_app.logger.exception("Error creating course")
         return jsonify({'error': str(e)}), 500
 
 # Updated update_course endpoint
-@app.route("/admin/courses/<int:course_id>", methods=["PUT"])
+@api.route("/admin/courses/<int:course_id>", methods=["PUT"])
 @jwt_required()
+@upload_fields(image='course_image')
 def update_course(course_id):
     try:
         course = Course.query.get(course_id)
         if not course:
             return jsonify({'error': 'Course not found'}), 404
         
-        app.logger.info(f"Updating course {course_id}...")
+        current_app.logger.info("Updating course %s...", course_id)
+        old_image_url = course.image_url
         
         # Handle file upload
         if 'image' in request.files:
             file = request.files['image']
             if file and file.filename:
                 try:
-                    image_url = save_course_image(file)
+                    image_url = ingest_upload(file, 'course_image').url
                     course.image_url = image_url
-                    app.logger.info(f"New image uploaded: {image_url}")
-                except ValueError as e:
-                    return jsonify({'error': str(e)}), 400
+                    current_app.logger.info("New image uploaded: %s", image_url)
+                except UploadError as e:
+                    return jsonify({'error': str(e)}), e.status
         
         # Get form data
         data = request.form.to_dict()
@@ -1041,9 +1249,13 @@ def update_course(course_id):
             course.image_url = data['image_url']
         
         course.updated_at = datetime.utcnow()
+        swap_upload_reference(old_image_url, course.image_url)
         db.session.commit()
+        invalidate_cache("courses")
+        invalidate_admin_stats()
+        maybe_collect_upload_garbage()
         
-        app.logger.info(f"Course {course_id} updated successfully")
+        current_app.logger.info("Course %s updated successfully", course_id)
         
         return jsonify({
             'success': True, 
@@ -1053,90 +1265,41 @@ def update_course(course_id):
         
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"Error updating course: {e}")
-        import traceback
-        app.logger.error(traceback.format_exc())
+        current_app.logger.exception("Error updating course")
         return jsonify({'error': str(e)}), 500
 
 # Enhanced get_public_courses with full image URL
-@app.route("/api/courses", methods=["GET"])
+@api.route("/api/courses", methods=["GET"])
+@cached_response("courses")
 def get_public_courses():
     try:
-        courses = Course.query.filter_by(is_active=True).all()
-        courses_list = []
-        for course in courses:
-            # Build full image URL
-            image_url = course.image_url
-            if image_url and not image_url.startswith('http'):
-                # Convert relative path to full URL
-                image_url = f"http://localhost:7000{image_url}"
-            
-            courses_list.append({
-                'id': course.id,
-                'title': course.title,
-                'description': course.description,
-                'detailed_description': course.detailed_description,
-                'level': course.level,
-                'rating': course.rating,
-                'students': course.students,
-                'duration': course.duration,
-                'price': course.price,
-                'original_price': course.original_price,
-                'discount': course.discount,
-                'image_url': image_url,
-                'category': course.category,
-                'instructor': course.instructor,
-                'slug': course.slug,
-                'course_fees': course.course_fees,
-                'course_code': course.course_code,
-                'total_amount': course.total_amount,
-                'features': course.features or []
-            })
-        return jsonify({'success': True, 'courses': courses_list})
+        courses = Course.query.options(COURSE_PUBLIC.load_only(Course)).filter_by(is_active=True).all()
+        courses_list = COURSE_PUBLIC.many(courses)
+        response = jsonify({'success': True, 'courses': courses_list})
+        response.last_modified = catalog_last_modified(table_last_modified(Course), courses)
+        return response
     except Exception as e:
-        app.logger.error(f"Error fetching public courses: {e}")
+        current_app.logger.error("Error fetching public courses: %s", e)
         return jsonify({'error': 'Failed to fetch courses'}), 500
 
 # Enhanced get_course_by_slug with full image URL
-@app.route("/api/courses/<slug>", methods=["GET"])
+@api.route("/api/courses/<slug>", methods=["GET"])
+@cached_response("courses")
 def get_course_by_slug(slug):
     try:
-        course = Course.query.filter_by(slug=slug, is_active=True).first()
+        course = (Course.query.options(COURSE_PUBLIC.load_only(Course, 'updated_at'))
+                  .filter_by(slug=slug, is_active=True).first())
         if not course:
             return jsonify({'error': 'Course not found'}), 404
         
-        # Build full image URL
-        image_url = course.image_url
-        if image_url and not image_url.startswith('http'):
-            image_url = f"http://localhost:7000{image_url}"
-        
-        course_data = {
-            'id': course.id,
-            'title': course.title,
-            'description': course.description,
-            'detailed_description': course.detailed_description,
-            'level': course.level,
-            'rating': course.rating,
-            'students': course.students,
-            'duration': course.duration,
-            'price': course.price,
-            'original_price': course.original_price,
-            'discount': course.discount,
-            'image_url': image_url,
-            'category': course.category,
-            'instructor': course.instructor,
-            'slug': course.slug,
-            'course_fees': course.course_fees,
-            'course_code': course.course_code,
-            'total_amount': course.total_amount,
-            'features': course.features or []
-        }
-        return jsonify({'success': True, 'course': course_data})
+        response = jsonify({'success': True, 'course': COURSE_PUBLIC(course)})
+        response.last_modified = catalog_last_modified(course.updated_at, [course])
+        return response
     except Exception as e:
-        app.logger.error(f"Error fetching course: {e}")
+        current_app.logger.error("Error fetching course: %s", e)
         return jsonify({'error': 'Failed to fetch course'}), 500
     
-@app.route("/admin/courses/<int:course_id>", methods=["DELETE"])
+@api.route("/admin/courses/<int:course_id>", methods=["DELETE"])
 @jwt_required()
 def delete_course(course_id):
     try:
@@ -1147,24 +1310,24 @@ def delete_course(course_id):
         course.is_active = False  # Soft delete
         course.updated_at = datetime.utcnow()
         db.session.commit()
+        invalidate_cache("courses")
+        invalidate_admin_stats()
         
         return jsonify({'success': True, 'message': 'Course deleted successfully'})
         
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"Error deleting course: {e}")
+        current_app.logger.error("Error deleting course: %s", e)
         return jsonify({'error': 'Failed to delete course'}), 500
 
 # --------------- PAYMENT ENDPOINTS -----------------
-@app.route("/api/payments", methods=["POST"])
+@api.route("/api/payments", methods=["POST"])
+@upload_fields(payment_screenshot='payment_screenshot')
 def create_payment():
     try:
         # Handle FormData instead of JSON
         data = request.form.to_dict()
         
-        # Generate unique payment ID
-        payment_id = f"PAY_{str(uuid.uuid4())[:12].upper()}"
-        
         # Get course
         course = Course.query.filter_by(slug=data.get('course_slug')).first()
         if not course:
@@ -1176,67 +1339,48 @@ def create_payment():
             screenshot_file = request.files['payment_screenshot']
             if screenshot_file and screenshot_file.filename:
                 try:
-                    payment_screenshot_path = save_payment_screenshot(screenshot_file)
-                    app.logger.info(f"Payment screenshot saved: {payment_screenshot_path}")
-                except ValueError as e:
-                    return jsonify({'error': str(e)}), 400
+                    payment_screenshot_path = ingest_upload(screenshot_file, 'payment_screenshot').url
+                except UploadError as e:
+                    return jsonify({'error': str(e)}), e.status
                 except Exception as e:
-                    app.logger.error(f"Error saving screenshot: {e}")
+                    current_app.logger.error("Error saving screenshot: %s", e)
                     return jsonify({'error': 'Failed to upload screenshot'}), 500
-        
-        payment = Payment(
-            payment_id=payment_id,
-            course_id=course.id,
-            student_name=data.get('name'),
-            email=data.get('email'),
-            mobile=data.get('mobile'),
-            gstin=data.get('gstin'),
-            billing_address=data.get('billing_address'),
-            landmark=data.get('landmark'),
-            district=data.get('district'),
-            state=data.get('state'),
-            preferred_start_date=datetime.strptime(data.get('start_date'), '%Y-%m-%d').date() if data.get('start_date') else None,
-            training_mode=data.get('training_mode'),
-            batch_preference=data.get('batch_preference'),
-            payment_method=data.get('payment_method'),
-            amount=float(course.total_amount),
-            payment_screenshot=payment_screenshot_path  # Save screenshot path
-        )
-        
-        db.session.add(payment)
+        elif data.get('payment_screenshot_token'):
+            # Uploaded straight to storage (see /api/uploads/presign)
+            try:
+                payment_screenshot_path = claim_direct_upload(
+                    data['payment_screenshot_token'], 'payment_screenshot').url
+            except UploadError as e:
+                return jsonify({'error': str(e)}), e.status
+        
+        payment, email_data = new_payment(data, course, payment_screenshot_path)
+        add_submission('payment', payment)
+        enqueue_email_notification(email_data)
         db.session.commit()
+        current_app.logger.info("Payment %s created for %s", payment.payment_id, course.slug, extra=SAMPLED)
         
         # Send email notification
-        email_data = {
-            'fullName': data.get('name'),
-            'email': data.get('email'),
-            'mobile': data.get('mobile'),
-            'course': course.title,
-            'amount': course.total_amount,
-            'payment_id': payment_id
-        }
         handle_email_notification(email_data)
         
         return jsonify({
             'success': True, 
-            'payment_id': payment_id,
+            'payment_id': payment.payment_id,
             'course': course.title,
             'amount': course.total_amount
         }), 201
         
-    except Exception as e:
+    except Exception:
         db.session.rollback()
-        app.logger.error(f"Error creating payment: {e}")
-        import traceback
-        app.logger.error(traceback.format_exc())
+        current_app.logger.exception("Error creating payment")
         return jsonify({'error': 'Failed to process payment request'}), 500
 # Replace the get_all_payments function in your backend/connection.py
 # Find the section around line 1228 and replace with this:
 
 # Replace the get_all_payments function in backend/connection.py (around line 1220)
 
-@app.route("/admin/payments", methods=["GET"])
+@api.route("/admin/payments", methods=["GET"])
 @jwt_required()
+@query_budget(4)
 def get_all_payments():
     try:
         # Get query parameters
@@ -1246,18 +1390,23 @@ def get_all_payments():
         status = request.args.get('status', 'all', type=str)
         
         # Base query
-        query = db.session.query(Payment, Course).join(Course)
+        query = db.session.query(Payment, Course).join(Course).options(
+            PAYMENT_ADMIN.load_only(Payment),
+            db.load_only(Course.title, Course.course_code),
+        )
         
         # Apply filters
         if search:
-            query = query.filter(
-                db.or_(
-                    Payment.student_name.ilike(f'%{search}%'),
-                    Payment.email.ilike(f'%{search}%'),
-                    Payment.payment_id.ilike(f'%{search}%'),
-                    Course.title.ilike(f'%{search}%')
-                )
+            # One trigram-indexed lookup per column, unioned: an OR that spans
+            # the join with courses cannot use the indexes and reads every payment
+            pattern = f'%{search}%'
+            matching = db.union(
+                db.select(Payment.id).where(Payment.student_name.ilike(pattern)),
+                db.select(Payment.id).where(Payment.email.ilike(pattern)),
+                db.select(Payment.id).where(Payment.payment_id.ilike(pattern)),
+                db.select(Payment.id).join(Course).where(Course.title.ilike(pattern)),
             )
+            query = query.filter(Payment.id.in_(matching))
         
         if status != 'all':
             query = query.filter(Payment.payment_status == status)
@@ -1265,44 +1414,16 @@ def get_all_payments():
         # Order by created_at descending
         query = query.order_by(Payment.created_at.desc())
         
-        # Calculate stats
-        total_count = Payment.query.count()
-        pending_count = Payment.query.filter_by(payment_status='pending').count()
-        completed_count = Payment.query.filter_by(payment_status='completed').count()
-        
-        # Calculate total revenue from completed payments
-        total_revenue = db.session.query(db.func.sum(Payment.amount)).filter(
-            Payment.payment_status == 'completed'
-        ).scalar() or 0
+        # Stats come from the shared (briefly cached) aggregate, see /admin/stats
+        payment_stats = get_admin_stats()['payments']
         
         # Paginate
         paginated = query.paginate(page=page, per_page=per_page, error_out=False)
         
-        payments_list = []
-        for payment, course in paginated.items:
-            # Build full screenshot URL
-            screenshot_url = None
-            if payment.payment_screenshot:
-                screenshot_url = payment.payment_screenshot
-                if not screenshot_url.startswith('http'):
-                    screenshot_url = f"http://localhost:7000{screenshot_url}"
-            
-            payments_list.append({
-                'id': payment.id,
-                'payment_id': payment.payment_id,
-                'student_name': payment.student_name,
-                'email': payment.email,
-                'mobile': payment.mobile,
-                'course_title': course.title,
-                'course_code': course.course_code,
-                'payment_method': payment.payment_method,
-                'payment_status': payment.payment_status,
-                'amount': payment.amount,
-                'training_mode': payment.training_mode,
-                'payment_screenshot': screenshot_url,
-                'preferred_start_date': payment.preferred_start_date.isoformat() if payment.preferred_start_date else None,
-                'created_at': payment.created_at.isoformat()
-            })
+        payments_list = [
+            PAYMENT_ADMIN(payment, course_title=course.title, course_code=course.course_code)
+            for payment, course in paginated.items
+        ]
         
         return jsonify({
             'success': True,
@@ -1314,20 +1435,204 @@ def get_all_payments():
                 'pages': paginated.pages
             },
             'stats': {
-                'total': total_count,
-                'pending': pending_count,
-                'completed': completed_count,
-                'total_revenue': float(total_revenue)
+                'total': payment_stats['total'],
+                'pending': payment_stats['by_status'].get('pending', {}).get('count', 0),
+                'completed': payment_stats['by_status'].get('completed', {}).get('count', 0),
+                'total_revenue': payment_stats['revenue']
             }
         })
         
-    except Exception as e:
-        app.logger.error(f"Error fetching payments: {e}")
-        import traceback
-        app.logger.error(traceback.format_exc())
+    except Exception:
+        current_app.logger.exception("Error fetching payments")
         return jsonify({'error': 'Failed to fetch payments'}), 500
     
-@app.route("/admin/payments/<int:payment_id>/status", methods=["PUT"])
+# --------------- DASHBOARD STATS -----------------
+ADMIN_STATS_TTL = int(os.environ.get("ADMIN_STATS_TTL", 5))  # seconds
+stats_cache = MemoryResponseCache(ttl=ADMIN_STATS_TTL, max_entries=1)
+
+ROLLUP_SOURCES = {
+    # kind: (model, item id column, day column, amount column)
+    'payment': (Payment, Payment.course_id, Payment.created_at, Payment.amount),
+    'project_enrollment': (ProjectEnrollment, ProjectEnrollment.project_id, ProjectEnrollment.created_at, ProjectEnrollment.amount),
+    'internship_application': (InternshipApplication, InternshipApplication.internship_id, InternshipApplication.date, None),
+}
+
+def upsert_rollup(day, kind, ref_id, status, count_delta, amount_delta, session=None):
+    """Atomically add deltas to one rollup row (creating it if needed)"""
+    session = session or db.session
+    if session.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(DashboardRollup.__table__).values(
+        day=day, kind=kind, ref_id=ref_id, status=status, count=count_delta, amount=amount_delta,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['day', 'kind', 'ref_id', 'status'],
+        set_={
+            'count': DashboardRollup.__table__.c.count + stmt.excluded.count,
+            'amount': DashboardRollup.__table__.c.amount + stmt.excluded.amount,
+        },
+    )
+    session.execute(stmt)
+
+def record_rollup(kind, created_at, ref_id, status, count_delta, amount=None, session=None):
+    """Apply a row insert (+1) or delete (-1) to the rollups in the current transaction"""
+    day = (created_at or datetime.utcnow()).date()
+    upsert_rollup(day, kind, ref_id, status or 'pending', count_delta, (amount or 0) * count_delta, session)
+
+def move_rollup(kind, created_at, ref_id, old_status, new_status, amount=None):
+    """Move one row between status buckets in the current transaction"""
+    if (old_status or 'pending') == (new_status or 'pending'):
+        return
+    record_rollup(kind, created_at, ref_id, old_status, -1, amount)
+    record_rollup(kind, created_at, ref_id, new_status, 1, amount)
+
+def rebuild_rollups():
+    """Recompute dashboard_rollups from the source tables; returns rows written"""
+    if db.engine.dialect.name == 'postgresql':
+        # Block writers for the duration so no increment lands between delete and insert
+        db.session.execute(db.text(
+            "LOCK TABLE payments, project_enrollments, internship_applications IN SHARE MODE"
+        ))
+    DashboardRollup.query.delete()
+    written = 0
+    for kind, (model, ref_column, day_column, amount_column) in ROLLUP_SOURCES.items():
+        day = db.func.date(day_column)
+        status = db.func.coalesce(model.payment_status, 'pending')
+        amount = db.func.coalesce(db.func.sum(amount_column), 0) if amount_column is not None else db.literal(0)
+        rows = (
+            db.session.query(day, ref_column, status, db.func.count(model.id), amount)
+            .group_by(day, ref_column, status)
+            .all()
+        )
+        for row_day, ref_id, row_status, count, total in rows:
+            if isinstance(row_day, str):
+                row_day = datetime.strptime(row_day, '%Y-%m-%d').date()
+            db.session.add(DashboardRollup(
+                day=row_day, kind=kind, ref_id=ref_id, status=row_status, count=count, amount=float(total or 0),
+            ))
+            written += 1
+    db.session.commit()
+    return written
+
+@api.cli.command("rebuild-rollups")
+def rebuild_rollups_command():
+    """Backfill / rebuild the dashboard_rollups table"""
+    written = rebuild_rollups()
+    invalidate_admin_stats()
+    print(f"Rebuilt dashboard rollups: {written} rows")
+
+def backfill_rollups():
+    """First start after the rollup table was added: backfill it once"""
+    try:
+        if not DashboardRollup.query.first() and (
+            Payment.query.first() or ProjectEnrollment.query.first() or InternshipApplication.query.first()
+        ):
+            current_app.logger.info("Backfilled dashboard rollups: %s rows", rebuild_rollups())
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error("Error backfilling dashboard rollups: %s", e)
+
+def rollup_breakdowns():
+    """Per-kind status breakdown summed from the rollups (O(days), not O(rows))"""
+    rows = (
+        db.session.query(
+            DashboardRollup.kind,
+            DashboardRollup.status,
+            db.func.sum(DashboardRollup.count),
+            db.func.sum(DashboardRollup.amount),
+        )
+        .group_by(DashboardRollup.kind, DashboardRollup.status)
+        .all()
+    )
+    summaries = {kind: {'total': 0, 'by_status': {}} for kind in ROLLUP_SOURCES}
+    for kind, status, count, amount in rows:
+        if kind not in summaries or not count:
+            continue
+        entry = {'count': int(count)}
+        if ROLLUP_SOURCES[kind][3] is not None:
+            entry['amount'] = float(amount or 0)
+        summaries[kind]['by_status'][status] = entry
+        summaries[kind]['total'] += int(count)
+    for kind, summary in summaries.items():
+        if ROLLUP_SOURCES[kind][3] is not None:
+            summary['revenue'] = summary['by_status'].get('completed', {}).get('amount', 0.0)
+    return summaries
+
+CATALOG_MODELS = {'courses': Course, 'internships': InternshipPosting, 'projects': ProjectPosting}
+
+def catalog_counts():
+    """{'courses': {'total', 'active'}, ...} for every catalog table in one round trip"""
+    columns = []
+    for model in CATALOG_MODELS.values():
+        columns.append(db.session.query(db.func.count(model.id)).scalar_subquery())
+        columns.append(db.session.query(db.func.count(model.id)).filter(model.is_active.is_(True)).scalar_subquery())
+    row = db.session.query(*columns).one()
+    return {name: {'total': row[2 * i], 'active': row[2 * i + 1]} for i, name in enumerate(CATALOG_MODELS)}
+
+def compute_admin_stats():
+    breakdowns = rollup_breakdowns()
+    return {
+        'payments': breakdowns['payment'],
+        'project_enrollments': breakdowns['project_enrollment'],
+        'internship_applications': breakdowns['internship_application'],
+        **catalog_counts(),
+        'generated_at': datetime.utcnow().isoformat(),
+    }
+
+def get_admin_stats():
+    stats, generation = stats_cache.get('admin', 'stats')
+    if stats is None:
+        stats = compute_admin_stats()
+        stats_cache.set('admin', 'stats', stats, generation)
+    return stats
+
+def invalidate_admin_stats():
+    stats_cache.invalidate('admin')
+
+@api.route("/admin/stats", methods=["GET"])
+@jwt_required()
+@query_budget(2)
+def get_dashboard_stats():
+    try:
+        return jsonify({'success': True, 'stats': get_admin_stats()})
+    except Exception as e:
+        current_app.logger.error("Error computing dashboard stats: %s", e)
+        return jsonify({'error': 'Failed to fetch stats'}), 500
+
+@api.route("/admin/stats/daily", methods=["GET"])
+@jwt_required()
+def get_daily_stats():
+    try:
+        days = max(1, min(request.args.get('days', 30, type=int), 366))
+        since = datetime.utcnow().date() - timedelta(days=days - 1)
+        rows = (
+            db.session.query(
+                DashboardRollup.day,
+                DashboardRollup.kind,
+                DashboardRollup.status,
+                db.func.sum(DashboardRollup.count),
+                db.func.sum(DashboardRollup.amount),
+            )
+            .filter(DashboardRollup.day >= since)
+            .group_by(DashboardRollup.day, DashboardRollup.kind, DashboardRollup.status)
+            .order_by(DashboardRollup.day)
+            .all()
+        )
+        series = [{
+            'day': day.isoformat(),
+            'kind': kind,
+            'status': status,
+            'count': int(count or 0),
+            'amount': float(amount or 0),
+        } for day, kind, status, count, amount in rows]
+        return jsonify({'success': True, 'since': since.isoformat(), 'daily': series})
+    except Exception as e:
+        current_app.logger.error("Error fetching daily stats: %s", e)
+        return jsonify({'error': 'Failed to fetch daily stats'}), 500
+
+@api.route("/admin/payments/<int:payment_id>/status", methods=["PUT"])
 @jwt_required()
 def update_payment_status(payment_id):
     data = parse_request_data()
@@ -1337,27 +1642,30 @@ def update_payment_status(payment_id):
         if not payment:
             return jsonify({'error': 'Payment not found'}), 404
         
+        old_status = payment.payment_status
         payment.payment_status = data.get('status', 'pending')
         payment.transaction_id = data.get('transaction_id')
         payment.updated_at = datetime.utcnow()
+        move_rollup('payment', payment.created_at, payment.course_id,
+                    old_status, payment.payment_status, payment.amount)
         
         db.session.commit()
+        invalidate_admin_stats()
         
         return jsonify({'success': True, 'message': 'Payment status updated'})
         
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"Error updating payment status: {e}")
+        current_app.logger.error("Error updating payment status: %s", e)
         return jsonify({'error': 'Failed to update payment status'}), 500
 
 # --------------- Keep existing endpoints ---------------------
 # (Your existing enroll, demo, inquire, pclinfo, internship endpoints remain unchanged)
 
-@app.route("/enroll", methods=["POST"])
+@api.route("/enroll", methods=["POST"])
 def enroll_course():
     data = parse_request_data()
-    app.logger.debug("/enroll data: %s", data)
-    handle_email_notification(data, use_enhanced=False)
+    current_app.logger.debug("/enroll fields: %s", sorted(data))
     
     try:
         entry = CourseEnrollment(
@@ -1368,53 +1676,48 @@ def enroll_course():
             message=data.get("message"),
         )
         db.session.add(entry)
+        enqueue_email_notification(data, use_enhanced=False)
         db.session.commit()
-        app.logger.info(f"Course enrollment saved with ID: {entry.id}")
-        return jsonify({"success": True, "enrollment_id": entry.id}), 201
+        current_app.logger.info("Course enrollment saved with ID: %s", entry.id, extra=SAMPLED)
     except Exception as e:
         db.session.rollback()
-        app.logger.error("DB insert error /enroll: %s", e)
+        current_app.logger.error("DB insert error /enroll: %s", e)
         return jsonify({"error": "Database insert failed"}), 500
 
+    handle_email_notification(data, use_enhanced=False)
+    return jsonify({"success": True, "enrollment_id": entry.id}), 201
+
 
-@app.route("/admin/internships", methods=["GET"])
+@api.route("/admin/internships", methods=["GET"])
 @jwt_required()
+@query_budget(1)
 def get_all_internships_admin():
     try:
-        internships = InternshipPosting.query.all()
-        internships_list = []
-        for internship in internships:
-            internships_list.append({
-                'id': internship.id,
-                'title': internship.title,
-                'description': internship.description,
-                'detailed_description': internship.detailed_description,
-                'category': internship.category,
-                'duration': internship.duration,
-                'internship_type': internship.internship_type,
-                'location': internship.location,
-                'skills': internship.skills,
-                'eligibility': internship.eligibility,
-                'perks': internship.perks,
-                'image_url': internship.image_url,
-                'internship_code': internship.internship_code,
-                'slug': internship.slug,
-                'is_active': internship.is_active,
-                'total_applications': internship.total_applications,
-                'created_at': internship.created_at.isoformat(),
-                'updated_at': internship.updated_at.isoformat()
-            })
-        return jsonify({'success': True, 'internships': internships_list})
+        query = apply_filters(InternshipPosting.query.options(INTERNSHIP_ADMIN.load_only(InternshipPosting)),
+                              status_column=InternshipPosting.is_active,
+                              date_column=InternshipPosting.created_at,
+                              search_columns=(InternshipPosting.title, InternshipPosting.category))
+        internships, pagination = keyset_paginate(
+            query, InternshipPosting.id,
+            {'id': InternshipPosting.id, 'title': InternshipPosting.title,
+             'created_at': InternshipPosting.created_at, 'updated_at': InternshipPosting.updated_at},
+            default_sort='-created_at',
+        )
+        internships_list = INTERNSHIP_ADMIN.many(internships)
+        return jsonify({'success': True, 'internships': internships_list, 'pagination': pagination})
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        app.logger.error(f"Error fetching internships: {e}")
+        current_app.logger.error("Error fetching internships: %s", e)
         return jsonify({'error': 'Failed to fetch internships'}), 500
 
 
-@app.route("/admin/internships", methods=["POST"])
+@api.route("/admin/internships", methods=["POST"])
 @jwt_required()
+@upload_fields(image='internship_image')
 def create_internship():
     try:
-        app.logger.info("Creating new internship...")
+        current_app.logger.info("Creating new internship...")
         
         # Handle file upload
         image_url = None
@@ -1422,10 +1725,10 @@ def create_internship():
             file = request.files['image']
             if file and file.filename:
                 try:
-                    image_url = save_internship_image(file)
-                    app.logger.info(f"Image saved: {image_url}")
-                except ValueError as e:
-                    return jsonify({'error': str(e)}), 400
+                    image_url = ingest_upload(file, 'internship_image').url
+                    current_app.logger.info("Image saved: %s", image_url)
+                except UploadError as e:
+                    return jsonify({'error': str(e)}), e.status
         
         # Get form data
         data = request.form.to_dict()
@@ -1453,13 +1756,8 @@ def create_internship():
             elif isinstance(perks_data, list):
                 perks = perks_data
         
-        # Generate unique slug and code
-        base_slug = data.get('title', '').lower().replace(' ', '-')
-        slug = base_slug
-        counter = 1
-        while InternshipPosting.query.filter_by(slug=slug).first():
-            slug = f"{base_slug}-{counter}"
-            counter += 1
+        # Base slug (suffix allocated on insert, see slugs.py) and code
+        base_slug = slugify(data.get('title', ''))
         
         internship_code = data.get('internship_code')
         if not internship_code:
@@ -1483,14 +1781,16 @@ def create_internship():
             perks=perks,
             image_url=final_image_url,
             internship_code=internship_code,
-            slug=slug,
             is_active=data.get('is_active', 'true').lower() == 'true'
         )
         
-        db.session.add(internship)
+        add_with_unique_slug(db.session, internship, base_slug)
+        retain_upload(internship.image_url)
         db.session.commit()
+        invalidate_cache("internships")
+        invalidate_admin_stats()
         
-        app.logger.info(f"Internship created successfully: {internship.id}")
+        current_app.logger.info("Internship created successfully: %s", internship.id)
         
         return jsonify({
             'success': True,
@@ -1502,32 +1802,32 @@ def create_internship():
         
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"Error creating internship: {e}")
-        import traceback
-        app.logger.error(traceback.format_exc())
+        current_app.logger.exception("Error creating internship")
         return jsonify({'error': str(e)}), 500
 
 
-@app.route("/admin/internships/<int:internship_id>", methods=["PUT"])
+@api.route("/admin/internships/<int:internship_id>", methods=["PUT"])
 @jwt_required()
+@upload_fields(image='internship_image')
 def update_internship(internship_id):
     try:
         internship = InternshipPosting.query.get(internship_id)
         if not internship:
             return jsonify({'error': 'Internship not found'}), 404
         
-        app.logger.info(f"Updating internship {internship_id}...")
+        current_app.logger.info("Updating internship %s...", internship_id)
+        old_image_url = internship.image_url
         
         # Handle file upload
         if 'image' in request.files:
             file = request.files['image']
             if file and file.filename:
                 try:
-                    image_url = save_internship_image(file)
+                    image_url = ingest_upload(file, 'internship_image').url
                     internship.image_url = image_url
-                    app.logger.info(f"New image uploaded: {image_url}")
-                except ValueError as e:
-                    return jsonify({'error': str(e)}), 400
+                    current_app.logger.info("New image uploaded: %s", image_url)
+                except UploadError as e:
+                    return jsonify({'error': str(e)}), e.status
         
         data = request.form.to_dict()
         
@@ -1567,9 +1867,13 @@ def update_internship(internship_id):
             internship.image_url = data['image_url']
         
         internship.updated_at = datetime.utcnow()
+        swap_upload_reference(old_image_url, internship.image_url)
         db.session.commit()
+        invalidate_cache("internships")
+        invalidate_admin_stats()
+        maybe_collect_upload_garbage()
         
-        app.logger.info(f"Internship {internship_id} updated successfully")
+        current_app.logger.info("Internship %s updated successfully", internship_id)
         
         return jsonify({
             'success': True,
@@ -1579,13 +1883,11 @@ def update_internship(internship_id):
         
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"Error updating internship: {e}")
-        import traceback
-        app.logger.error(traceback.format_exc())
+        current_app.logger.exception("Error updating internship")
         return jsonify({'error': str(e)}), 500
 
 
-@app.route("/admin/internships/<int:internship_id>", methods=["DELETE"])
+@api.route("/admin/internships/<int:internship_id>", methods=["DELETE"])
 @jwt_required()
 def delete_internship(internship_id):
     try:
@@ -1596,320 +1898,204 @@ def delete_internship(internship_id):
         internship.is_active = False  # Soft delete
         internship.updated_at = datetime.utcnow()
         db.session.commit()
+        invalidate_cache("internships")
+        invalidate_admin_stats()
         
         return jsonify({'success': True, 'message': 'Internship deleted successfully'})
         
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"Error deleting internship: {e}")
+        current_app.logger.error("Error deleting internship: %s", e)
         return jsonify({'error': 'Failed to delete internship'}), 500
 
 
 # Public endpoints for listing internships
-@app.route("/api/internships", methods=["GET"])
+@api.route("/api/internships", methods=["GET"])
+@cached_response("internships")
 def get_public_internships():
     try:
-        internships = InternshipPosting.query.filter_by(is_active=True).all()
-        internships_list = []
-        for internship in internships:
-            image_url = internship.image_url
-            if image_url and not image_url.startswith('http'):
-                image_url = f"http://localhost:7000{image_url}"
-            
-            internships_list.append({
-                'id': internship.id,
-                'title': internship.title,
-                'description': internship.description,
-                'category': internship.category,
-                'duration': internship.duration,
-                'internship_type': internship.internship_type,
-                'location': internship.location,
-                'image_url': image_url,
-                'slug': internship.slug,
-                'internship_code': internship.internship_code
-            })
-        return jsonify({'success': True, 'internships': internships_list})
+        internships = (InternshipPosting.query.options(INTERNSHIP_SUMMARY.load_only(InternshipPosting))
+                       .filter_by(is_active=True).all())
+        internships_list = INTERNSHIP_SUMMARY.many(internships)
+        response = jsonify({'success': True, 'internships': internships_list})
+        response.last_modified = catalog_last_modified(table_last_modified(InternshipPosting), internships)
+        return response
     except Exception as e:
-        app.logger.error(f"Error fetching public internships: {e}")
+        current_app.logger.error("Error fetching public internships: %s", e)
         return jsonify({'error': 'Failed to fetch internships'}), 500
 
 
-@app.route("/api/internships/<slug>", methods=["GET"])
+@api.route("/api/internships/<slug>", methods=["GET"])
+@cached_response("internships")
 def get_internship_by_slug(slug):
     try:
-        internship = InternshipPosting.query.filter_by(slug=slug, is_active=True).first()
+        internship = (InternshipPosting.query.options(INTERNSHIP_DETAIL.load_only(InternshipPosting, 'updated_at'))
+                      .filter_by(slug=slug, is_active=True).first())
         if not internship:
             return jsonify({'error': 'Internship not found'}), 404
         
-        image_url = internship.image_url
-        if image_url and not image_url.startswith('http'):
-            image_url = f"http://localhost:7000{image_url}"
-        
-        internship_data = {
-            'id': internship.id,
-            'title': internship.title,
-            'description': internship.description,
-            'detailed_description': internship.detailed_description,
-            'category': internship.category,
-            'duration': internship.duration,
-            'internship_type': internship.internship_type,
-            'location': internship.location,
-            'skills': internship.skills or [],
-            'eligibility': internship.eligibility,
-            'perks': internship.perks or [],
-            'image_url': image_url,
-            'slug': internship.slug,
-            'internship_code': internship.internship_code
-        }
-        return jsonify({'success': True, 'internship': internship_data})
+        response = jsonify({'success': True, 'internship': INTERNSHIP_DETAIL(internship)})
+        response.last_modified = catalog_last_modified(internship.updated_at, [internship])
+        return response
     except Exception as e:
-        app.logger.error(f"Error fetching internship: {e}")
+        current_app.logger.error("Error fetching internship: %s", e)
         return jsonify({'error': 'Failed to fetch internship'}), 500
 
 
-
 # ----------- INTERNSHIP APPLICATION ENDPOINTS -----------
 
-@app.route("/api/internship-applications", methods=["POST"])
+@api.route("/api/internship-applications", methods=["POST"])
+@upload_fields(resume='resume')
 def create_internship_application():
     try:
-        app.logger.info("=== Starting Internship Application Submission ===")
-        
-        # Log received form data
-        app.logger.info(f"Form data keys: {list(request.form.keys())}")
-        app.logger.info(f"Files: {list(request.files.keys())}")
-        
-        # Generate unique enrollment ID
-        enrollment_id = f"INT_APP_{str(uuid.uuid4())[:12].upper()}"
-        app.logger.info(f"Generated enrollment ID: {enrollment_id}")
+        current_app.logger.debug("/api/internship-applications fields: %s, files: %s",
+                                 sorted(request.form), sorted(request.files))
         
         # Get internship by slug
         internship_slug = request.form.get('internship_slug')
-        app.logger.info(f"Looking for internship with slug: {internship_slug}")
         
         if not internship_slug:
-            app.logger.error("Missing internship_slug")
+            current_app.logger.warning("Internship application without internship_slug")
             return jsonify({'error': 'Internship slug is required'}), 400
         
         internship = InternshipPosting.query.filter_by(slug=internship_slug).first()
         
         if not internship:
-            app.logger.error(f"Internship not found for slug: {internship_slug}")
+            current_app.logger.warning("Internship not found for slug: %s", internship_slug)
             return jsonify({'error': 'Internship not found'}), 404
         
-        app.logger.info(f"Found internship: {internship.title}")
-        
         # Validate validation code
         validation_code = request.form.get('validation_code', '').strip().lower()
-        app.logger.info(f"Validation code received: {validation_code}")
         
-        if validation_code != 'm2nz':
-            app.logger.error(f"Invalid validation code: {validation_code}")
+        if validation_code != PROJECT_VALIDATION_CODE:
+            current_app.logger.warning("Invalid validation code for internship %s", internship_slug)
             return jsonify({'error': 'Invalid validation code'}), 400
         
         # Validate required fields
-        required_fields = ['fname', 'lname', 'email', 'mobile', 'motivation']
-        missing_fields = [field for field in required_fields if not request.form.get(field)]
+        missing_fields = [field for field in INTERNSHIP_APPLICATION_REQUIRED if not request.form.get(field)]
         
         if missing_fields:
-            app.logger.error(f"Missing required fields: {missing_fields}")
+            current_app.logger.warning("Missing required fields: %s", missing_fields)
             return jsonify({'error': f'Missing required fields: {", ".join(missing_fields)}'}), 400
         
         # Handle resume upload
         resume_path = None
         if 'resume' in request.files:
             resume_file = request.files['resume']
-            app.logger.info(f"Resume file received: {resume_file.filename}")
             
             if resume_file and resume_file.filename:
                 try:
-                    # Create resumes directory if it doesn't exist
-                    resumes_dir = os.path.join(UPLOAD_FOLDER, 'resumes')
-                    os.makedirs(resumes_dir, exist_ok=True)
-                    app.logger.info(f"Resumes directory: {resumes_dir}")
-                    
-                    # Validate file
-                    if resume_file.content_length and resume_file.content_length > 5 * 1024 * 1024:
-                        return jsonify({'error': 'Resume file size exceeds 5MB limit'}), 400
-                    
-                    allowed_extensions = {'.pdf', '.doc', '.docx'}
-                    file_ext = os.path.splitext(resume_file.filename)[1].lower()
-                    
-                    if file_ext not in allowed_extensions:
-                        return jsonify({'error': 'Invalid resume format. Please upload PDF, DOC, or DOCX'}), 400
-                    
-                    # Save file
-                    filename = secure_filename(resume_file.filename)
-                    timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
-                    unique_filename = f"{timestamp}_{filename}"
-                    full_path = os.path.join(resumes_dir, unique_filename)
-                    
-                    resume_file.save(full_path)
-                    resume_path = f"/uploads/resumes/{unique_filename}"
-                    app.logger.info(f"Resume saved successfully: {resume_path}")
-                    
+                    # Size cap and type are checked on the bytes while streaming
+                    resume_path = ingest_upload(resume_file, 'resume').url
+                except UploadError as e:
+                    return jsonify({'error': str(e)}), e.status
                 except Exception as e:
-                    app.logger.error(f"Error saving resume: {e}")
-                    import traceback
-                    app.logger.error(traceback.format_exc())
+                    current_app.logger.exception("Error saving resume")
                     return jsonify({'error': f'Failed to upload resume: {str(e)}'}), 500
+        elif request.form.get('resume_token'):
+            # Uploaded straight to storage (see /api/uploads/presign)
+            try:
+                resume_path = claim_direct_upload(request.form['resume_token'], 'resume').url
+            except UploadError as e:
+                return jsonify({'error': str(e)}), e.status
         else:
-            app.logger.warning("No resume file in request")
+            current_app.logger.warning("Internship application without a resume")
             return jsonify({'error': 'Resume is required'}), 400
         
-        # Parse preferred start date
-        preferred_start_date = None
         date_str = request.form.get('preferred_start_date')
-        if date_str:
-            try:
-                preferred_start_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-                app.logger.info(f"Parsed start date: {preferred_start_date}")
-            except ValueError as e:
-                app.logger.warning(f"Invalid date format: {date_str} - {e}")
-                # Continue without date rather than failing
+        if date_str and parse_form_date(date_str) is None:
+            # Continue without date rather than failing
+            current_app.logger.warning("Invalid date format: %s", date_str)
         
         # Create application record
-        app.logger.info("Creating InternshipApplication record...")
-        
-        application = InternshipApplication(
-            enrollment_id=enrollment_id,
-            internship_id=internship.id,
-            fname=request.form.get('fname').strip(),
-            lname=request.form.get('lname').strip(),
-            email=request.form.get('email').strip(),
-            mobile=request.form.get('mobile').strip(),
-            experience_level=request.form.get('experience_level', 'Fresher'),
-            portfolio_url=request.form.get('portfolio_url', '').strip() or None,
-            github_url=request.form.get('github_url', '').strip() or None,
-            motivation=request.form.get('motivation').strip(),
-            resume_path=resume_path,
-            gstin=request.form.get('gstin', '').strip() or None,
-            billing_address=request.form.get('billing_address', '').strip() or None,
-            landmark=request.form.get('landmark', '').strip() or None,
-            district=request.form.get('district', '').strip() or None,
-            state=request.form.get('state', '').strip() or None,
-            preferred_start_date=preferred_start_date,
-            preferred_time=request.form.get('preferred_time', 'Full-Time'),
-            availability=request.form.get('availability', 'Immediate'),
-            payment_status='pending',
-            validation_code=validation_code
-        )
-        
-        db.session.add(application)
-        app.logger.info("Application added to session")
+        application, email_data = new_internship_application(request.form, internship, resume_path)
         
         # Update internship total applications
         internship.total_applications = (internship.total_applications or 0) + 1
-        app.logger.info(f"Updated total applications: {internship.total_applications}")
+        
+        add_submission('internship_application', application)
+        enqueue_email_notification(email_data)
         
         # Commit to database
         db.session.commit()
-        app.logger.info("Database commit successful")
         
         # Send email notification
         try:
-            email_data = {
-                'fullName': f"{request.form.get('fname')} {request.form.get('lname')}",
-                'email': request.form.get('email'),
-                'mobile': request.form.get('mobile'),
-                'internship': internship.title,
-                'enrollment_id': enrollment_id,
-                'experience_level': request.form.get('experience_level', 'Fresher')
-            }
             handle_email_notification(email_data)
-            app.logger.info("Email notification sent")
         except Exception as email_error:
             # Log but don't fail the request if email fails
-            app.logger.error(f"Email notification failed: {email_error}")
+            current_app.logger.error("Email notification failed: %s", email_error)
         
-        app.logger.info("=== Application submitted successfully ===")
+        current_app.logger.info("Internship application %s submitted for %s", application.enrollment_id,
+                                internship_slug, extra=SAMPLED)
         
         return jsonify({
             'success': True,
-            'enrollment_id': enrollment_id,
+            'enrollment_id': application.enrollment_id,
             'internship': internship.title,
             'message': 'Application submitted successfully'
         }), 201
         
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"=== ERROR in create_internship_application ===")
-        app.logger.error(f"Error: {str(e)}")
-        import traceback
-        app.logger.error(traceback.format_exc())
+        current_app.logger.exception("Error in create_internship_application")
         return jsonify({
             'error': 'Failed to submit application. Please try again.',
-            'details': str(e) if app.debug else None
+            'details': str(e) if current_app.debug else None
         }), 500
 
 
 # Keep only THIS ONE (remove the other)
-@app.route("/uploads/resumes/<filename>")
+@api.route("/uploads/resumes/<filename>")
 def serve_resume(filename):
-    try:
-        resumes_dir = os.path.join(UPLOAD_FOLDER, 'resumes')
-        if not os.path.exists(resumes_dir):
-            app.logger.error(f"Resumes directory does not exist: {resumes_dir}")
-            return jsonify({'error': 'Resumes directory not found'}), 404
-        
-        file_path = os.path.join(resumes_dir, filename)
-        if not os.path.exists(file_path):
-            app.logger.error(f"Resume file not found: {file_path}")
-            return jsonify({'error': 'Resume file not found'}), 404
-        
-        return send_from_directory(resumes_dir, filename)
-    except Exception as e:
-        app.logger.error(f"Error serving resume {filename}: {e}")
-        return jsonify({'error': 'Failed to serve resume'}), 500
+    response = send_upload(f"resumes/{filename}")
+    if response is None:
+        return jsonify({'error': 'Resume file not found'}), 404
+    return response
 
-@app.route("/admin/internship-applications", methods=["GET"])
+@api.route("/admin/internship-applications", methods=["GET"])
 @jwt_required()
+@query_budget(1)
 def get_all_internship_applications():
     try:
         # Join applications with internships to get full details
-        applications = db.session.query(
+        query = db.session.query(
             InternshipApplication, 
             InternshipPosting
-        ).join(InternshipPosting).all()
-        
-        applications_list = []
-        
-        for application, internship in applications:
-            applications_list.append({
-                'id': application.id,
-                'enrollment_id': application.enrollment_id,
-                'fname': application.fname,
-                'lname': application.lname,
-                'email': application.email,
-                'mobile': application.mobile,
-                'internship_title': internship.title,
-                'internship_slug': internship.slug,
-                'internship_code': internship.internship_code,
-                'experience_level': application.experience_level,
-                'portfolio_url': application.portfolio_url,
-                'github_url': application.github_url,
-                'motivation': application.motivation,
-                'resume_path': application.resume_path,
-                'gstin': application.gstin,
-                'billing_address': application.billing_address,
-                'district': application.district,
-                'state': application.state,
-                'preferred_start_date': application.preferred_start_date.isoformat() if application.preferred_start_date else None,
-                'preferred_time': application.preferred_time,
-                'availability': application.availability,
-                'payment_status': application.payment_status,
-                'date': application.date.isoformat(),
-                'updated_at': application.updated_at.isoformat()
-            })
-        
-        return jsonify({'success': True, 'applications': applications_list})
+        ).join(InternshipPosting).options(
+            INTERNSHIP_APPLICATION_ADMIN.load_only(InternshipApplication),
+            db.load_only(InternshipPosting.title, InternshipPosting.slug, InternshipPosting.internship_code),
+        )
+        query = apply_filters(query, status_column=InternshipApplication.payment_status,
+                              date_column=InternshipApplication.date,
+                              search_columns=(InternshipApplication.fname, InternshipApplication.lname,
+                                              InternshipApplication.email, InternshipApplication.enrollment_id,
+                                              InternshipPosting.title))
+        applications, pagination = keyset_paginate(
+            query, InternshipApplication.id,
+            {'id': InternshipApplication.id, 'date': InternshipApplication.date,
+             'updated_at': InternshipApplication.updated_at, 'fname': InternshipApplication.fname},
+            default_sort='-date',
+            primary=lambda row: row[0],
+        )
+        
+        applications_list = [
+            INTERNSHIP_APPLICATION_ADMIN(application, internship_title=internship.title,
+                                         internship_slug=internship.slug,
+                                         internship_code=internship.internship_code)
+            for application, internship in applications
+        ]
+        
+        return jsonify({'success': True, 'applications': applications_list, 'pagination': pagination})
         
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        app.logger.error(f"Error fetching internship applications: {e}")
+        current_app.logger.error("Error fetching internship applications: %s", e)
         return jsonify({'error': 'Failed to fetch applications'}), 500
 
 
-@app.route("/admin/internship-applications/<int:application_id>/status", methods=["PUT"])
+@api.route("/admin/internship-applications/<int:application_id>/status", methods=["PUT"])
 @jwt_required()
 def update_internship_application_status(application_id):
     data = parse_request_data()
@@ -1919,10 +2105,14 @@ def update_internship_application_status(application_id):
         if not application:
             return jsonify({'error': 'Application not found'}), 404
         
+        old_status = application.payment_status
         application.payment_status = data.get('status', 'pending')
         application.updated_at = datetime.utcnow()
+        move_rollup('internship_application', application.date, application.internship_id,
+                    old_status, application.payment_status)
         
         db.session.commit()
+        invalidate_admin_stats()
         
         return jsonify({
             'success': True, 
@@ -1931,11 +2121,11 @@ def update_internship_application_status(application_id):
         
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"Error updating application status: {e}")
+        current_app.logger.error("Error updating application status: %s", e)
         return jsonify({'error': 'Failed to update application status'}), 500
 
 
-@app.route("/admin/internship-applications/<int:application_id>", methods=["DELETE"])
+@api.route("/admin/internship-applications/<int:application_id>", methods=["DELETE"])
 @jwt_required()
 def delete_internship_application(application_id):
     try:
@@ -1943,64 +2133,56 @@ def delete_internship_application(application_id):
         if not application:
             return jsonify({'error': 'Application not found'}), 404
         
-        # Delete resume file if exists
-        if application.resume_path and os.path.exists(application.resume_path):
-            try:
-                os.remove(application.resume_path)
-            except Exception as e:
-                app.logger.warning(f"Failed to delete resume file: {e}")
+        # The resume file goes once nothing references it any more
+        release_upload(application.resume_path)
         
+        record_rollup('internship_application', application.date, application.internship_id,
+                      application.payment_status, -1)
         db.session.delete(application)
         db.session.commit()
+        invalidate_admin_stats()
+        maybe_collect_upload_garbage()
         
         return jsonify({'success': True, 'message': 'Application deleted'})
         
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"Error deleting application: {e}")
+        current_app.logger.error("Error deleting application: %s", e)
         return jsonify({'error': 'Failed to delete application'}), 500
 
     
 # ----------- projects APPLICATION ENDPOINTS -----------
 
-@app.route("/admin/projects", methods=["GET"])
+@api.route("/admin/projects", methods=["GET"])
 @jwt_required()
+@query_budget(1)
 def get_all_projects_admin():
     try:
-        projects = ProjectPosting.query.all()
-        projects_list = []
-        for project in projects:
-            projects_list.append({
-                'id': project.id,
-                'title': project.title,
-                'description': project.description,
-                'detailed_description': project.detailed_description,
-                'category': project.category,
-                'duration': project.duration,
-                'project_type': project.project_type,
-                'technologies': project.technologies,
-                'difficulty_level': project.difficulty_level,
-                'prerequisites': project.prerequisites,
-                'learning_outcomes': project.learning_outcomes,
-                'image_url': project.image_url,
-                'project_code': project.project_code,
-                'slug': project.slug,
-                'is_active': project.is_active,
-                'total_enrollments': project.total_enrollments,
-                'created_at': project.created_at.isoformat(),
-                'updated_at': project.updated_at.isoformat()
-            })
-        return jsonify({'success': True, 'projects': projects_list})
+        query = apply_filters(ProjectPosting.query.options(PROJECT_ADMIN.load_only(ProjectPosting)),
+                              status_column=ProjectPosting.is_active,
+                              date_column=ProjectPosting.created_at,
+                              search_columns=(ProjectPosting.title, ProjectPosting.category))
+        projects, pagination = keyset_paginate(
+            query, ProjectPosting.id,
+            {'id': ProjectPosting.id, 'title': ProjectPosting.title,
+             'created_at': ProjectPosting.created_at, 'updated_at': ProjectPosting.updated_at},
+            default_sort='-created_at',
+        )
+        projects_list = PROJECT_ADMIN.many(projects)
+        return jsonify({'success': True, 'projects': projects_list, 'pagination': pagination})
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        app.logger.error(f"Error fetching projects: {e}")
+        current_app.logger.error("Error fetching projects: %s", e)
         return jsonify({'error': 'Failed to fetch projects'}), 500
 
 # Update create_project endpoint to handle pricing fields
-@app.route("/admin/projects", methods=["POST"])
+@api.route("/admin/projects", methods=["POST"])
 @jwt_required()
+@upload_fields(image='project_image')
 def create_project():
     try:
-        app.logger.info("Creating new project...")
+        current_app.logger.info("Creating new project...")
         
         # Handle file upload
         image_url = None
@@ -2008,10 +2190,10 @@ def create_project():
             file = request.files['image']
             if file and file.filename:
                 try:
-                    image_url = save_project_image(file)
-                    app.logger.info(f"Image saved: {image_url}")
-                except ValueError as e:
-                    return jsonify({'error': str(e)}), 400
+                    image_url = ingest_upload(file, 'project_image').url
+                    current_app.logger.info("Image saved: %s", image_url)
+                except UploadError as e:
+                    return jsonify({'error': str(e)}), e.status
         
         # Get form data
         data = request.form.to_dict()
@@ -2050,13 +2232,8 @@ def create_project():
             elif isinstance(outcomes_data, list):
                 learning_outcomes = outcomes_data
         
-        # Generate unique slug and code
-        base_slug = data.get('title', '').lower().replace(' ', '-')
-        slug = base_slug
-        counter = 1
-        while ProjectPosting.query.filter_by(slug=slug).first():
-            slug = f"{base_slug}-{counter}"
-            counter += 1
+        # Base slug (suffix allocated on insert, see slugs.py) and code
+        base_slug = slugify(data.get('title', ''))
         
         project_code = data.get('project_code')
         if not project_code:
@@ -2081,7 +2258,6 @@ def create_project():
             learning_outcomes=learning_outcomes,
             image_url=final_image_url,
             project_code=project_code,
-            slug=slug,
             is_active=data.get('is_active', 'true').lower() == 'true',
             # NEW PRICING FIELDS
             price=data.get('price', ''),
@@ -2094,10 +2270,13 @@ def create_project():
             students_count=data.get('students_count', '0')
         )
         
-        db.session.add(project)
+        add_with_unique_slug(db.session, project, base_slug)
+        retain_upload(project.image_url)
         db.session.commit()
+        invalidate_cache("projects")
+        invalidate_admin_stats()
         
-        app.logger.info(f"Project created successfully: {project.id}")
+        current_app.logger.info("Project created successfully: %s", project.id)
         
         return jsonify({
             'success': True,
@@ -2109,33 +2288,33 @@ def create_project():
         
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"Error creating project: {e}")
-        import traceback
-        app.logger.error(traceback.format_exc())
+        current_app.logger.exception("Error creating project")
         return jsonify({'error': str(e)}), 500
 
 
 # Update update_project endpoint to handle pricing fields
-@app.route("/admin/projects/<int:project_id>", methods=["PUT"])
+@api.route("/admin/projects/<int:project_id>", methods=["PUT"])
 @jwt_required()
+@upload_fields(image='project_image')
 def update_project(project_id):
     try:
         project = ProjectPosting.query.get(project_id)
         if not project:
             return jsonify({'error': 'Project not found'}), 404
         
-        app.logger.info(f"Updating project {project_id}...")
+        current_app.logger.info("Updating project %s...", project_id)
+        old_image_url = project.image_url
         
         # Handle file upload
         if 'image' in request.files:
             file = request.files['image']
             if file and file.filename:
                 try:
-                    image_url = save_project_image(file)
+                    image_url = ingest_upload(file, 'project_image').url
                     project.image_url = image_url
-                    app.logger.info(f"New image uploaded: {image_url}")
-                except ValueError as e:
-                    return jsonify({'error': str(e)}), 400
+                    current_app.logger.info("New image uploaded: %s", image_url)
+                except UploadError as e:
+                    return jsonify({'error': str(e)}), e.status
         
         data = request.form.to_dict()
         
@@ -2190,9 +2369,13 @@ def update_project(project_id):
             project.image_url = data['image_url']
         
         project.updated_at = datetime.utcnow()
+        swap_upload_reference(old_image_url, project.image_url)
         db.session.commit()
+        invalidate_cache("projects")
+        invalidate_admin_stats()
+        maybe_collect_upload_garbage()
         
-        app.logger.info(f"Project {project_id} updated successfully")
+        current_app.logger.info("Project %s updated successfully", project_id)
         
         return jsonify({
             'success': True,
@@ -2202,12 +2385,10 @@ def update_project(project_id):
         
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"Error updating project: {e}")
-        import traceback
-        app.logger.error(traceback.format_exc())
+        current_app.logger.exception("Error updating project")
         return jsonify({'error': str(e)}), 500
 
-@app.route("/admin/projects/<int:project_id>", methods=["DELETE"])
+@api.route("/admin/projects/<int:project_id>", methods=["DELETE"])
 @jwt_required()
 def delete_project(project_id):
     try:
@@ -2218,64 +2399,113 @@ def delete_project(project_id):
         project.is_active = False  # Soft delete
         project.updated_at = datetime.utcnow()
         db.session.commit()
+        invalidate_cache("projects")
+        invalidate_admin_stats()
         
         return jsonify({'success': True, 'message': 'Project deleted successfully'})
         
     except Exception as e:
         db.session.rollback()
-        app.logger.error(f"Error deleting project: {e}")
+        current_app.logger.error("Error deleting project: %s", e)
         return jsonify({'error': 'Failed to delete project'}), 500
 
 
 # Public endpoints for listing projects
-@app.route("/api/projects", methods=["GET"])
+@api.route("/api/projects", methods=["GET"])
+@cached_response("projects")
 def get_public_projects():
     try:
-        projects = ProjectPosting.query.filter_by(is_active=True).all()
-        projects_list = []
-        for project in projects:
-            image_url = project.image_url
-            if image_url and not image_url.startswith('http'):
-                image_url = f"http://localhost:7000{image_url}"
-            
-            projects_list.append({
-                'id': project.id,
-                'title': project.title,
-                'description': project.description,
-                'category': project.category,
-                'duration': project.duration,
-                'project_type': project.project_type,
-                'difficulty_level': project.difficulty_level,
-                'technologies': project.technologies or [],
-                'image_url': image_url,
-                'slug': project.slug,
-                'project_code': project.project_code,
-                'total_enrollments': project.total_enrollments
-            })
-        return jsonify({'success': True, 'projects': projects_list})
+        projects = (ProjectPosting.query.options(PROJECT_SUMMARY.load_only(ProjectPosting))
+                    .filter_by(is_active=True).all())
+        projects_list = PROJECT_SUMMARY.many(projects)
+        response = jsonify({'success': True, 'projects': projects_list})
+        response.last_modified = catalog_last_modified(table_last_modified(ProjectPosting), projects)
+        return response
     except Exception as e:
-        app.logger.error(f"Error fetching public projects: {e}")
+        current_app.logger.error("Error fetching public projects: %s", e)
         return jsonify({'error': 'Failed to fetch projects'}), 500
 
 # --------------- static serving -----------------
 
-@app.route("/", defaults={"path": ""})
-@app.route("/<path:path>")
+@api.route("/", defaults={"path": ""})
+@api.route("/<path:path>")
 def serve(path):
-    if path != "" and os.path.exists(os.path.join(app.static_folder, path)):
-        return send_from_directory(app.static_folder, path)
-    index_file = os.path.join(app.static_folder, "index.html")
+    if path != "" and os.path.exists(os.path.join(current_app.static_folder, path)):
+        return send_from_directory(current_app.static_folder, path)
+    index_file = os.path.join(current_app.static_folder, "index.html")
     if os.path.exists(index_file):
-        return send_from_directory(app.static_folder, "index.html")
+        return send_from_directory(current_app.static_folder, "index.html")
     return jsonify({"error": "Frontend not found"}), 404
 
-@app.route("/health", methods=["GET"])
+@api.route("/admin/cache/stats", methods=["GET"])
+@jwt_required()
+def get_cache_stats():
+    return jsonify({'success': True, 'cache': response_cache.stats()})
+
+@api.route("/admin/db/pool", methods=["GET"])
+@jwt_required()
+def get_db_pool_stats():
+    return jsonify({'success': True, 'pools': pool_stats()})
+
+@api.route("/metrics", methods=["GET"])
+def get_metrics():
+    # Prometheus scrape target; see metrics.py
+    body = metrics.render_metrics(pools=pool_stats(), cache_stats=response_cache.stats())
+    return current_app.response_class(body, content_type=metrics.CONTENT_TYPE)
+
+@api.route("/health", methods=["GET"])
 def health_check():
     return jsonify({
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat()
     })
 
+# --------------- app factory -----------------
+def create_app(config=None, initialize=True):
+    """
+    Build the Flask app. `config` overrides settings (e.g. the database
+    URI); with `initialize` the schema is migrated and the default admin /
+    rollups are created before the app is returned. Production servers
+    load it through wsgi.py (see gunicorn.conf.py).
+    """
+    # Refuse to start on unsafe upload settings (e.g. s3 without UPLOAD_SIGNING_KEY)
+    check_storage_config()
+    app = Flask(__name__, static_folder=FRONTEND_DIR, static_url_path="")
+    app.request_class = UploadRequest
+    app.json = JSONProvider(app)
+    CORS(app)
+
+    # JWT Configuration
+    app.config['JWT_SECRET_KEY'] = 'your-secret-key-change-this'  # Change this in production
+    # Uploads: Werkzeug stops reading bodies over this size and we answer 413.
+    # File fields declared with @upload_fields are written to their staging
+    # file while the body is parsed, with the per-kind cap and hash applied
+    # on the fly (UploadRequest, uploads.StagedUpload)
+    app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_SIZE
+    app.config["SQLALCHEMY_DATABASE_URI"] = SQLALCHEMY_DATABASE_URI
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config.update(config or {})
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config["SQLALCHEMY_DATABASE_URI"]))
+
+    setup_logging()
+    logconfig.init_app(app)
+
+    db.init_app(app)
+    jwt.init_app(app)
+    metrics.init_app(app)
+    if querywatch.QUERY_WATCH != 'off':
+        querywatch.init_app(app)
+    app.register_blueprint(api)
+    with app.app_context():
+        configure_engine(db.engine)
+
+    if initialize:
+        with app.app_context():
+            initialize_database()
+            backfill_rollups()
+    return app
+
 if __name__ == "__main__":
-    app.run(debug=True, host="0.0.0.0", port=7000)
+    # Development server; run production through gunicorn (gunicorn.conf.py)
+    create_app().run(debug=os.environ.get("FLASK_DEBUG", "true").lower() == "true", host="0.0.0.0", port=7000)
     
\ No newline at end of file
@@ -0,0 +1,142 @@
+# backend/dbpool.py
+"""
+Connection pool instrumentation.
+
+connection.py builds the engine options (DB_POOL_* settings); this module
+supplies the pool classes and the counters behind /admin/db/pool:
+
+    checkouts / checkins   connections handed out / returned
+    connects               new DBAPI connections opened
+    invalidations          connections dropped as dead (pre-ping, disconnects)
+    timeouts               checkouts that gave up after DB_POOL_TIMEOUT
+    wait                   time spent waiting for a connection (sum, max and
+                           cumulative buckets, in seconds)
+    size / checked_out / overflow / checked_in
+                           current state of the pool
+
+A busy pool shows up as growing wait times and overflow before it shows up
+as timeouts; raise DB_POOL_SIZE (and check max_connections) or add
+PgBouncer when that happens.
+"""
+import time
+import logging
+import threading
+from bisect import bisect_left
+
+from sqlalchemy import event
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Upper bounds of the wait-time buckets, seconds
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """Thread-safe counters for one engine's pool"""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._counts = {'checkouts': 0, 'checkins': 0, 'connects': 0, 'invalidations': 0, 'timeouts': 0}
+        self._wait_buckets = [0] * (len(POOL_WAIT_BUCKETS) + 1)
+        self._wait_sum = 0.0
+        self._wait_max = 0.0
+        self.pool = None
+
+    def count(self, key):
+        with self._lock:
+            self._counts[key] += 1
+
+    def observe_wait(self, seconds):
+        with self._lock:
+            self._wait_buckets[bisect_left(POOL_WAIT_BUCKETS, seconds)] += 1
+            self._wait_sum += seconds
+            self._wait_max = max(self._wait_max, seconds)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counts)
+            buckets, total = {}, 0
+            for bound, count in zip(POOL_WAIT_BUCKETS + (float('inf'),), self._wait_buckets):
+                total += count
+                buckets[str(bound)] = total
+            stats['wait'] = {
+                'count': total,
+                'sum': round(self._wait_sum, 6),
+                'max': round(self._wait_max, 6),
+                'buckets': buckets,
+            }
+        pool = self.pool
+        if isinstance(pool, QueuePool):
+            stats.update(size=pool.size(), checked_out=pool.checkedout(),
+                         overflow=max(pool.overflow(), 0), checked_in=pool.checkedin())
+        stats['pool'] = type(pool).__name__ if pool is not None else None
+        return stats
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited to its PoolMetrics"""
+
+    metrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except sa_exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.count('timeouts')
+                logger.warning("Connection pool %s exhausted: %s", self.metrics.name, self.status())
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe_wait(time.perf_counter() - start)
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool; keep reporting to the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        if self.metrics is not None:
+            self.metrics.pool = pool
+        return pool
+
+
+class TimedAsyncAdaptedQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    """TimedQueuePool for asyncio engines (asyncapi.py)"""
+
+
+POOL_METRICS = {}
+
+
+def instrument_engine(engine, name='default'):
+    """Count `engine`'s pool events under `name`; returns its PoolMetrics"""
+    metrics = POOL_METRICS.get(name)
+    if metrics is None:
+        metrics = POOL_METRICS[name] = PoolMetrics(name)
+    metrics.pool = engine.pool
+    if isinstance(engine.pool, TimedQueuePool):
+        engine.pool.metrics = metrics
+
+    # Listeners on the engine carry over to the pool that replaces it on dispose()
+    event.listen(engine, 'checkout', lambda *args: metrics.count('checkouts'))
+    event.listen(engine, 'checkin', lambda *args: metrics.count('checkins'))
+    event.listen(engine, 'connect', lambda *args: metrics.count('connects'))
+    event.listen(engine, 'invalidate', lambda *args: metrics.count('invalidations'))
+    return metrics
+
+
+def set_statement_timeout_per_transaction(engine, timeout_ms):
+    """
+    Apply statement_timeout with SET LOCAL at the start of every
+    transaction. Used behind PgBouncer in transaction mode, which rejects
+    the startup option and would leak a session-level SET to other clients.
+    """
+    @event.listens_for(engine, 'begin')
+    def set_timeout(conn):
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+
+
+def pool_stats():
+    return {name: metrics.stats() for name, metrics in POOL_METRICS.items()}
@@ -0,0 +1,100 @@
+# backend/gunicorn.conf.py
+"""
+Gunicorn settings for the API. Every value can be overridden with the
+environment variable next to it.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Worker classes (GUNICORN_WORKER_CLASS):
+    sync      one request at a time per process; simplest, needs the most
+              processes for the same concurrency
+    gthread   GUNICORN_THREADS threads per process (default). Requests
+              mostly wait on PostgreSQL, storage and SMTP, so threads give
+              concurrency without a process per request
+    gevent    green threads, GUNICORN_WORKER_CONNECTIONS per process; needs
+              `pip install gevent psycogreen` (psycopg2 is patched in
+              post_fork) and IMAGE_PROCESSING=thread, as a process pool
+              does not mix with gevent's monkey patching
+
+Start with WEB_CONCURRENCY = 2-4 x CPU cores and measure with loadtest.py.
+
+Graceful reload: `kill -HUP <master pid>` starts workers with the new code
+and lets the old ones finish in-flight requests (up to graceful_timeout).
+GUNICORN_RELOAD=true restarts on code changes, for development only.
+Workers are recycled after max_requests (+ jitter) to cap memory growth
+from image processing.
+
+The master never imports the app: workers import it themselves after the
+fork, so a HUP or reload picks up new code. Pending migrations (plus the
+default admin and rollups) are applied by `python migrate.py initialize`
+in a child process before the first workers start and again on every HUP.
+The workers then skip that step (APP_INITIALIZE=false).
+
+Response cache (cache.py): without CACHE_REDIS_URL every worker keeps its
+own in-memory cache, and an admin write only invalidates the cache of the
+worker that handled it. The other workers keep serving the old catalog
+until their entries expire. So with more than one worker and no Redis,
+CACHE_TTL is capped at CACHE_MULTI_WORKER_TTL (default 5 seconds): edits
+show up everywhere within that time, at the price of roughly one cache
+miss per worker and endpoint every few seconds. Set CACHE_REDIS_URL to
+share one cache, and its invalidation, between all workers; the full
+CACHE_TTL then applies.
+"""
+import os
+import sys
+import subprocess
+import multiprocessing
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:7000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 100))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 100))
+reload = os.environ.get("GUNICORN_RELOAD", "false").lower() == "true"
+
+# Workers import cache.py after the fork and read CACHE_TTL from this environment
+CACHE_MULTI_WORKER_TTL = int(os.environ.get("CACHE_MULTI_WORKER_TTL", 5))
+cache_ttl_capped = (workers > 1 and not os.environ.get("CACHE_REDIS_URL")
+                    and int(os.environ.get("CACHE_TTL", 300)) > CACHE_MULTI_WORKER_TTL)
+if cache_ttl_capped:
+    os.environ["CACHE_TTL"] = str(CACHE_MULTI_WORKER_TTL)
+
+# Each worker builds its own app (own DB connection pool, own image pool)
+preload_app = False
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+
+MIGRATE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrate.py")
+
+
+def initialize_database(server):
+    # Once here instead of in every worker; a failed migration stops the start
+    server.log.info("Running %s initialize", MIGRATE_SCRIPT)
+    subprocess.run([sys.executable, MIGRATE_SCRIPT, "initialize"], check=True)
+
+
+def on_starting(server):
+    if cache_ttl_capped:
+        server.log.warning("%s workers without CACHE_REDIS_URL: response cache TTL capped at %ss",
+                           workers, CACHE_MULTI_WORKER_TTL)
+    initialize_database(server)
+    os.environ["APP_INITIALIZE"] = "false"
+
+
+def on_reload(server):
+    initialize_database(server)
+
+
+def post_fork(server, worker):
+    if worker_class == "gevent":
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
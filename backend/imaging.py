@@ -0,0 +1,236 @@
+# backend/imaging.py
+"""
+Background optimization of uploaded images.
+
+Upload helpers save the raw file and return its URL straight away; the
+resize / recompress runs later in a worker pool. The optimized image is
+written to a temporary file next to the original and swapped in with
+os.replace, so the URL stored on the record never changes and readers see
+either the complete original or the complete optimized file.
+
+The pipeline is the list of steps in IMAGE_PIPELINE; each step takes and
+returns a PIL image, so new steps can be appended without touching the
+upload code.
+
+Catalog images additionally get responsive derivatives, generated once:
+one file per IMAGE_DERIVATIVE_WIDTHS entry (never wider than the original)
+and per IMAGE_DERIVATIVE_FORMATS entry, named "<name>-<width>.<ext>" next to
+the upload, plus a "<name>.srcset.json" manifest that existing_derivatives()
+reads to build srcset values.
+
+IMAGE_PROCESSING selects where the work runs:
+    process   ProcessPoolExecutor with IMAGE_WORKERS processes (default)
+    thread    ThreadPoolExecutor (no extra processes, still off the request)
+    inline    in the calling thread, the old behaviour
+"""
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from PIL import Image
+
+from metrics import observe
+
+IMAGE_PROCESSING = os.environ.get("IMAGE_PROCESSING", "process").lower()
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", 2))
+IMAGE_MAX_WIDTH = int(os.environ.get("IMAGE_MAX_WIDTH", 1200))
+IMAGE_QUALITY = int(os.environ.get("IMAGE_QUALITY", 85))
+IMAGE_DERIVATIVE_WIDTHS = [int(w) for w in os.environ.get("IMAGE_DERIVATIVE_WIDTHS", "320,640,1200").split(",")]
+# Add "avif" when the installed Pillow can encode it; it is much slower to encode
+IMAGE_DERIVATIVE_FORMATS = [f.strip().lower() for f in os.environ.get("IMAGE_DERIVATIVE_FORMATS", "webp,jpeg").split(",")]
+
+# format name -> (file extension, Pillow save options)
+DERIVATIVE_ENCODERS = {
+    'avif': ('avif', {'quality': 60}),
+    'webp': ('webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', {'quality': IMAGE_QUALITY, 'optimize': True, 'progressive': True}),
+}
+
+logger = logging.getLogger(__name__)
+
+
+def convert_to_rgb(img):
+    if img.mode in ('RGBA', 'LA', 'P'):
+        return img.convert('RGB')
+    return img
+
+
+def limit_width(img, max_width=IMAGE_MAX_WIDTH):
+    if img.width > max_width:
+        ratio = max_width / img.width
+        new_size = (max_width, int(img.height * ratio))
+        return img.resize(new_size, Image.Resampling.LANCZOS)
+    return img
+
+
+IMAGE_PIPELINE = [convert_to_rgb, limit_width]
+
+
+def optimize_image(path, quality=IMAGE_QUALITY):
+    """
+    Run IMAGE_PIPELINE over the image at `path` and atomically replace it.
+    Returns True if the file was replaced. Runs inside the worker pool, so
+    it must stay a plain module-level function.
+    """
+    if not os.path.exists(path):
+        # Record (and file) deleted before we got to it
+        return False
+
+    directory, name = os.path.split(path)
+    tmp_path = os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+    try:
+        with Image.open(path) as img:
+            image_format = img.format
+            for step in IMAGE_PIPELINE:
+                img = step(img)
+            img.save(tmp_path, format=image_format, quality=quality, optimize=True)
+
+        # Keep the upload if "optimizing" made it bigger
+        if os.path.getsize(tmp_path) >= os.path.getsize(path):
+            return False
+        os.replace(tmp_path, path)
+        return True
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def derivative_path(path, width, image_format):
+    stem = os.path.splitext(path)[0]
+    return f"{stem}-{width}.{DERIVATIVE_ENCODERS[image_format][0]}"
+
+
+def derivative_widths(original_width):
+    """Configured widths below the original, plus the original capped at the largest"""
+    widths = {w for w in IMAGE_DERIVATIVE_WIDTHS if w < original_width}
+    widths.add(min(original_width, max(IMAGE_DERIVATIVE_WIDTHS)))
+    return sorted(widths)
+
+
+def save_atomically(img, path, **options):
+    directory, name = os.path.split(path)
+    tmp_path = os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+    try:
+        img.save(tmp_path, **options)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def generate_derivatives(path):
+    """Write every width/format derivative of `path`; returns how many were written"""
+    if not os.path.exists(path):
+        return 0
+
+    manifest = {image_format: [] for image_format in IMAGE_DERIVATIVE_FORMATS}
+    with Image.open(path) as img:
+        img = convert_to_rgb(img)
+        for width in derivative_widths(img.width):
+            height = max(1, round(img.height * width / img.width))
+            resized = img if width == img.width else img.resize((width, height), Image.Resampling.LANCZOS)
+            for image_format in IMAGE_DERIVATIVE_FORMATS:
+                target = derivative_path(path, width, image_format)
+                save_atomically(resized, target, format=image_format.upper(),
+                                **DERIVATIVE_ENCODERS[image_format][1])
+                manifest[image_format].append((width, os.path.basename(target)))
+
+    # Written last, so readers only ever see complete sets
+    tmp_path = f"{manifest_path(path)}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path(path))
+    return sum(len(entries) for entries in manifest.values())
+
+
+def manifest_path(path):
+    return f"{os.path.splitext(path)[0]}.srcset.json"
+
+
+def existing_derivatives(path):
+    """{format: [(width, path), ...]} from the manifest of `path`, {} if none yet"""
+    try:
+        with open(manifest_path(path)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    directory = os.path.dirname(path)
+    return {
+        image_format: [(width, os.path.join(directory, name)) for width, name in entries]
+        for image_format, entries in manifest.items()
+    }
+
+
+def process_image(path, derivatives=False):
+    """
+    Worker entry point: optimize the upload, then build derivatives if
+    asked. Returns the seconds spent, which the parent records (metrics
+    taken inside a pool process would never be scraped).
+    """
+    start = time.perf_counter()
+    optimize_image(path)
+    if derivatives:
+        generate_derivatives(path)
+    return time.perf_counter() - start
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Pool is created on first use so importing this module stays cheap"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            if IMAGE_PROCESSING == 'thread':
+                _executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix='image')
+            else:
+                _executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+        return _executor
+
+
+def _log_result(path, future, on_done=None):
+    error = future.exception()
+    if error is not None:
+        logger.warning("Image optimization failed for %s: %s", path, error)
+    else:
+        observe('image', future.result())
+    if on_done:
+        on_done()
+
+
+def schedule_image_optimization(path, derivatives=False, on_done=None):
+    """
+    Optimize `path` (and build its derivatives) in the background, or
+    inline, see IMAGE_PROCESSING. `on_done` is called without arguments once
+    the work finished, e.g. to drop cached responses that list the image.
+    """
+    if IMAGE_PROCESSING == 'inline':
+        try:
+            observe('image', process_image(path, derivatives))
+        except Exception as e:
+            logger.warning("Image optimization failed for %s: %s", path, e)
+        if on_done:
+            on_done()
+        return None
+
+    try:
+        future = get_executor().submit(process_image, path, derivatives)
+    except BrokenExecutor:
+        # A worker died (e.g. OOM on a huge image); start a fresh pool
+        shutdown_image_workers(wait=False)
+        future = get_executor().submit(process_image, path, derivatives)
+    future.add_done_callback(lambda f: _log_result(path, f, on_done))
+    return future
+
+
+def shutdown_image_workers(wait=True):
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
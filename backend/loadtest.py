@@ -0,0 +1,121 @@
+# backend/loadtest.py
+"""
+Closed-loop HTTP load test: CONCURRENCY client threads request the given
+paths in turn for DURATION seconds, then requests/sec and latency
+percentiles are printed. Standard library only.
+
+    python loadtest.py --url http://localhost:7000 --concurrency 32 --duration 20 \\
+        /api/courses /api/internships /api/projects /health
+
+Comparing worker models: start the server, run the test, repeat with
+another setting and compare req/s at the same concurrency, e.g.
+
+    WEB_CONCURRENCY=1 GUNICORN_WORKER_CLASS=sync gunicorn -c gunicorn.conf.py wsgi:app
+    WEB_CONCURRENCY=4 GUNICORN_WORKER_CLASS=sync gunicorn -c gunicorn.conf.py wsgi:app
+    WEB_CONCURRENCY=4 GUNICORN_WORKER_CLASS=gthread GUNICORN_THREADS=4 gunicorn -c gunicorn.conf.py wsgi:app
+    python connection.py   # the old single-process dev server, for reference
+
+Throughput grows with workers until the CPU cores (or the database) are
+saturated. Use a client machine other than the server when measuring
+CPU-bound endpoints, or the client threads compete with the workers.
+
+Reference run on a 1 vCPU container (client on the same core), sqlite,
+concurrency 16, 15 s, paths /api/courses /api/internships /api/projects /health:
+
+    server                                   req/s     p50 ms   p95 ms   p99 ms
+    python connection.py (dev server)          602      26.1     37.8     54.7
+    gunicorn sync, 1 worker                    528      24.6     29.2    392.1
+    gunicorn gthread, 2 workers x 4 threads    522      25.0     43.9     62.9
+
+With a single core, all three are CPU-bound at about the same throughput,
+so this run does not show scaling. The gthread workers keep the tail
+latency of the single sync worker down. On multi-core hosts, and for
+requests that wait on PostgreSQL, storage or SMTP, throughput grows with
+workers and threads until cores or the database saturate. Re-run the
+comparison there before picking WEB_CONCURRENCY.
+"""
+import sys
+import time
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from collections import Counter
+
+
+def worker(base_url, paths, deadline, latencies, statuses, lock):
+    index = 0
+    local_latencies = []
+    local_statuses = Counter()
+    while time.monotonic() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        started = time.monotonic()
+        try:
+            with urllib.request.urlopen(base_url + path, timeout=30) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except Exception:
+            status = 'error'
+        local_latencies.append(time.monotonic() - started)
+        local_statuses[status] += 1
+    with lock:
+        latencies.extend(local_latencies)
+        statuses.update(local_statuses)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def run(base_url, paths, concurrency, duration):
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=worker, args=(base_url, paths, deadline, latencies, statuses, lock))
+        for _ in range(concurrency)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'statuses': dict(statuses),
+    }
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('paths', nargs='*', default=['/api/courses', '/health'])
+    parser.add_argument('--url', default='http://localhost:7000')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=15)
+    args = parser.parse_args(argv)
+
+    # One request per path first, so caches and connection pools are warm
+    run(args.url, args.paths, 1, 1)
+    result = run(args.url, args.paths, args.concurrency, args.duration)
+    print(f"{result['requests']} requests in {args.duration:.0f}s with {args.concurrency} clients")
+    print(f"{result['rps']:.0f} req/s  p50 {result['p50_ms']:.1f} ms  "
+          f"p95 {result['p95_ms']:.1f} ms  p99 {result['p99_ms']:.1f} ms")
+    print(f"statuses: {result['statuses']}")
+    return 0 if set(result['statuses']) <= {200, 304} else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
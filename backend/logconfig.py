@@ -0,0 +1,209 @@
+# backend/logconfig.py
+"""
+Logging setup shared by the Flask app, asyncapi.py and the mail worker.
+
+    LOG_LEVEL        root level (default INFO; DEBUG adds request payload keys,
+                     SMTP pool stats and the like)
+    LOG_FORMAT       text (default) or json, one object per line with
+                     timestamp, level, logger, message, request_id and any
+                     `extra={...}` fields, for log shippers
+    LOG_SAMPLE_RATE  share of requests whose sampled events are kept
+                     (default 1.0). High-volume INFO events such as "payment
+                     created" are logged with extra=SAMPLED; warnings and
+                     errors are never dropped. The choice is made per request
+                     id, so a kept request keeps all of its sampled lines
+    LOG_QUEUE        true (default): the request thread only puts records on
+                     a queue and a QueueListener thread formats and writes
+                     them, so slow stderr/journald writes stay off the
+                     request path
+
+Every request gets an id, taken from an incoming X-Request-ID header (as
+set by a proxy) or generated, returned in the X-Request-ID response header
+and attached to every log record written while the request runs.
+
+Use %-style arguments, not f-strings: logger.info("Saved %s", entry.id)
+only builds the string when the record is actually written.
+"""
+import os
+import re
+import sys
+import json
+import uuid
+import zlib
+import atexit
+import queue
+import random
+import logging
+import logging.handlers
+from contextvars import ContextVar
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text").lower()
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", 1.0))
+LOG_QUEUE = os.environ.get("LOG_QUEUE", "true").lower() == "true"
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"
+REQUEST_ID_HEADER = "X-Request-ID"
+REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# logger.info("...", extra=SAMPLED) marks an event that LOG_SAMPLE_RATE may drop
+SAMPLED = {'sampled': True}
+
+# LogRecord attributes that are not `extra` fields
+RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+
+# --------------- request ids -----------------
+_request_id = ContextVar('request_id', default=None)
+
+
+def new_request_id(incoming=None):
+    """The proxy's id when it looks sane, else a fresh one"""
+    if incoming and REQUEST_ID_RE.match(incoming):
+        return incoming
+    return uuid.uuid4().hex
+
+
+def set_request_id(request_id):
+    """Attach `request_id` to records logged from this context; returns a reset token"""
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token):
+    _request_id.reset(token)
+
+
+def current_request_id():
+    return _request_id.get()
+
+
+# --------------- filters & formatters -----------------
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the current request id"""
+
+    def filter(self, record):
+        record.request_id = _request_id.get() or '-'
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Drops extra=SAMPLED records outside the sampled share of requests"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if self.rate >= 1 or not getattr(record, 'sampled', False) or record.levelno > logging.INFO:
+            return True
+        request_id = getattr(record, 'request_id', None) or _request_id.get()
+        if request_id and request_id != '-':
+            return zlib.crc32(request_id.encode()) % 10000 < self.rate * 10000
+        return random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'timestamp': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', '-'),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRS and key != 'sampled':
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that keeps `extra` fields and the traceback as separate
+    attributes instead of flattening everything into the message, so the
+    listener's JsonFormatter still sees them.
+    """
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(vars(record))
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+# --------------- setup -----------------
+_listener = None
+_configured_pid = None
+
+
+def stop_listener():
+    """Flush queued records; safe to call more than once"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def setup_logging(level=None):
+    """
+    Configure the root logger once per process (gunicorn workers fork after
+    the master configured it, and threads do not survive a fork).
+    """
+    global _listener, _configured_pid
+    if _configured_pid == os.getpid():
+        return
+    _configured_pid = os.getpid()
+    _listener = None  # a listener inherited over fork has no thread
+
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(JsonFormatter() if LOG_FORMAT == 'json' else logging.Formatter(TEXT_FORMAT))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(level or LOG_LEVEL)
+
+    if LOG_QUEUE:
+        handler = RecordQueueHandler(queue.SimpleQueue())
+        _listener = logging.handlers.QueueListener(handler.queue, stream, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_listener)
+    else:
+        handler = stream
+    # Handler filters run in the calling thread, where the request id is visible
+    handler.addFilter(RequestIdFilter())
+    handler.addFilter(SamplingFilter(LOG_SAMPLE_RATE))
+    root.addHandler(handler)
+
+
+def init_app(app):
+    """Request ids for a Flask app, and its logger routed through the root setup"""
+    from flask import g, request
+    from flask.logging import default_handler
+
+    app.logger.removeHandler(default_handler)
+
+    @app.before_request
+    def start_request_id():
+        g.request_id = new_request_id(request.headers.get(REQUEST_ID_HEADER))
+        g.request_id_token = set_request_id(g.request_id)
+
+    @app.after_request
+    def add_request_id(response):
+        if 'request_id' in g:
+            response.headers[REQUEST_ID_HEADER] = g.request_id
+        return response
+
+    @app.teardown_request
+    def reset_request_id_context(exc):
+        token = g.pop('request_id_token', None)
+        if token is not None:
+            reset_request_id(token)
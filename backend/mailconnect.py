@@ -1,10 +1,44 @@
 import smtplib
 import os
+import time
+import uuid
+import base64
+import logging
+import threading
+from collections import namedtuple
+from contextlib import closing
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
-from email import encoders
+from email.policy import SMTP as SMTP_POLICY
 from config import *
+from logconfig import SAMPLED
+from metrics import timed
+from storage import get_storage
+from uploads import key_for_reference
+
+logger = logging.getLogger(__name__)
+
+# SMTP endpoint; override with env vars to point at a local stand-in
+# such as `python -m aiosmtpd -n -l localhost:8025`
+SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", 587))
+SMTP_STARTTLS = os.environ.get("SMTP_STARTTLS", "true").lower() == "true"
+SMTP_LOGIN = os.environ.get("SMTP_LOGIN", "true").lower() == "true"
+SMTP_TIMEOUT = float(os.environ.get("SMTP_TIMEOUT", 30))
+
+# Connection pool tuning
+SMTP_POOL_SIZE = int(os.environ.get("SMTP_POOL_SIZE", 3))
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.environ.get("SMTP_MAX_MESSAGES_PER_CONNECTION", 50))
+SMTP_KEEPALIVE_INTERVAL = float(os.environ.get("SMTP_KEEPALIVE_INTERVAL", 30))  # NOOP probe if idle longer
+SMTP_IDLE_TIMEOUT = float(os.environ.get("SMTP_IDLE_TIMEOUT", 240))  # drop connections idle longer
+
+# Attachments larger than this are replaced by a download link
+MAIL_ATTACHMENT_MAX_BYTES = int(os.environ.get("MAIL_ATTACHMENT_MAX_BYTES", 10 * 1024 * 1024))
+# Multiple of 57 so every chunk encodes to whole 76-character base64 lines
+ATTACHMENT_CHUNK_SIZE = 57 * 1024
+PUBLIC_BASE_URL = os.environ.get("PUBLIC_BASE_URL", "http://localhost:7000")
+UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads")
 
 def normalize_data_keys(data):
     """
@@ -37,14 +71,265 @@ def normalize_data_keys(data):
     
     return normalized
 
-def send_email_notify(data):
+def open_smtp_connection():
     """
-    Simple notification email for basic forms (enroll, demo, inquiry)
+    Open an authenticated SMTP connection using the configured endpoint
+    """
+    server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+    if SMTP_STARTTLS:
+        server.starttls()
+    if SMTP_LOGIN:
+        server.login(gmail_users, gmail_passwords)
+    return server
+
+def close_smtp_connection(server):
+    try:
+        server.quit()
+    except (smtplib.SMTPException, OSError):
+        server.close()
+
+class PooledSMTPConnection:
+    def __init__(self, server):
+        self.server = server
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+
+class SMTPConnectionPool:
+    """
+    Reusable authenticated SMTP sessions shared by all senders.
+
+    At most `max_connections` sessions are in use at once; callers beyond
+    that wait. Idle sessions are probed with NOOP before reuse, dropped after
+    `idle_timeout` seconds, and retired after `max_messages` messages.
+    """
+    def __init__(self, connect=open_smtp_connection, max_connections=SMTP_POOL_SIZE,
+                 max_messages=SMTP_MAX_MESSAGES_PER_CONNECTION,
+                 keepalive_interval=SMTP_KEEPALIVE_INTERVAL, idle_timeout=SMTP_IDLE_TIMEOUT):
+        self.connect = connect
+        self.max_messages = max_messages
+        self.keepalive_interval = keepalive_interval
+        self.idle_timeout = idle_timeout
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+        self._idle = []
+        self._stats = {
+            'handshakes': 0,
+            'handshakes_avoided': 0,
+            'reconnects': 0,
+            'noop_probes': 0,
+            'messages_sent': 0,
+            'connections_retired': 0,
+        }
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _open(self):
+        conn = PooledSMTPConnection(self.connect())
+        self._count('handshakes')
+        return conn
+
+    def _is_alive(self, conn):
+        idle_for = time.monotonic() - conn.last_used
+        if idle_for > self.idle_timeout:
+            return False
+        if idle_for < self.keepalive_interval:
+            return True
+        self._count('noop_probes')
+        try:
+            return conn.server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def acquire(self):
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    conn = self._idle.pop() if self._idle else None
+                if conn is None:
+                    return self._open()
+                if self._is_alive(conn):
+                    self._count('handshakes_avoided')
+                    return conn
+                close_smtp_connection(conn.server)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn, discard=False):
+        try:
+            if discard or conn.messages_sent >= self.max_messages:
+                if not discard:
+                    self._count('connections_retired')
+                close_smtp_connection(conn.server)
+            else:
+                conn.last_used = time.monotonic()
+                with self._lock:
+                    self._idle.append(conn)
+        finally:
+            self._slots.release()
+
+    def send(self, transaction):
+        """
+        Run `transaction(server)` on a pooled session. On a dropped session
+        the transaction is retried once on a fresh connection, so it must be
+        safe to call again (e.g. re-create any generators it consumes).
+        """
+        conn = self.acquire()
+        try:
+            try:
+                transaction(conn.server)
+            except smtplib.SMTPServerDisconnected:
+                # Server closed the session under us; reconnect once and retry
+                close_smtp_connection(conn.server)
+                self._count('reconnects')
+                conn = self._open()
+                transaction(conn.server)
+        except Exception:
+            self.release(conn, discard=True)
+            raise
+        conn.messages_sent += 1
+        self._count('messages_sent')
+        self.release(conn)
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        self.send(lambda server: server.sendmail(from_addr, to_addrs, msg))
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            close_smtp_connection(conn.server)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle_connections'] = len(self._idle)
+        return stats
+
+smtp_pool = SMTPConnectionPool()
+
+def get_smtp_pool_stats():
+    return smtp_pool.stats()
+
+class StreamedAttachment(MIMEBase):
+    """
+    Attachment part that keeps only a way to open the file; the file is
+    base64-encoded chunk by chunk while the message is being sent.
+    """
+    def __init__(self, opener, filename):
+        MIMEBase.__init__(self, "application", "octet-stream")
+        self.opener = opener
+        self["Content-Transfer-Encoding"] = "base64"
+        self.add_header("Content-Disposition", "attachment", filename=filename)
+
+def _header_block(message):
+    lines = "".join(
+        SMTP_POLICY.header_factory(name, str(value)).fold(policy=SMTP_POLICY)
+        for name, value in message.items()
+    )
+    return smtplib.quotedata(lines).encode("ascii") + b"\r\n"
+
+def _iter_file_base64(opener):
+    with closing(opener()) as f:
+        while True:
+            chunk = f.read(ATTACHMENT_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield base64.encodebytes(chunk).replace(b"\n", b"\r\n")
+
+def iter_message_bytes(message):
+    """
+    Serialize a message for the SMTP DATA phase (CRLF line endings,
+    dot-stuffed) without building it in memory; StreamedAttachment
+    parts are read from disk in ATTACHMENT_CHUNK_SIZE pieces.
+    """
+    if not message.is_multipart():
+        yield smtplib.quotedata(message.as_string(policy=SMTP_POLICY)).encode("utf-8")
+        return
+    
+    boundary = message.get_boundary()
+    if boundary is None:
+        boundary = f"==============={uuid.uuid4().hex}=="
+        message.set_boundary(boundary)
+    delimiter = f"--{boundary}\r\n".encode("ascii")
+    
+    yield _header_block(message)
+    for part in message.get_payload():
+        yield delimiter
+        if isinstance(part, StreamedAttachment):
+            yield _header_block(part)
+            yield from _iter_file_base64(part.opener)
+        else:
+            text = smtplib.quotedata(part.as_string(policy=SMTP_POLICY))
+            if not text.endswith("\r\n"):
+                text += "\r\n"
+            yield text.encode("utf-8")
+    yield f"--{boundary}--\r\n".encode("ascii")
+
+def stream_message(server, from_addr, to_addrs, message):
+    """
+    Minimal replacement for SMTP.sendmail that writes the DATA section
+    straight onto the socket as it is generated.
+    """
+    server.ehlo_or_helo_if_needed()
+    code, resp = server.mail(from_addr)
+    if code != 250:
+        server.rset()
+        raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+    for addr in to_addrs:
+        code, resp = server.rcpt(addr)
+        if code not in (250, 251):
+            server.rset()
+            raise smtplib.SMTPRecipientsRefused({addr: (code, resp)})
+    code, resp = server.docmd("data")
+    if code != 354:
+        server.rset()
+        raise smtplib.SMTPDataError(code, resp)
+    for chunk in iter_message_bytes(message):
+        server.send(chunk)
+    server.send(b".\r\n")
+    code, resp = server.getreply()
+    if code != 250:
+        raise smtplib.SMTPDataError(code, resp)
+
+def deliver_message(message):
+    """
+    Send a prepared message to the admin mailbox. Raises on failure so
+    callers (e.g. the outbox worker) can decide whether to retry.
+    """
+    with timed('smtp'):
+        smtp_pool.send(lambda server: stream_message(server, gmail_users, [sent_email], message))
+
+async def deliver_message_async(message):
+    """
+    deliver_message for asyncio code (asyncapi.py), over aiosmtplib: the
+    SMTP round trips never block the event loop. One connection per
+    message; meant for messages without streamed attachments.
+    """
+    import aiosmtplib
+    with timed('smtp'):
+        await aiosmtplib.send(
+            message,
+            sender=gmail_users,
+            recipients=[sent_email],
+            hostname=SMTP_HOST,
+            port=SMTP_PORT,
+            start_tls=SMTP_STARTTLS,
+            username=gmail_users if SMTP_LOGIN else None,
+            password=gmail_passwords if SMTP_LOGIN else None,
+            timeout=SMTP_TIMEOUT,
+        )
+
+def build_notify_message(data):
+    """
+    Build the simple notification email for basic forms (enroll, demo, inquiry)
     """
     normalized_data = normalize_data_keys(data)
     
     gmail_user = gmail_users
-    gmail_password = gmail_passwords
     to_email = sent_email
     
     # Determine form type for subject
@@ -78,27 +363,27 @@ def send_email_notify(data):
     message["To"] = to_email
     message["Subject"] = subject
     message.attach(MIMEText(body, "plain"))
-    
+    return message
+
+def send_email_notify(data):
+    """
+    Simple notification email for basic forms (enroll, demo, inquiry)
+    """
     try:
-        server = smtplib.SMTP("smtp.gmail.com", 587)
-        server.starttls()
-        server.login(gmail_user, gmail_password)
-        server.sendmail(gmail_user, to_email, message.as_string())
-        server.quit()
-        print("✅ Email sent successfully!")
+        deliver_message(build_notify_message(data))
+        logger.info("Notification email sent", extra=SAMPLED)
         return True
     except Exception as e:
-        print(f"❌ Failed to send email: {e}")
+        logger.error("Failed to send email: %s", e)
         return False
 
-def send_email_notification(data, attachment_path=None):
+def build_notification_message(data, attachment_path=None):
     """
-    Enhanced notification email with attachment support (pclinfo, internship)
+    Build the enhanced notification email with attachment support (pclinfo, internship)
     """
     normalized_data = normalize_data_keys(data)
     
     gmail_user = gmail_users
-    gmail_password = gmail_passwords
     to_email = sent_email
     
     # Determine subject based on form type
@@ -140,8 +425,9 @@ def send_email_notification(data, attachment_path=None):
         body_parts.append(f"Message:\n{normalized_data['message']}")
     
     # Add attachment info if present
-    if attachment_path and os.path.exists(attachment_path):
-        body_parts.append(f"\n📎 Attachment: {os.path.basename(attachment_path)}")
+    attachment = attachment_source(attachment_path, data.get('attachment_name'))
+    if attachment:
+        body_parts.append(f"\n{attachment_note(attachment)}")
     
     body = "\n".join(body_parts)
     
@@ -152,31 +438,150 @@ def send_email_notification(data, attachment_path=None):
     message.attach(MIMEText(body, "plain"))
     
     # ✅ Add attachment if provided and file exists
-    if attachment_path and os.path.exists(attachment_path):
-        try:
-            with open(attachment_path, "rb") as f:
-                part = MIMEBase("application", "octet-stream")
-                part.set_payload(f.read())
-                encoders.encode_base64(part)
-                part.add_header(
-                    "Content-Disposition",
-                    f'attachment; filename="{os.path.basename(attachment_path)}"',
-                )
-                message.attach(part)
-                print(f"📎 Attachment added: {os.path.basename(attachment_path)}")
-        except Exception as e:
-            print(f"❌ Failed to attach file {attachment_path}: {e}")
+    attach_file(message, attachment)
+    
+    return message
+
+AttachmentSource = namedtuple('AttachmentSource', ['opener', 'size', 'name', 'url'])
+
+def attachment_download_url(attachment_path):
+    """
+    Public URL for a file under the uploads folder, or None if it lives elsewhere
+    """
+    relative = os.path.relpath(os.path.abspath(attachment_path), UPLOAD_FOLDER)
+    if relative.startswith(".."):
+        return None
+    return f"{PUBLIC_BASE_URL}/uploads/{relative.replace(os.sep, '/')}"
+
+def attachment_source(reference, name=None):
+    """
+    How to read an attachment stored as an upload URL (any storage backend)
+    or a plain disk path; None if there is no attachment or it is gone.
+    `name` is the original upload name (stored files are named by content hash).
+    """
+    if not reference:
+        return None
+    key = key_for_reference(reference)
+    if key:
+        storage = get_storage()
+        size = storage.size(key)
+        if size is None:
+            return None
+        return AttachmentSource(lambda: storage.open(key), size, name or os.path.basename(key),
+                                f"{PUBLIC_BASE_URL}/uploads/{key}")
+    if not os.path.exists(reference):
+        return None
+    return AttachmentSource(lambda: open(reference, "rb"), os.path.getsize(reference),
+                            name or os.path.basename(reference), attachment_download_url(reference))
+
+def attachment_too_large(attachment):
+    return attachment.size > MAIL_ATTACHMENT_MAX_BYTES
+
+def attachment_note(attachment):
+    """
+    Body line describing an attachment; links to the file when it is too large to send.
+    """
+    if attachment_too_large(attachment):
+        if attachment.url:
+            return f"📎 Attachment: {attachment.name} (too large to attach, download: {attachment.url})"
+        return f"📎 Attachment: {attachment.name} (too large to attach)"
+    return f"📎 Attachment: {attachment.name}"
+
+def attach_file(message, attachment):
+    """
+    Attach an AttachmentSource to a multipart message if it is under
+    MAIL_ATTACHMENT_MAX_BYTES. The file is only read while sending.
+    """
+    if not attachment:
+        return False
+    if attachment_too_large(attachment):
+        logger.info("Attachment too large, sending link instead: %s", attachment.name)
+        return False
+    message.attach(StreamedAttachment(attachment.opener, attachment.name))
+    return True
+
+# Readable labels for payload keys in digest emails
+DIGEST_FIELD_LABELS = {
+    'fullName': 'Name',
+    'full_name': 'Name',
+    'fname': 'First Name',
+    'lname': 'Last Name',
+    'email': 'Email',
+    'mobile': 'Mobile',
+    'type': 'Type',
+    'course': 'Course',
+    'project': 'Project',
+    'internship': 'Internship Position',
+    'payment_id': 'Payment ID',
+    'enrollment_id': 'Enrollment ID',
+    'amount': 'Amount',
+    'team_size': 'Team Size',
+    'start_date': 'Start Date',
+    'experience_level': 'Experience Level',
+    'message': 'Message',
+}
+
+def describe_event(data):
+    """
+    Short title for one notification, e.g. "Payment from Jane Doe"
+    """
+    normalized_data = normalize_data_keys(data)
+    full_name = normalized_data.get('full_name') or f"{normalized_data.get('fname', '')} {normalized_data.get('lname', '')}".strip()
     
+    if data.get('payment_id'):
+        kind = "Payment"
+    elif data.get('project'):
+        kind = "Project Enrollment"
+    elif data.get('internship'):
+        kind = "Internship Application"
+    elif data.get('type'):
+        kind = f"{data['type']} Inquiry"
+    else:
+        kind = "Inquiry"
+    return f"{kind} from {full_name or 'Unknown'}"
+
+def build_digest_message(events):
+    """
+    Build one summary email for a batch of notifications.
+    `events` is a list of (data, attachment_path) tuples.
+    """
+    subject = f"{len(events)} new notification{'s' if len(events) != 1 else ''}"
+    body_parts = [f"Notification digest ({len(events)} events):\n"]
+    attachments = []
+    
+    for index, (data, attachment_path) in enumerate(events, start=1):
+        body_parts.append(f"{index}. {describe_event(data)}")
+        for key, label in DIGEST_FIELD_LABELS.items():
+            value = data.get(key)
+            if value not in (None, ''):
+                body_parts.append(f"   {label}: {value}")
+        attachment = attachment_source(attachment_path, data.get('attachment_name'))
+        if attachment:
+            body_parts.append(f"   {attachment_note(attachment)}")
+            attachments.append(attachment)
+        body_parts.append("")
+    
+    message = MIMEMultipart()
+    message["From"] = gmail_users
+    message["To"] = sent_email
+    message["Subject"] = subject
+    message.attach(MIMEText("\n".join(body_parts), "plain"))
+    
+    for attachment in attachments:
+        attach_file(message, attachment)
+    
+    return message
+
+def send_email_notification(data, attachment_path=None):
+    """
+    Enhanced notification email with attachment support (pclinfo, internship)
+    """
     try:
-        server = smtplib.SMTP("smtp.gmail.com", 587)
-        server.starttls()
-        server.login(gmail_user, gmail_password)
-        server.sendmail(gmail_user, to_email, message.as_string())
-        server.quit()
-        print("✅ Email with attachment sent successfully!")
+        deliver_message(build_notification_message(data, attachment_path))
+        logger.info("Notification email with attachment sent", extra=SAMPLED)
         return True
     except Exception as e:
-        print(f"❌ Failed to send email: {e}")
+        logger.error("Failed to send email: %s", e)
         return False
 
 # Optional: Add a test function to verify email configuration
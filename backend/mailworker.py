@@ -0,0 +1,208 @@
+# backend/mailworker.py
+"""
+Background worker that drains the email_outbox table.
+
+The web process only stores notifications (see enqueue_email_notification in
+connection.py); this worker claims due rows, sends them through mailconnect
+and reschedules failures with exponential backoff.
+
+Run it next to the web server:
+    python mailworker.py            # poll forever
+    python mailworker.py --once     # drain what is due and exit
+
+Digest mode (MAIL_DIGEST_MODE=true) collapses everything that is due into a
+single summary email, flushed every MAIL_DIGEST_INTERVAL seconds or as soon as
+MAIL_DIGEST_MAX_EVENTS notifications are waiting, with attachments bundled.
+
+To test without Gmail, start a local SMTP stand-in and point the worker at it:
+    python -m aiosmtpd -n -l localhost:8025
+    SMTP_HOST=localhost SMTP_PORT=8025 SMTP_STARTTLS=false SMTP_LOGIN=false python mailworker.py --once
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from connection import create_app, db, EmailOutbox, release_upload
+from logconfig import SAMPLED
+from mailconnect import (
+    build_digest_message,
+    build_notification_message,
+    build_notify_message,
+    deliver_message,
+    smtp_pool,
+)
+
+MAIL_WORKERS = int(os.environ.get("MAIL_WORKERS", 4))
+MAIL_BATCH_SIZE = int(os.environ.get("MAIL_BATCH_SIZE", 20))
+MAIL_MAX_ATTEMPTS = int(os.environ.get("MAIL_MAX_ATTEMPTS", 6))
+MAIL_BACKOFF_BASE = int(os.environ.get("MAIL_BACKOFF_BASE", 30))  # seconds
+MAIL_BACKOFF_MAX = int(os.environ.get("MAIL_BACKOFF_MAX", 3600))  # seconds
+MAIL_POLL_INTERVAL = float(os.environ.get("MAIL_POLL_INTERVAL", 2))
+# Rows stuck in 'sending' longer than this (crashed worker) are picked up again
+MAIL_LOCK_TIMEOUT = int(os.environ.get("MAIL_LOCK_TIMEOUT", 600))
+
+MAIL_DIGEST_MODE = os.environ.get("MAIL_DIGEST_MODE", "false").lower() == "true"
+MAIL_DIGEST_INTERVAL = int(os.environ.get("MAIL_DIGEST_INTERVAL", 300))  # seconds
+MAIL_DIGEST_MAX_EVENTS = int(os.environ.get("MAIL_DIGEST_MAX_EVENTS", 50))
+
+app = create_app()
+
+
+def backoff_delay(attempts):
+    """Seconds to wait before the next attempt after `attempts` failures"""
+    return min(MAIL_BACKOFF_BASE * (2 ** (attempts - 1)), MAIL_BACKOFF_MAX)
+
+
+def claim_batch(limit=MAIL_BATCH_SIZE):
+    """Lock due rows, mark them as sending and return their ids"""
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=MAIL_LOCK_TIMEOUT)
+    rows = (
+        EmailOutbox.query
+        .filter(db.or_(
+            db.and_(EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= now),
+            db.and_(EmailOutbox.status == 'sending', EmailOutbox.locked_at < stale),
+        ))
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for row in rows:
+        row.status = 'sending'
+        row.locked_at = now
+        row.attempts = (row.attempts or 0) + 1
+    db.session.commit()
+    return [row.id for row in rows]
+
+
+def build_message(entry):
+    if entry.kind == 'notification':
+        return build_notification_message(entry.payload, entry.attachment_path)
+    return build_notify_message(entry.payload)
+
+
+def mark_sent(entry):
+    entry.status = 'sent'
+    entry.sent_at = datetime.utcnow()
+    entry.last_error = None
+    entry.locked_at = None
+    release_upload(entry.attachment_path)
+
+
+def mark_failed(entry, error):
+    """Reschedule with backoff, or give up after MAIL_MAX_ATTEMPTS"""
+    entry.last_error = str(error)
+    entry.locked_at = None
+    if entry.attempts >= MAIL_MAX_ATTEMPTS:
+        entry.status = 'failed'
+        release_upload(entry.attachment_path)
+        app.logger.error("Outbox email %s failed permanently: %s", entry.id, error)
+    else:
+        entry.status = 'pending'
+        entry.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff_delay(entry.attempts))
+        app.logger.warning("Outbox email %s failed (attempt %s), retrying: %s", entry.id, entry.attempts, error)
+
+
+def process_entry(entry_id):
+    """Send one outbox row and record the outcome; runs in a pool thread"""
+    with app.app_context():
+        entry = EmailOutbox.query.get(entry_id)
+        if not entry or entry.status != 'sending':
+            return False
+
+        try:
+            deliver_message(build_message(entry))
+            mark_sent(entry)
+            app.logger.info("Outbox email %s sent", entry.id, extra=SAMPLED)
+            sent = True
+        except Exception as e:
+            mark_failed(entry, e)
+            sent = False
+
+        db.session.commit()
+        db.session.remove()
+        return sent
+
+
+def process_digest(entry_ids):
+    """Send a batch of outbox rows as one summary email"""
+    with app.app_context():
+        entries = (
+            EmailOutbox.query
+            .filter(EmailOutbox.id.in_(entry_ids), EmailOutbox.status == 'sending')
+            .order_by(EmailOutbox.created_at)
+            .all()
+        )
+        if not entries:
+            return False
+
+        try:
+            deliver_message(build_digest_message([(e.payload, e.attachment_path) for e in entries]))
+            for entry in entries:
+                mark_sent(entry)
+            app.logger.info("Digest email with %s notifications sent", len(entries))
+            sent = True
+        except Exception as e:
+            for entry in entries:
+                mark_failed(entry, e)
+            sent = False
+
+        db.session.commit()
+        db.session.remove()
+        return sent
+
+
+def digest_due():
+    """True once MAIL_DIGEST_MAX_EVENTS are waiting or the oldest has waited MAIL_DIGEST_INTERVAL"""
+    now = datetime.utcnow()
+    count, oldest = (
+        db.session.query(db.func.count(EmailOutbox.id), db.func.min(EmailOutbox.created_at))
+        .filter(EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= now)
+        .one()
+    )
+    if not count:
+        return False
+    return count >= MAIL_DIGEST_MAX_EVENTS or oldest <= now - timedelta(seconds=MAIL_DIGEST_INTERVAL)
+
+
+def drain_once(executor):
+    """Claim and send one batch; returns the number of rows claimed"""
+    if MAIL_DIGEST_MODE:
+        with app.app_context():
+            ids = claim_batch(MAIL_DIGEST_MAX_EVENTS) if digest_due() else []
+        if ids:
+            executor.submit(process_digest, ids).result()
+        return len(ids)
+
+    with app.app_context():
+        ids = claim_batch()
+    if ids:
+        list(executor.map(process_entry, ids))
+    return len(ids)
+
+
+def run(once=False):
+    app.logger.info("Mail worker started with %s threads", MAIL_WORKERS)
+    try:
+        with ThreadPoolExecutor(max_workers=MAIL_WORKERS) as executor:
+            while True:
+                try:
+                    claimed = drain_once(executor)
+                except Exception as e:
+                    app.logger.error("Mail worker error: %s", e)
+                    claimed = 0
+                if claimed:
+                    app.logger.debug("SMTP pool stats: %s", smtp_pool.stats())
+                if once and not claimed:
+                    return
+                if not claimed:
+                    time.sleep(MAIL_POLL_INTERVAL)
+    finally:
+        smtp_pool.close_all()
+
+
+if __name__ == "__main__":
+    run(once="--once" in sys.argv[1:])
@@ -0,0 +1,298 @@
+# backend/metrics.py
+"""
+Request, database and I/O instrumentation, served as Prometheus text on
+GET /metrics.
+
+    http_request_duration_seconds{method,route,status}
+                                    latency per route (the URL rule, not the path)
+    http_request_phase_seconds{route,phase}
+                                    time a request spent in db / smtp / image /
+                                    upload work; compare its _sum with the
+                                    route's http_request_duration_seconds_sum to
+                                    see where a route's time goes
+    http_request_db_queries{route}  SQL statements per request
+    db_query_duration_seconds       every SQL statement
+    smtp_send_duration_seconds      every message handed to the SMTP server
+    image_processing_duration_seconds
+                                    Pillow optimize + derivatives, per image
+    upload_write_duration_seconds{kind}
+                                    streaming an upload to disk and storing it
+    db_pool_*{pool}, response_cache_*
+                                    dbpool.py and cache.py counters
+
+Code marks its slow parts with `with timed('smtp'):`; the time goes to the
+phase's histogram and, when it happens inside a request, to that request's
+phase totals. Request state lives in a context variable, so the same code
+works in gunicorn threads and in asyncapi.py's event loop. With
+SERVER_TIMING=true responses also carry a Server-Timing header with the
+phase totals, which browser dev tools show per request.
+
+Metrics are kept per process. Under gunicorn each scrape reaches one
+worker, so scrape every worker (or run one worker per container) for
+complete numbers. /metrics is unauthenticated: keep it off the public
+proxy.
+"""
+import os
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "false").lower() == "true"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0, 5.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+PHASES = ('db', 'smtp', 'image', 'upload')
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs) + '}'
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Thread-safe Prometheus histogram with optional labels"""
+
+    def __init__(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        for key, (counts, total) in sorted(series.items()):
+            pairs = list(zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{format_labels(pairs + [('le', format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(pairs)} {total!r}")
+            lines.append(f"{self.name}_count{format_labels(pairs)} {cumulative}")
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Request latency by route', ('method', 'route', 'status'))
+REQUEST_PHASE = Histogram(
+    'http_request_phase_seconds', 'Time per request spent in db, smtp, image and upload work', ('route', 'phase'))
+REQUEST_QUERIES = Histogram(
+    'http_request_db_queries', 'SQL statements per request', ('route',), COUNT_BUCKETS)
+PHASE_DURATION = {
+    'db': Histogram('db_query_duration_seconds', 'SQL statement duration', buckets=QUERY_BUCKETS),
+    'smtp': Histogram('smtp_send_duration_seconds', 'SMTP send duration'),
+    'image': Histogram('image_processing_duration_seconds', 'Image optimization and derivatives per image'),
+    'upload': Histogram('upload_write_duration_seconds', 'Upload streaming and storage writes', ('kind',)),
+}
+HISTOGRAMS = [REQUEST_DURATION, REQUEST_PHASE, REQUEST_QUERIES] + list(PHASE_DURATION.values())
+
+
+# --------------- per-request accounting -----------------
+class RequestTimings:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+
+_current = ContextVar('request_timings', default=None)
+
+
+def start_request():
+    """Begin accounting for a request; returns a token for end_request()"""
+    return _current.set(RequestTimings())
+
+
+def current_timings():
+    return _current.get()
+
+
+def end_request(token, method, route, status):
+    """
+    Record the request started with `token` under `route` (None: stop
+    accounting without recording); returns its RequestTimings.
+    """
+    timings = _current.get()
+    _current.reset(token)
+    if timings is None or route is None:
+        return timings
+    elapsed = timings.elapsed()
+    if METRICS_ENABLED:
+        REQUEST_DURATION.observe(elapsed, method=method, route=route, status=str(status))
+        REQUEST_QUERIES.observe(timings.queries, route=route)
+        for phase, seconds in timings.phases.items():
+            if seconds or phase == 'db':
+                REQUEST_PHASE.observe(seconds, route=route, phase=phase)
+    return timings
+
+
+def server_timing(timings):
+    """Server-Timing header value for a request's phases so far"""
+    parts = [f"{phase};dur={seconds * 1000:.1f}" for phase, seconds in timings.phases.items() if seconds]
+    parts.append(f"total;dur={timings.elapsed() * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def observe(phase, seconds, **labels):
+    """Record `seconds` of `phase` work, also on the current request if any"""
+    if not METRICS_ENABLED:
+        return
+    PHASE_DURATION[phase].observe(seconds, **labels)
+    timings = _current.get()
+    if timings is not None:
+        timings.phases[phase] += seconds
+        if phase == 'db':
+            timings.queries += 1
+
+
+@contextmanager
+def timed(phase, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(phase, time.perf_counter() - start, **labels)
+
+
+# --------------- SQLAlchemy -----------------
+def instrument_queries(engine):
+    """Time every statement run on `engine` (sync engine, or AsyncEngine.sync_engine)"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('query_start')
+        if starts:
+            observe('db', time.perf_counter() - starts.pop())
+
+    @event.listens_for(engine, 'handle_error')
+    def handle_error(exception_context):
+        # Failed statements never reach after_cursor_execute
+        conn = exception_context.connection
+        starts = conn.info.get('query_start') if conn is not None else None
+        if starts:
+            observe('db', time.perf_counter() - starts.pop())
+
+
+# --------------- Flask -----------------
+def flask_route(request):
+    # The URL rule keeps the label set small; unmatched paths share one label
+    return request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+
+
+def init_app(app):
+    """Time every request of a Flask app"""
+    from flask import g, request
+
+    @app.before_request
+    def start_request_timing():
+        g.metrics_token = start_request()
+
+    @app.after_request
+    def record_request_timing(response):
+        token = g.pop('metrics_token', None)
+        if token is None:
+            return response
+        if SERVER_TIMING and current_timings() is not None:
+            response.headers['Server-Timing'] = server_timing(current_timings())
+        end_request(token, request.method, flask_route(request), response.status_code)
+        return response
+
+    @app.teardown_request
+    def reset_request_timing(exc):
+        # after_request is skipped when a view raises
+        token = g.pop('metrics_token', None)
+        if token is not None:
+            end_request(token, request.method, flask_route(request), 500)
+
+
+# --------------- exposition -----------------
+def render_stats(name, description, kind, values, label):
+    """Lines for one metric taken from a {label value: number} snapshot"""
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+    for label_value, value in sorted(values.items()):
+        pairs = [(label, label_value)] if label else []
+        lines.append(f"{name}{format_labels(pairs)} {format_value(value)}")
+    return lines
+
+
+def render_pool_metrics(pools):
+    lines = []
+    for key, kind in (('checkouts', 'counter'), ('checkins', 'counter'), ('connects', 'counter'),
+                      ('invalidations', 'counter'), ('timeouts', 'counter'), ('size', 'gauge'),
+                      ('checked_out', 'gauge'), ('overflow', 'gauge'), ('checked_in', 'gauge')):
+        values = {pool: stats[key] for pool, stats in pools.items() if key in stats}
+        if values:
+            name = f"db_pool_{key}_total" if kind == 'counter' else f"db_pool_{key}"
+            lines += render_stats(name, f"Connection pool {key.replace('_', ' ')}", kind, values, 'pool')
+
+    name = 'db_pool_wait_seconds'
+    lines += [f"# HELP {name} Time spent waiting for a pooled connection", f"# TYPE {name} histogram"]
+    for pool, stats in sorted(pools.items()):
+        wait = stats['wait']
+        for bound, count in wait['buckets'].items():
+            le = '+Inf' if bound == 'inf' else bound
+            lines.append(f"{name}_bucket{format_labels([('pool', pool), ('le', le)])} {count}")
+        lines.append(f"{name}_sum{format_labels([('pool', pool)])} {wait['sum']!r}")
+        lines.append(f"{name}_count{format_labels([('pool', pool)])} {wait['count']}")
+    return lines
+
+
+def render_cache_metrics(stats):
+    lines = []
+    for key in ('hits', 'misses', 'evictions', 'expired', 'invalidations'):
+        if key in stats:
+            lines += render_stats(f"response_cache_{key}_total", f"Response cache {key}", 'counter',
+                                  {stats['backend']: stats[key]}, 'backend')
+    if 'entries' in stats:
+        lines += render_stats('response_cache_entries', 'Response cache entries', 'gauge',
+                              {stats['backend']: stats['entries']}, 'backend')
+    return lines
+
+
+def render_metrics(pools=None, cache_stats=None):
+    """Every metric in Prometheus text exposition format"""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines += histogram.render()
+    if pools:
+        lines += render_pool_metrics(pools)
+    if cache_stats:
+        lines += render_cache_metrics(cache_stats)
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,171 @@
+# backend/migrate.py
+"""
+Schema migrations.
+
+Migrations are the numbered .sql files in backend/migrations/, applied in
+order and recorded in the schema_migrations table. Version 0001 is the
+baseline: the tables as declared by the models, created with
+db.create_all() so a fresh database still comes up on first start.
+
+A file whose first line is `-- migrate: no-transaction` runs statement by
+statement in autocommit mode (needed for CREATE INDEX CONCURRENTLY); every
+other file runs in a single transaction. If a CONCURRENTLY build fails it
+leaves an INVALID index behind - drop it before running again.
+
+    python migrate.py               apply pending migrations
+    python migrate.py initialize    the same, then create the default admin and rollups
+                                    (what create_app does on startup; used by gunicorn.conf.py)
+    python migrate.py status        list applied / pending versions
+
+The web app applies pending migrations on startup (create_app in
+connection.py), so running this by hand is only needed for deploys that
+start the app with migrations disabled. Whether the views' queries use the
+indexes is checked by tests/test_query_plans.py.
+"""
+import os
+import sys
+
+from sqlalchemy import text
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+BASELINE_VERSION = '0001_baseline'
+NO_TRANSACTION_MARKER = '-- migrate: no-transaction'
+# pg_advisory_lock key so only one process migrates at a time
+MIGRATION_LOCK_KEY = 7310010
+
+def migration_files():
+    """Sorted (version, path) pairs for the .sql files in MIGRATIONS_DIR"""
+    files = sorted(f for f in os.listdir(MIGRATIONS_DIR) if f.endswith('.sql'))
+    return [(os.path.splitext(f)[0], os.path.join(MIGRATIONS_DIR, f)) for f in files]
+
+
+def split_statements(sql):
+    """Split a migration file on ';' at line ends, dropping comment-only chunks"""
+    statements = []
+    for chunk in sql.split(';\n'):
+        lines = [line for line in chunk.splitlines() if not line.strip().startswith('--')]
+        statement = '\n'.join(lines).strip().rstrip(';')
+        if statement:
+            statements.append(statement)
+    return statements
+
+
+def ensure_migrations_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " version VARCHAR(100) PRIMARY KEY,"
+        " applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+    ))
+
+
+def applied_versions(conn):
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def record_version(conn, version):
+    conn.execute(text("INSERT INTO schema_migrations (version) VALUES (:version)"), {'version': version})
+
+
+def apply_file(db, version, path, logger):
+    with open(path) as f:
+        sql = f.read()
+
+    # Index builds and backfills may run far longer than DB_STATEMENT_TIMEOUT
+    if sql.startswith(NO_TRANSACTION_MARKER):
+        with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("SET statement_timeout = 0"))
+            try:
+                for statement in split_statements(sql):
+                    conn.execute(text(statement))
+                record_version(conn, version)
+            finally:
+                # Back to the connection's default before it returns to the pool
+                conn.execute(text("RESET statement_timeout"))
+    else:
+        with db.engine.begin() as conn:
+            conn.execute(text("SET LOCAL statement_timeout = 0"))
+            for statement in split_statements(sql):
+                conn.execute(text(statement))
+            record_version(conn, version)
+    logger.info("Applied migration %s", version)
+
+
+def run_migrations(db, logger):
+    """
+    Bring the schema up to date. Returns the list of versions applied.
+
+    SQL migrations are PostgreSQL-only; on other databases (local sqlite
+    runs) only the baseline is applied and the rest are skipped.
+    """
+    is_postgres = db.engine.dialect.name == 'postgresql'
+    applied = []
+
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        if is_postgres:
+            lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {'key': MIGRATION_LOCK_KEY})
+        try:
+            with db.engine.begin() as conn:
+                ensure_migrations_table(conn)
+                done = applied_versions(conn)
+
+            if BASELINE_VERSION not in done:
+                db.create_all()
+                with db.engine.begin() as conn:
+                    record_version(conn, BASELINE_VERSION)
+                logger.info("Applied migration %s", BASELINE_VERSION)
+                applied.append(BASELINE_VERSION)
+
+            for version, path in migration_files():
+                if version in done:
+                    continue
+                if not is_postgres:
+                    logger.info("Skipping migration %s (PostgreSQL only)", version)
+                    continue
+                apply_file(db, version, path, logger)
+                applied.append(version)
+        finally:
+            if is_postgres:
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': MIGRATION_LOCK_KEY})
+
+    return applied
+
+
+def migration_status(db):
+    """[(version, applied?)] for the baseline and every migration file"""
+    with db.engine.begin() as conn:
+        ensure_migrations_table(conn)
+        done = applied_versions(conn)
+    versions = [BASELINE_VERSION] + [version for version, _ in migration_files()]
+    return [(version, version in done) for version in versions]
+
+
+def main(argv):
+    from connection import create_app, db
+
+    app = create_app(initialize=False)
+    command = argv[0] if argv else 'upgrade'
+    with app.app_context():
+        if command == 'upgrade':
+            applied = run_migrations(db, app.logger)
+            print(f"Applied: {', '.join(applied)}" if applied else "Schema is up to date")
+            return 0
+
+        if command == 'initialize':
+            from connection import backfill_rollups, initialize_database
+            # Fail loudly here; initialize_database only logs migration errors
+            run_migrations(db, app.logger)
+            initialize_database()
+            backfill_rollups()
+            return 0
+
+        if command == 'status':
+            for version, done in migration_status(db):
+                print(f"{'applied' if done else 'pending'}  {version}")
+            return 0
+
+    print(f"Unknown command: {command}")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,33 @@
+-- migrate: no-transaction
+-- Indexes for the admin list filters/sorts, the catalog slug lookups and the
+-- payments search. Built CONCURRENTLY so they can go onto a live database
+-- without blocking writes (hence no surrounding transaction).
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- payments: status filter + newest first, course join, free-text search
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_payments_status_created_at ON payments (payment_status, created_at DESC, id DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_payments_created_at_id ON payments (created_at DESC, id DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_payments_course_id ON payments (course_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_payments_student_name_trgm ON payments USING gin (student_name gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_payments_email_trgm ON payments USING gin (email gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_payments_payment_id_trgm ON payments USING gin (payment_id gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_courses_title_trgm ON courses USING gin (title gin_trgm_ops);
+
+-- project enrollments: per-project lookups and the keyset-paginated admin list
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_project_enrollments_project_id ON project_enrollments (project_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_project_enrollments_status_created_at ON project_enrollments (payment_status, created_at DESC, id DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_project_enrollments_created_at_id ON project_enrollments (created_at DESC, id DESC);
+
+-- internship applications: same pattern, sorted on "date"
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_internship_applications_internship_id ON internship_applications (internship_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_internship_applications_status_date ON internship_applications (payment_status, date DESC, id DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_internship_applications_date_id ON internship_applications (date DESC, id DESC);
+
+-- catalog: public pages only ever read active rows, admin lists sort by created_at
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_courses_active_slug ON courses (slug) WHERE is_active;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_courses_created_at_id ON courses (created_at DESC, id DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_internship_postings_active_slug ON internship_postings (slug) WHERE is_active;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_internship_postings_created_at_id ON internship_postings (created_at DESC, id DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_project_postings_active_slug ON project_postings (slug) WHERE is_active;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_project_postings_created_at_id ON project_postings (created_at DESC, id DESC);
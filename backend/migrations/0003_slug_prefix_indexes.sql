@@ -0,0 +1,7 @@
+-- migrate: no-transaction
+-- text_pattern_ops indexes so slug prefix lookups (slug LIKE 'base-%', used
+-- by slugs.allocate_slug) are index scans under any database collation.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_courses_slug_pattern ON courses (slug text_pattern_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_internship_postings_slug_pattern ON internship_postings (slug text_pattern_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_project_postings_slug_pattern ON project_postings (slug text_pattern_ops);
@@ -0,0 +1,14 @@
+-- Reference counts for content-addressed uploads (see uploads.py) and the
+-- /pclinfo attachment, which until now was only kept on disk.
+
+CREATE TABLE IF NOT EXISTS upload_blobs (
+    id SERIAL PRIMARY KEY,
+    key VARCHAR(300) NOT NULL UNIQUE,
+    ref_count INTEGER NOT NULL DEFAULT 0,
+    released_at TIMESTAMP,
+    created_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_upload_blobs_unreferenced ON upload_blobs (released_at) WHERE ref_count <= 0;
+
+ALTER TABLE pclinfo ADD COLUMN IF NOT EXISTS attachment_path TEXT;
@@ -0,0 +1,127 @@
+# backend/pagination.py
+"""
+Keyset (cursor) pagination, filtering and sorting for admin list endpoints.
+
+Query parameters understood by every paginated admin route:
+    limit      page size (default ADMIN_PAGE_SIZE, capped at ADMIN_PAGE_MAX)
+    cursor     opaque value from the previous page's pagination.next_cursor
+    sort       one of the route's sort keys, prefixed with '-' for descending
+    status     'all', a payment status, or 'active' / 'inactive' for catalog rows
+    date_from  YYYY-MM-DD, inclusive
+    date_to    YYYY-MM-DD, inclusive
+    search     case-insensitive substring of any of the route's search columns
+
+Pages are fetched with WHERE (sort_key, id) < (last_sort_key, last_id), so
+the cost of a page does not grow with how deep into the list it is.
+"""
+import os
+import json
+import base64
+from datetime import datetime, timedelta
+
+from flask import request
+from sqlalchemy import Boolean, or_, tuple_
+
+ADMIN_PAGE_SIZE = int(os.environ.get("ADMIN_PAGE_SIZE", 50))
+ADMIN_PAGE_MAX = int(os.environ.get("ADMIN_PAGE_MAX", 200))
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def encode_cursor(sort_value, row_id):
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort_column):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        if sort_value is not None and sort_column.type.python_type is datetime:
+            sort_value = datetime.fromisoformat(sort_value)
+        return sort_value, int(row_id)
+    except Exception:
+        raise PaginationError("Invalid cursor")
+
+
+def parse_date(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise PaginationError(f"Invalid {name}, expected YYYY-MM-DD")
+
+
+def apply_filters(query, status_column=None, date_column=None, search_columns=()):
+    """Apply the shared status, date range and search filters"""
+    status = request.args.get('status', 'all', type=str)
+    if status != 'all' and status_column is not None:
+        if isinstance(status_column.type, Boolean):
+            if status not in ('active', 'inactive'):
+                raise PaginationError("Invalid status, expected all, active or inactive")
+            query = query.filter(status_column.is_(status == 'active'))
+        else:
+            query = query.filter(status_column == status)
+
+    if date_column is not None:
+        date_from = request.args.get('date_from')
+        date_to = request.args.get('date_to')
+        if date_from:
+            query = query.filter(date_column >= parse_date(date_from, 'date_from'))
+        if date_to:
+            query = query.filter(date_column < parse_date(date_to, 'date_to') + timedelta(days=1))
+
+    search = request.args.get('search', '', type=str).strip()
+    if search and search_columns:
+        pattern = f'%{search}%'
+        query = query.filter(or_(*(column.ilike(pattern) for column in search_columns)))
+    return query
+
+
+def keyset_paginate(query, id_column, sort_columns, default_sort, primary=lambda row: row):
+    """
+    Sort and slice `query` by the requested sort key plus id as tiebreaker.
+
+    `sort_columns` maps public sort names to model columns; `primary`
+    extracts the model instance from a result row (e.g. row[0] for joins).
+    Returns (rows, pagination dict).
+    """
+    limit = request.args.get('limit', ADMIN_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, ADMIN_PAGE_MAX))
+
+    sort = request.args.get('sort', default_sort, type=str)
+    descending = sort.startswith('-')
+    sort_key = sort.lstrip('-')
+    if sort_key not in sort_columns:
+        raise PaginationError(f"Invalid sort, expected one of: {', '.join(sorted(sort_columns))}")
+    sort_column = sort_columns[sort_key]
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        position = decode_cursor(cursor, sort_column)
+        keys = tuple_(sort_column, id_column)
+        query = query.filter(keys < position if descending else keys > position)
+
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more and rows:
+        last = primary(rows[-1])
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+
+    return rows, {
+        'limit': limit,
+        'sort': sort,
+        'next_cursor': next_cursor,
+        'has_more': has_more,
+    }
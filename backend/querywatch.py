@@ -0,0 +1,223 @@
+# backend/querywatch.py
+"""
+N+1 and slow-query detection.
+
+With QUERY_WATCH set, every SQL statement issued while a request runs is
+recorded and checked when the request ends:
+
+    repeated shapes   the same statement (literals stripped) run
+                      QUERY_REPEAT_LIMIT or more times, the usual sign of a
+                      lazy load per row (e.g. payment.course in a loop)
+    slow statements   anything slower than QUERY_SLOW_MS
+    budgets           views decorated with @query_budget(n) issuing more
+                      than n statements
+
+QUERY_WATCH=log reports through the `querywatch` logger and adds
+X-Query-Count / X-Query-Time response headers; QUERY_WATCH=raise turns
+problems into 500s, for test runs. Each report names the line of app
+code that issued the statement. Recording costs a stack walk per
+statement, so keep it off in production (the default).
+
+Tests can also count statements directly, with or without QUERY_WATCH:
+
+    with expect_queries(3) as queries:
+        client.get('/admin/payments', headers=auth)
+    # raises QueryBudgetExceeded listing every statement if more than 3 ran
+"""
+import os
+import re
+import sys
+import time
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+QUERY_WATCH = os.environ.get("QUERY_WATCH", "off").lower()  # off, log, raise
+QUERY_SLOW_MS = float(os.environ.get("QUERY_SLOW_MS", 100))
+QUERY_REPEAT_LIMIT = int(os.environ.get("QUERY_REPEAT_LIMIT", 5))
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+THIS_FILE = os.path.abspath(__file__)
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class RecordedQuery:
+    __slots__ = ('statement', 'duration', 'location')
+
+    def __init__(self, statement, duration, location):
+        self.statement = statement
+        self.duration = duration
+        self.location = location
+
+    def __repr__(self):
+        return f"<{self.duration * 1000:.1f} ms at {self.location}: {shorten(self.statement)}>"
+
+
+class QueryLog(list):
+    """RecordedQuery entries plus the checks run over them"""
+
+    def total_time(self):
+        return sum(query.duration for query in self)
+
+    def repeated(self, limit=QUERY_REPEAT_LIMIT):
+        """[(count, shape, first RecordedQuery)] for shapes run at least `limit` times"""
+        counts = Counter(query_shape(query.statement) for query in self)
+        first = {}
+        for query in self:
+            first.setdefault(query_shape(query.statement), query)
+        return [(count, shape, first[shape]) for shape, count in counts.most_common() if count >= limit]
+
+    def slow(self, threshold_ms=QUERY_SLOW_MS):
+        return [query for query in self if query.duration * 1000 >= threshold_ms]
+
+    def report(self):
+        lines = [f"{len(self)} statements, {self.total_time() * 1000:.1f} ms"]
+        lines += [f"  {query.duration * 1000:7.1f} ms  {query.location}  {shorten(query.statement, 200)}"
+                  for query in self]
+        return '\n'.join(lines)
+
+
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+IN_LIST_RE = re.compile(r"\(\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|\$\d+|:\w+))*\s*\)")
+SPACE_RE = re.compile(r'\s+')
+
+
+def query_shape(statement):
+    """Statement with literals, IN lists and whitespace normalised"""
+    shape = LITERAL_RE.sub('?', statement)
+    shape = IN_LIST_RE.sub('(...)', shape)
+    return SPACE_RE.sub(' ', shape).strip()
+
+
+def shorten(statement, length=120):
+    statement = SPACE_RE.sub(' ', statement).strip()
+    return statement if len(statement) <= length else statement[:length - 3] + '...'
+
+
+def calling_location():
+    """file:line of the innermost app frame outside this module and the libraries"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(BACKEND_DIR) and filename != THIS_FILE and 'site-packages' not in filename:
+            return f"{os.path.relpath(filename, BACKEND_DIR)}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return '?'
+
+
+# --------------- recording -----------------
+_request_log = ContextVar('query_log', default=None)
+# expect_queries() blocks; process-wide, since test clients may run the app in another thread
+_active_logs = []
+_active_lock = threading.Lock()
+
+
+def record(statement, duration):
+    request_log = _request_log.get()
+    if request_log is None and not _active_logs:
+        return
+    query = RecordedQuery(statement, duration, calling_location())
+    if request_log is not None:
+        request_log.append(query)
+    with _active_lock:
+        for log in _active_logs:
+            log.append(query)
+
+
+def instrument_queries(engine):
+    """Feed every statement run on `engine` to the active query logs"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('querywatch_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('querywatch_start')
+        if starts:
+            record(statement, time.perf_counter() - starts.pop())
+
+
+@contextmanager
+def capture_queries():
+    """Collect every statement the process runs inside the block"""
+    log = QueryLog()
+    with _active_lock:
+        _active_logs.append(log)
+    try:
+        yield log
+    finally:
+        with _active_lock:
+            _active_logs.remove(log)
+
+
+@contextmanager
+def expect_queries(max_queries):
+    """capture_queries() that raises QueryBudgetExceeded if more than `max_queries` ran"""
+    with capture_queries() as log:
+        yield log
+    if len(log) > max_queries:
+        raise QueryBudgetExceeded(f"Expected at most {max_queries} queries, got {log.report()}")
+
+
+def query_budget(max_queries):
+    """Declare how many statements a view may issue; checked when QUERY_WATCH is on"""
+    def decorator(view):
+        # functools.wraps in outer decorators copies this attribute along
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+# --------------- per-request checks -----------------
+def problems(log, budget=None):
+    found = []
+    for count, shape, first in log.repeated():
+        found.append(f"N+1 suspected: {count} x {shorten(shape)} (first at {first.location})")
+    for query in log.slow():
+        found.append(f"Slow query: {query.duration * 1000:.1f} ms at {query.location}: {shorten(query.statement)}")
+    if budget is not None and len(log) > budget:
+        found.append(f"Query budget exceeded: {len(log)} statements, budget {budget}")
+    return found
+
+
+def init_app(app):
+    """Record and check the statements of every request (QUERY_WATCH=log|raise)"""
+    from flask import current_app, g, request
+
+    @app.before_request
+    def start_query_log():
+        g.query_log_token = _request_log.set(QueryLog())
+
+    @app.after_request
+    def check_query_log(response):
+        token = g.pop('query_log_token', None)
+        log = _request_log.get()
+        if token is None or log is None:
+            return response
+        _request_log.reset(token)
+
+        view = current_app.view_functions.get(request.endpoint)
+        found = problems(log, getattr(view, 'query_budget', None))
+        response.headers['X-Query-Count'] = str(len(log))
+        response.headers['X-Query-Time'] = f"{log.total_time() * 1000:.1f}"
+        if found:
+            message = f"{request.method} {request.path}:\n  " + "\n  ".join(found) + "\n" + log.report()
+            if QUERY_WATCH == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    @app.teardown_request
+    def reset_query_log(exc):
+        token = g.pop('query_log_token', None)
+        if token is not None:
+            _request_log.reset(token)
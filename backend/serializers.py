@@ -0,0 +1,280 @@
+# backend/serializers.py
+"""
+Response serialization: the field sets every view returns, and the JSON
+encoder behind jsonify().
+
+A Serializer is declared once per model and view, from attribute names
+(copied as they are) and Fields (an attribute plus a transform):
+
+    COURSE_ADMIN = Serializer('id', 'title', ..., created_at=Field('created_at', isoformat))
+    COURSE_ADMIN(course)              -> dict
+    COURSE_ADMIN.many(courses)        -> [dict, ...]
+    PAYMENT_ADMIN(payment, course_title=course.title)
+                                      extra keys, e.g. from a joined row
+
+The attribute reads are compiled once per field set into an
+operator.itemgetter over the instance __dict__ (where SQLAlchemy keeps
+loaded column values), with an attrgetter fallback for expired or
+deferred attributes. A row costs one C call plus the transforms instead
+of an ORM descriptor call and dict store per field. Detail sets extend the
+public list sets, so a field added to a list shows up on the detail page
+too.
+
+JSON is encoded by orjson when it is installed (`pip install orjson`),
+several times faster than the json module on large admin lists, and by
+the json module otherwise. Both write the same bytes: sorted keys,
+compact, UTF-8. Dates and other types orjson does not handle the way
+Flask does are passed to Flask's default encoder. asyncapi.py encodes
+with dumps() too, so both serving modes produce the same bodies and
+ETags.
+"""
+from datetime import datetime, timezone
+from operator import attrgetter, itemgetter
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only
+
+from uploads import derivatives_published_at, upload_derivatives
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+    import json
+
+
+# --------------- JSON -----------------
+def _default(value):
+    return DefaultJSONProvider.default(value)
+
+
+if orjson is not None:
+    ORJSON_OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+                      | orjson.OPT_PASSTHROUGH_DATETIME)
+
+    def dumps(payload, indent=False):
+        """`payload` as UTF-8 JSON bytes with a trailing newline"""
+        return orjson.dumps(payload, default=_default,
+                            option=ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0))
+else:
+    def dumps(payload, indent=False):
+        """`payload` as UTF-8 JSON bytes with a trailing newline"""
+        return (json.dumps(payload, default=_default, sort_keys=True, ensure_ascii=False,
+                           indent=2 if indent else None, separators=None if indent else (',', ':'))
+                + '\n').encode('utf-8')
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes jsonify() responses with dumps()"""
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(dumps(obj, indent=indent), mimetype=self.mimetype)
+
+
+# --------------- field sets -----------------
+class Field:
+    """Output of `attr` (a dotted path is allowed) passed through `transform`"""
+    __slots__ = ('attr', 'transform')
+
+    def __init__(self, attr, transform=None):
+        self.attr = attr
+        self.transform = transform
+
+
+class Serializer:
+    def __init__(self, *names, **fields):
+        self.fields = {name: Field(name) for name in names}
+        self.fields.update(fields)
+        self.keys = tuple(self.fields)
+        attrs = [field.attr for field in self.fields.values()]
+        # Repeating a single name keeps the getters returning tuples
+        self._getter = attrgetter(*attrs, *attrs[:1]) if len(attrs) == 1 else attrgetter(*attrs)
+        self._loaded = None
+        if not any('.' in attr for attr in attrs):
+            self._loaded = itemgetter(*attrs, *attrs[:1]) if len(attrs) == 1 else itemgetter(*attrs)
+        self._transforms = tuple(
+            (index, field.transform) for index, field in enumerate(self.fields.values()) if field.transform)
+
+    def _values(self, obj):
+        if self._loaded is not None:
+            # Loaded ORM columns sit in the instance __dict__; reading them
+            # there skips SQLAlchemy's attribute descriptors, which are most
+            # of the cost. Anything expired or deferred goes through getattr.
+            try:
+                return self._loaded(obj.__dict__)
+            except (KeyError, AttributeError):
+                pass
+        return self._getter(obj)
+
+    def __call__(self, obj, **extra):
+        values = self._values(obj)
+        if self._transforms:
+            values = list(values)
+            for index, transform in self._transforms:
+                values[index] = transform(values[index])
+        data = dict(zip(self.keys, values))
+        if extra:
+            data.update(extra)
+        return data
+
+    def many(self, objs):
+        return [self(obj) for obj in objs]
+
+    def load_only(self, model, *extra):
+        """
+        Query option selecting just the columns of `model` this field set
+        (plus `extra` attribute names) reads, e.g. the sort key a view
+        needs besides its output
+        """
+        columns = inspect(model).column_attrs
+        attrs = dict.fromkeys([field.attr for field in self.fields.values()] + list(extra))
+        return load_only(*[getattr(model, attr) for attr in attrs if attr in columns])
+
+    def extend(self, *names, **fields):
+        """This field set plus more fields (replacing any of the same name)"""
+        merged = dict(self.fields)
+        merged.update({name: Field(name) for name in names})
+        merged.update(fields)
+        return Serializer(**merged)
+
+
+# --------------- transforms -----------------
+def isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def or_empty_list(value):
+    return value or []
+
+
+def public_image_url(image_url):
+    """Absolute URL for a catalog image stored under /uploads/"""
+    if image_url and not image_url.startswith('http'):
+        return f"http://localhost:7000{image_url}"
+    return image_url
+
+
+def public_upload_url(path):
+    """Absolute URL for an uploaded file, None if there is none"""
+    return public_image_url(path) if path else None
+
+
+def image_srcset(image_url):
+    """{format: srcset string} for an uploaded catalog image, {} until its derivatives exist"""
+    if not image_url or not image_url.startswith('/uploads/'):
+        return {}
+    return {
+        image_format: ", ".join(
+            f"http://localhost:7000/uploads/{derivative} {width}w" for width, derivative in entries
+        )
+        for image_format, entries in upload_derivatives(image_url[len('/uploads/'):]).items()
+    }
+
+
+def images_last_modified(image_urls):
+    """
+    When the newest srcset manifest of these catalog images was published
+    (naive UTC, like the updated_at columns), None if none has one yet
+    """
+    published = [
+        derivatives_published_at(image_url[len('/uploads/'):])
+        for image_url in image_urls if image_url and image_url.startswith('/uploads/')
+    ]
+    published = [timestamp for timestamp in published if timestamp is not None]
+    if not published:
+        return None
+    return datetime.fromtimestamp(max(published), timezone.utc).replace(tzinfo=None)
+
+
+IMAGE_FIELDS = {
+    'image_url': Field('image_url', public_image_url),
+    'image_srcset': Field('image_url', image_srcset),
+}
+ADMIN_TIMESTAMPS = {
+    'created_at': Field('created_at', isoformat),
+    'updated_at': Field('updated_at', isoformat),
+}
+
+# --------------- courses -----------------
+# /api/courses and /api/courses/<slug>
+COURSE_PUBLIC = Serializer(
+    'id', 'title', 'description', 'detailed_description', 'level', 'rating', 'students', 'duration',
+    'price', 'original_price', 'discount', 'category', 'instructor', 'slug', 'course_fees', 'course_code',
+    'total_amount',
+    features=Field('features', or_empty_list),
+    **IMAGE_FIELDS,
+)
+# Admin sets return stored image paths and raw JSON columns, as edited
+COURSE_ADMIN = Serializer(
+    'id', 'title', 'description', 'detailed_description', 'level', 'rating', 'students', 'duration',
+    'price', 'original_price', 'discount', 'image_url', 'category', 'instructor', 'slug', 'course_fees',
+    'course_code', 'total_amount', 'features', 'is_active',
+    **ADMIN_TIMESTAMPS,
+)
+
+# --------------- internships -----------------
+INTERNSHIP_SUMMARY = Serializer(
+    'id', 'title', 'description', 'category', 'duration', 'internship_type', 'location', 'slug',
+    'internship_code',
+    **IMAGE_FIELDS,
+)
+INTERNSHIP_DETAIL = INTERNSHIP_SUMMARY.extend(
+    'detailed_description', 'eligibility',
+    skills=Field('skills', or_empty_list),
+    perks=Field('perks', or_empty_list),
+)
+INTERNSHIP_ADMIN = Serializer(
+    'id', 'title', 'description', 'detailed_description', 'category', 'duration', 'internship_type',
+    'location', 'skills', 'eligibility', 'perks', 'image_url', 'internship_code', 'slug', 'is_active',
+    'total_applications',
+    **ADMIN_TIMESTAMPS,
+)
+
+# --------------- projects -----------------
+PROJECT_SUMMARY = Serializer(
+    'id', 'title', 'description', 'category', 'duration', 'project_type', 'difficulty_level', 'slug',
+    'project_code', 'total_enrollments',
+    technologies=Field('technologies', or_empty_list),
+    **IMAGE_FIELDS,
+)
+PROJECT_DETAIL = PROJECT_SUMMARY.extend(
+    'detailed_description',
+    # Pricing fields
+    'price', 'original_price', 'course_fees', 'total_amount', 'discount', 'level', 'rating', 'students_count',
+    prerequisites=Field('prerequisites', or_empty_list),
+    learning_outcomes=Field('learning_outcomes', or_empty_list),
+)
+PROJECT_ADMIN = Serializer(
+    'id', 'title', 'description', 'detailed_description', 'category', 'duration', 'project_type',
+    'technologies', 'difficulty_level', 'prerequisites', 'learning_outcomes', 'image_url', 'project_code',
+    'slug', 'is_active', 'total_enrollments',
+    **ADMIN_TIMESTAMPS,
+)
+
+# --------------- submissions (admin lists) -----------------
+# Joined posting columns are passed as extra keys, e.g. course_title=course.title
+PAYMENT_ADMIN = Serializer(
+    'id', 'payment_id', 'student_name', 'email', 'mobile', 'payment_method', 'payment_status', 'amount',
+    'training_mode',
+    payment_screenshot=Field('payment_screenshot', public_upload_url),
+    preferred_start_date=Field('preferred_start_date', isoformat),
+    created_at=Field('created_at', isoformat),
+)
+PROJECT_ENROLLMENT_ADMIN = Serializer(
+    'id', 'enrollment_id', 'student_name', 'email', 'mobile', 'team_size', 'preferred_time', 'payment_method',
+    'payment_status', 'amount', 'district', 'state',
+    preferred_start_date=Field('preferred_start_date', isoformat),
+    payment_screenshot=Field('payment_screenshot', public_upload_url),
+    created_at=Field('created_at', isoformat),
+)
+INTERNSHIP_APPLICATION_ADMIN = Serializer(
+    'id', 'enrollment_id', 'fname', 'lname', 'email', 'mobile', 'experience_level', 'portfolio_url',
+    'github_url', 'motivation', 'resume_path', 'gstin', 'billing_address', 'district', 'state',
+    'preferred_time', 'availability', 'payment_status',
+    preferred_start_date=Field('preferred_start_date', isoformat),
+    date=Field('date', isoformat),
+    updated_at=Field('updated_at', isoformat),
+)
@@ -0,0 +1,132 @@
+# backend/serving.py
+"""
+Serving files from UPLOAD_FOLDER under /uploads/.
+
+send_upload(relative_path) resolves the path safely (no "..", no hidden
+temp files), stats it once and answers with a conditional response: ETag
+and Last-Modified revalidation and HTTP Range requests, so large PDFs can
+be resumed or read page by page. The file body goes out through the WSGI
+server's file wrapper, which gunicorn turns into a zero-copy sendfile().
+
+UPLOAD_SENDFILE can hand the transfer to the front proxy instead:
+    direct            the app streams the file (default)
+    x-sendfile        "X-Sendfile: <disk path>" for Apache mod_xsendfile / lighttpd
+    x-accel-redirect  "X-Accel-Redirect: <UPLOAD_ACCEL_PREFIX><path>" for nginx,
+                      with an internal location such as
+
+                          location /internal-uploads/ {
+                              internal;
+                              alias /srv/app/backend/uploads/;
+                          }
+
+The proxy then does Range, sendfile and keep-alive itself and keeps the
+Content-Type and Cache-Control headers set here.
+
+With a remote storage backend (UPLOAD_STORAGE=s3) the routes answer with a
+redirect to the object's public or pre-signed URL instead; the bucket
+serves the bytes with the Cache-Control stored on the object.
+
+Cache-Control depends on the folder's UploadPolicy and the file name:
+    private folders (resumes, payment screenshots, attachments) and files
+    outside the known folders (legacy uploads at the root)
+                      "private, no-store"
+    hashed names      "public, max-age=31536000, immutable"; the name is the
+                      content hash (or a legacy random UUID) so it never
+                      points at other bytes. A catalog image is rewritten
+                      once by the background optimizer, so it only counts
+                      as immutable once that finished (manifest written, or
+                      UPLOAD_SETTLE_SECONDS after the upload)
+    everything else   short public caching (UPLOAD_SHORT_MAX_AGE in uploads.py)
+"""
+import os
+import re
+import stat
+import time
+import mimetypes
+
+from flask import current_app, redirect, request
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file
+
+from imaging import manifest_path
+from storage import get_storage
+from uploads import (
+    IMMUTABLE_CACHE_CONTROL, PRIVATE_CACHE_CONTROL, SHORT_CACHE_CONTROL, UPLOAD_FOLDER, UPLOAD_POLICIES,
+)
+
+UPLOAD_SENDFILE = os.environ.get("UPLOAD_SENDFILE", "direct").lower()
+UPLOAD_ACCEL_PREFIX = os.environ.get("UPLOAD_ACCEL_PREFIX", "/internal-uploads/")
+UPLOAD_SETTLE_SECONDS = int(os.environ.get("UPLOAD_SETTLE_SECONDS", 600))
+
+# "<sha256>.<ext>", "<uuid hex>.<ext>" and derivatives "<name>-<width>.<ext>"
+HASHED_NAME_RE = re.compile(r'^(?:[0-9a-f]{64}|[0-9a-f]{32})(-\d+)?\.[a-z0-9]+$')
+
+FOLDER_POLICIES = {policy.folder: policy for policy in UPLOAD_POLICIES.values()}
+
+
+def cache_control_for(relative_path, path, mtime, now):
+    folder, _, _ = relative_path.partition('/')
+    policy = FOLDER_POLICIES.get(folder)
+    # Files outside the known folders (e.g. legacy CVs at the uploads root)
+    # are treated as private, as redirect_to_object does
+    if policy is None or policy.private:
+        return PRIVATE_CACHE_CONTROL
+
+    match = HASHED_NAME_RE.match(os.path.basename(relative_path))
+    if match:
+        is_derivative = match.group(1) is not None
+        settled = (
+            not policy.optimize or is_derivative
+            or os.path.exists(manifest_path(path))
+            or now - mtime > UPLOAD_SETTLE_SECONDS
+        )
+        if settled:
+            return IMMUTABLE_CACHE_CONTROL
+    return SHORT_CACHE_CONTROL
+
+
+def redirect_to_object(storage, relative_path):
+    """Redirect to a file in remote storage, None if there is no such object"""
+    if relative_path.startswith('.') or '/.' in relative_path or not storage.exists(relative_path):
+        return None
+    policy = FOLDER_POLICIES.get(relative_path.partition('/')[0])
+    private = policy is None or policy.private
+    response = redirect(storage.download_url(relative_path, private=private), code=302)
+    # Pre-signed URLs expire, so the redirect itself is only cached briefly
+    response.headers['Cache-Control'] = PRIVATE_CACHE_CONTROL if private else SHORT_CACHE_CONTROL
+    return response
+
+
+def send_upload(relative_path):
+    """Response for /uploads/<relative_path>, None if there is no such file"""
+    storage = get_storage()
+    if not storage.is_local:
+        return redirect_to_object(storage, relative_path)
+
+    path = safe_join(UPLOAD_FOLDER, relative_path)
+    if path is None or os.path.basename(path).startswith('.'):
+        return None
+    try:
+        file_stat = os.stat(path)
+    except OSError:
+        return None
+    if not stat.S_ISREG(file_stat.st_mode):
+        return None
+
+    relative_path = os.path.relpath(path, UPLOAD_FOLDER).replace(os.sep, '/')
+    cache_control = cache_control_for(relative_path, path, file_stat.st_mtime, time.time())
+
+    if UPLOAD_SENDFILE == 'x-accel-redirect':
+        response = current_app.response_class(
+            mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream')
+        response.headers['X-Accel-Redirect'] = UPLOAD_ACCEL_PREFIX + relative_path
+    else:
+        response = send_file(
+            path, request.environ,
+            conditional=True,
+            last_modified=file_stat.st_mtime,
+            use_x_sendfile=UPLOAD_SENDFILE == 'x-sendfile',
+            response_class=current_app.response_class,
+        )
+    response.headers['Cache-Control'] = cache_control
+    return response
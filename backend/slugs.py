@@ -0,0 +1,70 @@
+# backend/slugs.py
+"""
+Slug allocation for courses, internships and projects.
+
+A title maps to a base slug; if that is taken the row gets the lowest free
+"<base>-<n>" suffix. All existing candidates are read with one prefix query
+(indexed by the text_pattern_ops indexes from migration 0003) instead of
+probing suffix by suffix. Two admins creating the same title at once can
+still pick the same slug, so the insert runs in a savepoint and is retried
+with a fresh allocation when it hits the unique constraint on slug.
+"""
+import os
+import re
+
+from sqlalchemy.exc import IntegrityError
+
+SLUG_MAX_ATTEMPTS = int(os.environ.get("SLUG_MAX_ATTEMPTS", 5))
+
+# Unique constraints PostgreSQL created for the slug columns (<table>_slug_key)
+SLUG_CONSTRAINTS = {'courses_slug_key', 'internship_postings_slug_key', 'project_postings_slug_key'}
+# SQLite names the column instead of the constraint
+SQLITE_SLUG_CONFLICT_RE = re.compile(r"UNIQUE constraint failed: (courses|internship_postings|project_postings)\.slug$")
+
+
+def slugify(title):
+    return (title or '').lower().replace(' ', '-')
+
+
+def allocate_slug(session, model, base_slug):
+    """Return `base_slug` or the first free `base_slug-N` for `model`"""
+    taken = {
+        slug for (slug,) in session.query(model.slug).filter(
+            (model.slug == base_slug) | model.slug.startswith(f"{base_slug}-", autoescape=True)
+        )
+    }
+    if base_slug not in taken:
+        return base_slug
+
+    suffix = re.compile(rf"^{re.escape(base_slug)}-(\d+)$")
+    used = {int(m.group(1)) for m in map(suffix.match, taken) if m}
+    counter = 1
+    while counter in used:
+        counter += 1
+    return f"{base_slug}-{counter}"
+
+
+def is_slug_conflict(error):
+    """True if `error` violated the unique slug of a course, internship or project"""
+    diag = getattr(error.orig, 'diag', None)
+    if diag is not None:
+        return diag.constraint_name in SLUG_CONSTRAINTS
+    return bool(SQLITE_SLUG_CONFLICT_RE.search(str(error.orig)))
+
+
+def add_with_unique_slug(session, instance, base_slug, attempts=SLUG_MAX_ATTEMPTS):
+    """
+    Allocate a slug for `instance`, add and flush it. Retries on a
+    concurrent unique-violation on slug; other integrity errors propagate.
+    The caller commits.
+    """
+    model = type(instance)
+    for attempt in range(1, attempts + 1):
+        instance.slug = allocate_slug(session, model, base_slug)
+        try:
+            with session.begin_nested():
+                session.add(instance)
+            return instance
+        except IntegrityError as e:
+            if not is_slug_conflict(e) or attempt == attempts:
+                raise
@@ -0,0 +1,302 @@
+# backend/storage.py
+"""
+Where uploaded files live.
+
+Every upload is addressed by its key ("<folder>/ab/cd/<sha256>.<ext>", see
+uploads.py); the storage backend maps keys to bytes. UPLOAD_STORAGE picks
+the backend:
+
+    local   files under UPLOAD_FOLDER on this host (default)
+    s3      an S3-compatible bucket (AWS S3, MinIO, ...); needs `boto3`
+
+With s3 every backend node sees the same files, so the app can run on
+several hosts behind a load balancer. Downloads are redirects to
+pre-signed (or public, see S3_PUBLIC_URL) bucket URLs and browsers can PUT
+resumes and screenshots straight into the bucket with a pre-signed URL, so
+those bytes never pass through the Python workers.
+
+For development point S3_ENDPOINT_URL at a local MinIO:
+
+    docker run -p 9000:9000 minio/minio server /data
+    UPLOAD_STORAGE=s3 S3_ENDPOINT_URL=http://localhost:9000 S3_BUCKET=uploads \\
+    AWS_ACCESS_KEY_ID=minioadmin AWS_SECRET_ACCESS_KEY=minioadmin python connection.py
+
+The local backend implements the same interface, including pre-signed
+uploads: they go to PUT /uploads/direct/<token> on this app, with the
+token signed by UPLOAD_SIGNING_KEY.
+
+UPLOAD_SIGNING_KEY has no default: anyone holding it can mint tokens that
+claim any stored file. Without it the app refuses to start with
+UPLOAD_STORAGE=s3 (where direct uploads are the upload path), and with
+local storage it starts but direct uploads are turned off.
+"""
+import os
+import base64
+import hashlib
+import shutil
+import threading
+
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+UPLOAD_STORAGE = os.environ.get("UPLOAD_STORAGE", "local").lower()
+UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads")
+UPLOAD_PRESIGN_EXPIRES = int(os.environ.get("UPLOAD_PRESIGN_EXPIRES", 900))  # seconds
+UPLOAD_SIGNING_KEY = os.environ.get("UPLOAD_SIGNING_KEY")  # required for s3 and direct uploads
+
+S3_BUCKET = os.environ.get("S3_BUCKET", "uploads")
+S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL")  # None = AWS
+S3_REGION = os.environ.get("S3_REGION", "us-east-1")
+S3_PREFIX = os.environ.get("S3_PREFIX", "")
+# Base URL of a public bucket / CDN for non-private files; pre-signed URLs otherwise
+S3_PUBLIC_URL = os.environ.get("S3_PUBLIC_URL")
+
+
+class StorageError(Exception):
+    pass
+
+
+def direct_uploads_enabled():
+    return bool(UPLOAD_SIGNING_KEY)
+
+
+def check_storage_config():
+    """Raise StorageError for settings the app must not start with"""
+    if UPLOAD_STORAGE not in STORAGE_BACKENDS:
+        raise StorageError(f"Unknown UPLOAD_STORAGE: {UPLOAD_STORAGE}")
+    if UPLOAD_STORAGE != 'local' and not direct_uploads_enabled():
+        raise StorageError(f"UPLOAD_SIGNING_KEY must be set with UPLOAD_STORAGE={UPLOAD_STORAGE}")
+
+
+def signer():
+    if not direct_uploads_enabled():
+        raise StorageError("UPLOAD_SIGNING_KEY is not set")
+    return URLSafeTimedSerializer(UPLOAD_SIGNING_KEY, salt='direct-upload')
+
+
+def sign_upload(claims):
+    return signer().dumps(claims)
+
+
+def verify_upload(token, max_age=UPLOAD_PRESIGN_EXPIRES):
+    """Claims of a direct-upload token, None if forged or expired"""
+    if not direct_uploads_enabled():
+        return None
+    try:
+        return signer().loads(token, max_age=max_age)
+    except (BadSignature, SignatureExpired):
+        return None
+
+
+class LocalStorage:
+    """Files on this host's disk, under `root`"""
+
+    is_local = True
+
+    def __init__(self, root=UPLOAD_FOLDER):
+        self.root = root
+
+    def path(self, key):
+        return os.path.join(self.root, key)
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def size(self, key):
+        try:
+            return os.path.getsize(self.path(key))
+        except OSError:
+            return None
+
+    def modified_time(self, key):
+        try:
+            return os.path.getmtime(self.path(key))
+        except OSError:
+            return None
+
+    def touch(self, key):
+        os.utime(self.path(key))
+
+    def put_file(self, key, source_path, content_type=None, cache_control=None, move=False):
+        target = self.path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if move:
+            os.replace(source_path, target)
+        else:
+            tmp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+            shutil.copyfile(source_path, tmp_path)
+            os.replace(tmp_path, target)
+
+    def open(self, key):
+        return open(self.path(key), 'rb')
+
+    def read_bytes(self, key, length=None):
+        try:
+            with self.open(key) as f:
+                return f.read() if length is None else f.read(length)
+        except OSError:
+            return None
+
+    def delete(self, key):
+        if os.path.exists(self.path(key)):
+            os.remove(self.path(key))
+
+    def iter_keys(self, prefix):
+        """(key, mtime) for every file under `prefix`"""
+        for directory, _, files in os.walk(self.path(prefix)):
+            for name in files:
+                path = os.path.join(directory, name)
+                yield os.path.relpath(path, self.root).replace(os.sep, '/'), os.path.getmtime(path)
+
+    def download_url(self, key, filename=None, private=False):
+        # Served by this app (serving.py)
+        return None
+
+    def presign_upload(self, key, content_type, size, sha256, claims):
+        return {
+            'method': 'PUT',
+            'url': f"/uploads/direct/{sign_upload(claims)}",
+            'headers': {'Content-Type': content_type},
+        }
+
+
+class S3Storage:
+    """Objects in an S3-compatible bucket"""
+
+    is_local = False
+
+    def __init__(self, bucket=S3_BUCKET, prefix=S3_PREFIX, endpoint_url=S3_ENDPOINT_URL, region=S3_REGION):
+        import boto3
+        from botocore.config import Config
+        from botocore.exceptions import ClientError
+        self.client_error = ClientError
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client(
+            's3', endpoint_url=endpoint_url, region_name=region,
+            config=Config(signature_version='s3v4', s3={'addressing_style': 'path'}),
+        )
+
+    def object_key(self, key):
+        return f"{self.prefix}{key}"
+
+    def head(self, key):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))
+        except self.client_error as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def exists(self, key):
+        return self.head(key) is not None
+
+    def size(self, key):
+        head = self.head(key)
+        return head['ContentLength'] if head else None
+
+    def modified_time(self, key):
+        head = self.head(key)
+        return head['LastModified'].timestamp() if head else None
+
+    def touch(self, key):
+        # Copying an object onto itself refreshes LastModified (restarts the GC grace period)
+        head = self.head(key) or {}
+        self.client.copy_object(
+            Bucket=self.bucket, Key=self.object_key(key),
+            CopySource={'Bucket': self.bucket, 'Key': self.object_key(key)},
+            MetadataDirective='REPLACE',
+            ContentType=head.get('ContentType', 'application/octet-stream'),
+            **({'CacheControl': head['CacheControl']} if head.get('CacheControl') else {}),
+        )
+
+    def put_file(self, key, source_path, content_type=None, cache_control=None, move=False):
+        extra = {}
+        if content_type:
+            extra['ContentType'] = content_type
+        if cache_control:
+            extra['CacheControl'] = cache_control
+        self.client.upload_file(source_path, self.bucket, self.object_key(key), ExtraArgs=extra)
+        if move:
+            os.remove(source_path)
+
+    def open(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=self.object_key(key))['Body']
+
+    def read_bytes(self, key, length=None):
+        params = {'Bucket': self.bucket, 'Key': self.object_key(key)}
+        if length is not None:
+            params['Range'] = f"bytes=0-{length - 1}"
+        try:
+            return self.client.get_object(**params)['Body'].read()
+        except self.client_error:
+            return None
+
+    def sha256(self, key):
+        """Hex SHA-256 of an object: the checksum S3 verified on upload, else hashed from the bytes"""
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self.object_key(key), ChecksumMode='ENABLED')
+        except self.client_error:
+            return None
+        checksum = head.get('ChecksumSHA256')
+        # Multipart objects carry a checksum of the part checksums ("...-<parts>")
+        if checksum and '-' not in checksum:
+            return base64.b64decode(checksum).hex()
+        digest = hashlib.sha256()
+        for chunk in self.open(key).iter_chunks(64 * 1024):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self.object_key(key))
+
+    def iter_keys(self, prefix):
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.object_key(prefix)):
+            for item in page.get('Contents', []):
+                yield item['Key'][len(self.prefix):], item['LastModified'].timestamp()
+
+    def download_url(self, key, filename=None, private=False):
+        if S3_PUBLIC_URL and not private:
+            return f"{S3_PUBLIC_URL.rstrip('/')}/{self.object_key(key)}"
+        params = {'Bucket': self.bucket, 'Key': self.object_key(key)}
+        if filename:
+            params['ResponseContentDisposition'] = f'inline; filename="{filename}"'
+        return self.client.generate_presigned_url(
+            'get_object', Params=params, ExpiresIn=UPLOAD_PRESIGN_EXPIRES)
+
+    def presign_upload(self, key, content_type, size, sha256, claims):
+        # The checksum is part of the signature: the bucket rejects any other bytes
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode('ascii')
+        url = self.client.generate_presigned_url(
+            'put_object',
+            Params={
+                'Bucket': self.bucket, 'Key': self.object_key(key),
+                'ContentType': content_type, 'ContentLength': size,
+                'ChecksumSHA256': checksum,
+            },
+            ExpiresIn=UPLOAD_PRESIGN_EXPIRES,
+        )
+        return {
+            'method': 'PUT',
+            'url': url,
+            'headers': {'Content-Type': content_type, 'x-amz-checksum-sha256': checksum},
+        }
+
+
+STORAGE_BACKENDS = {
+    'local': LocalStorage,
+    's3': S3Storage,
+}
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """The configured backend, created on first use"""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            check_storage_config()
+            _storage = STORAGE_BACKENDS[UPLOAD_STORAGE]()
+        return _storage
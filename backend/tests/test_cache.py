@@ -0,0 +1,57 @@
+# backend/tests/test_cache.py
+"""
+Response cache generations: a body rendered before an invalidation must
+not be stored as the current entry.
+
+    python -m pytest tests/test_cache.py
+"""
+import os
+import sys
+
+from flask import Flask, jsonify
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache  # noqa: E402
+from cache import CachedResponse, MemoryResponseCache  # noqa: E402
+
+
+def test_set_after_invalidate_is_dropped():
+    store = MemoryResponseCache()
+    cached, generation = store.get('courses', '/api/courses?')
+    assert cached is None
+
+    store.invalidate('courses')
+    store.set('courses', '/api/courses?', CachedResponse(b'[]', 'etag', None), generation)
+    assert store.get('courses', '/api/courses?')[0] is None
+
+    cached, generation = store.get('courses', '/api/courses?')
+    store.set('courses', '/api/courses?', CachedResponse(b'[1]', 'etag', None), generation)
+    assert store.get('courses', '/api/courses?')[0].body == b'[1]'
+
+
+def test_view_losing_race_with_write_is_not_cached(monkeypatch):
+    store = MemoryResponseCache()
+    monkeypatch.setattr(cache, 'response_cache', store)
+    monkeypatch.setattr(cache, 'CACHE_ENABLED', True)
+    rows = ['old']
+    app = Flask(__name__)
+
+    @app.route('/api/courses')
+    @cache.cached_response('courses')
+    def courses():
+        body = jsonify(list(rows))
+        if rows == ['old']:
+            # An admin write commits and invalidates while this body is built
+            rows[:] = ['new']
+            cache.invalidate_cache('courses')
+        return body
+
+    client = app.test_client()
+    first = client.get('/api/courses')
+    assert first.json == ['old'] and first.headers['X-Cache'] == 'MISS'
+
+    second = client.get('/api/courses')
+    assert second.json == ['new'] and second.headers['X-Cache'] == 'MISS'
+    third = client.get('/api/courses')
+    assert third.json == ['new'] and third.headers['X-Cache'] == 'HIT'
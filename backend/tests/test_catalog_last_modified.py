@@ -0,0 +1,76 @@
+# backend/tests/test_catalog_last_modified.py
+"""
+Last-Modified of the public catalog once image derivatives are published.
+
+Publishing a srcset manifest fills image_srcset without touching the row,
+so the response's Last-Modified must move past the row's updated_at, or
+clients revalidating with If-Modified-Since keep the body without it.
+Storage is a LocalStorage in a temp dir, the database a throwaway SQLite
+file:
+
+    python -m pytest tests/test_catalog_last_modified.py
+"""
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+from werkzeug.http import http_date, parse_date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage  # noqa: E402
+import uploads  # noqa: E402
+from cache import invalidate_cache  # noqa: E402
+from imaging import manifest_path  # noqa: E402
+
+KEY = 'courses/ab/cd/abcd.jpg'
+UPDATED_AT = datetime(2025, 1, 1, 12, 0, 0)
+PUBLISHED_AT = datetime(2025, 3, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def upload_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, '_storage', storage.LocalStorage(str(tmp_path)))
+    uploads.forget_derivatives(KEY)
+    yield tmp_path
+    uploads.forget_derivatives(KEY)
+
+
+@pytest.fixture
+def client(tmp_path, upload_root):
+    from connection import Course, create_app, db
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'catalog.db'}"})
+    with app.app_context():
+        db.session.add(Course(title='Image Course', slug='image-course', total_amount='1000',
+                              image_url=f'/uploads/{KEY}', updated_at=UPDATED_AT))
+        db.session.commit()
+    invalidate_cache('courses')
+    return app.test_client()
+
+
+def publish_manifest(root):
+    """What image processing leaves behind, followed by its on_done hook"""
+    path = root / manifest_path(KEY)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({'webp': [[480, 'abcd-480.webp']]}))
+    timestamp = PUBLISHED_AT.replace(tzinfo=timezone.utc).timestamp()
+    os.utime(path, (timestamp, timestamp))
+    uploads.forget_derivatives(KEY)
+    invalidate_cache('courses')
+
+
+@pytest.mark.parametrize('url, field', [('/api/courses', 'courses'), ('/api/courses/image-course', 'course')])
+def test_published_manifest_advances_last_modified(client, upload_root, url, field):
+    before = client.get(url)
+    assert before.status_code == 200
+    assert parse_date(before.headers['Last-Modified']) == UPDATED_AT.replace(tzinfo=timezone.utc)
+    assert 'abcd-480.webp' not in json.dumps(before.get_json()[field])
+
+    publish_manifest(upload_root)
+
+    revalidated = client.get(url, headers={'If-Modified-Since': before.headers['Last-Modified']})
+    assert revalidated.status_code == 200
+    assert 'abcd-480.webp' in json.dumps(revalidated.get_json()[field])
+    assert revalidated.headers['Last-Modified'] == http_date(PUBLISHED_AT.replace(tzinfo=timezone.utc))
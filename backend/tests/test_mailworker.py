@@ -0,0 +1,150 @@
+# backend/tests/test_mailworker.py
+"""
+The outbox worker against a local SMTP server.
+
+A notification is queued through a view (MAIL_DELIVERY=queue), then one
+drain of mailworker.py sends it to an aiosmtpd server on localhost. With
+nothing listening on the SMTP port the row is rescheduled with backoff
+instead, and given up after MAIL_MAX_ATTEMPTS.
+
+Runs on a throwaway SQLite database:
+
+    python -m pytest tests/test_mailworker.py
+"""
+import os
+import socket
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+
+controller = pytest.importorskip("aiosmtpd.controller")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# mailworker.py builds its app from DATABASE_URL when it is imported
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'mailworker.db')}"
+
+import connection  # noqa: E402
+import mailconnect  # noqa: E402
+import mailworker  # noqa: E402
+from connection import EmailOutbox, db  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Inbox:
+    """aiosmtpd handler that keeps every message it receives"""
+    def __init__(self):
+        self.envelopes = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.envelopes.append(envelope)
+        return '250 Message accepted'
+
+
+@pytest.fixture(autouse=True)
+def smtp_settings(monkeypatch):
+    port = free_port()
+    monkeypatch.setattr(connection, 'MAIL_DELIVERY', 'queue')
+    monkeypatch.setattr(mailconnect, 'SMTP_HOST', '127.0.0.1')
+    monkeypatch.setattr(mailconnect, 'SMTP_PORT', port)
+    monkeypatch.setattr(mailconnect, 'SMTP_STARTTLS', False)
+    monkeypatch.setattr(mailconnect, 'SMTP_LOGIN', False)
+    monkeypatch.setattr(mailconnect, 'SMTP_TIMEOUT', 5)
+    with mailworker.app.app_context():
+        EmailOutbox.query.delete()
+        db.session.commit()
+    yield port
+    mailconnect.smtp_pool.close_all()
+
+
+@pytest.fixture
+def inbox(smtp_settings):
+    handler = Inbox()
+    server = controller.Controller(handler, hostname='127.0.0.1', port=smtp_settings)
+    server.start()
+    yield handler
+    server.stop()
+
+
+def enqueue_enrollment():
+    response = mailworker.app.test_client().post(
+        '/enroll', json={'fullName': 'Asha Rao', 'email': 'asha@example.com', 'mobile': '9000000000'})
+    assert response.status_code == 201, response.get_data(as_text=True)
+    with mailworker.app.app_context():
+        entry = EmailOutbox.query.one()
+        assert entry.status == 'pending'
+        return entry.id
+
+
+def drain():
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return mailworker.drain_once(executor)
+
+
+def outbox_row(entry_id):
+    with mailworker.app.app_context():
+        entry = db.session.get(EmailOutbox, entry_id)
+        db.session.expunge(entry)
+        return entry
+
+
+def test_drain_sends_queued_notification(inbox):
+    entry_id = enqueue_enrollment()
+
+    assert drain() == 1
+
+    assert len(inbox.envelopes) == 1
+    envelope = inbox.envelopes[0]
+    assert envelope.rcpt_tos == [mailconnect.sent_email]
+    assert b'Asha Rao' in envelope.content
+    entry = outbox_row(entry_id)
+    assert entry.status == 'sent'
+    assert entry.sent_at is not None
+    assert entry.attempts == 1
+    assert entry.last_error is None
+
+
+def test_refused_connection_is_retried_with_backoff(smtp_settings):
+    entry_id = enqueue_enrollment()
+
+    started = datetime.utcnow()
+    assert drain() == 1
+
+    entry = outbox_row(entry_id)
+    assert entry.status == 'pending'
+    assert entry.attempts == 1
+    assert entry.last_error
+    delay = timedelta(seconds=mailworker.backoff_delay(1))
+    assert started + delay <= entry.next_attempt_at <= datetime.utcnow() + delay
+
+    # Not due again until the backoff has passed
+    assert drain() == 0
+
+    with mailworker.app.app_context():
+        db.session.get(EmailOutbox, entry_id).next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+    assert drain() == 1
+    entry = outbox_row(entry_id)
+    assert entry.status == 'pending'
+    assert entry.attempts == 2
+    assert mailworker.backoff_delay(2) == min(2 * mailworker.backoff_delay(1), mailworker.MAIL_BACKOFF_MAX)
+
+
+def test_refused_connection_fails_after_max_attempts(smtp_settings, monkeypatch):
+    monkeypatch.setattr(mailworker, 'MAIL_MAX_ATTEMPTS', 1)
+    entry_id = enqueue_enrollment()
+
+    assert drain() == 1
+
+    entry = outbox_row(entry_id)
+    assert entry.status == 'failed'
+    assert entry.last_error
+    assert drain() == 0
@@ -0,0 +1,98 @@
+# backend/tests/test_query_budgets.py
+"""
+Statement counts of the admin views, checked with querywatch.expect_queries.
+
+Each view declares its budget with @query_budget(n). Here it is requested
+over enough seeded rows that a lazy load per row (an N+1) would exceed
+that budget by far. The admin stats cache is cleared first, so views that
+include the aggregate are measured on their cold path.
+
+Runs on a throwaway SQLite database:
+
+    python -m pytest tests/test_query_budgets.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from querywatch import expect_queries  # noqa: E402
+
+ROWS = 12
+
+# (url, list in the response that must hold ROWS entries)
+BUDGET_CASES = [
+    ('/admin/payments?per_page=50', 'payments'),
+    ('/admin/payments?search=student&status=pending&per_page=50', 'payments'),
+    ('/admin/project-enrollments', 'enrollments'),
+    ('/admin/project-enrollments?status=pending&sort=student_name', 'enrollments'),
+    ('/admin/internship-applications', 'applications'),
+    ('/admin/internship-applications?search=student&sort=fname', 'applications'),
+    ('/admin/courses', 'courses'),
+    ('/admin/internships', 'internships'),
+    ('/admin/projects', 'projects'),
+    ('/admin/stats', None),
+]
+
+
+@pytest.fixture(scope='module')
+def app(tmp_path_factory):
+    from connection import create_app
+    database = tmp_path_factory.mktemp('budgets') / 'budgets.db'
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}'})
+    with app.app_context():
+        seed()
+    return app
+
+
+def seed():
+    from connection import (
+        Course, InternshipPosting, ProjectPosting, add_submission, db, new_internship_application, new_payment,
+        new_project_enrollment,
+    )
+
+    student = {'name': 'Student', 'fname': 'Student', 'lname': 'One', 'email': 'student@example.com',
+               'mobile': '9000000000', 'motivation': 'Learning', 'validation_code': 'm2nz'}
+    for i in range(ROWS):
+        course = Course(title=f'Course {i}', slug=f'course-{i}', course_code=f'C{i}', category='Data',
+                        total_amount='1000', image_url=f'/uploads/courses/{i:02x}/00/{i:02x}00.jpg')
+        internship = InternshipPosting(title=f'Internship {i}', slug=f'internship-{i}', internship_code=f'I{i}',
+                                       category='Web')
+        project = ProjectPosting(title=f'Project {i}', slug=f'project-{i}', project_code=f'P{i}', category='ML',
+                                 price='500')
+        db.session.add_all([course, internship, project])
+        db.session.flush()
+        add_submission('payment', new_payment(student, course, None)[0])
+        add_submission('project_enrollment', new_project_enrollment(student, project, None)[0])
+        add_submission('internship_application', new_internship_application(student, internship, None)[0])
+    db.session.commit()
+
+
+@pytest.fixture(scope='module')
+def client(app):
+    from flask_jwt_extended import create_access_token
+
+    with app.app_context():
+        token = create_access_token(identity='admin')
+    client = app.test_client()
+    client.environ_base['HTTP_AUTHORIZATION'] = f"Bearer {token}"
+    return client
+
+
+@pytest.mark.parametrize('url, items', BUDGET_CASES, ids=[case[0] for case in BUDGET_CASES])
+def test_admin_view_stays_within_budget(app, client, url, items):
+    from connection import invalidate_admin_stats
+
+    endpoint, _ = app.url_map.bind('localhost').match(url.split('?')[0])
+    budget = app.view_functions[endpoint].query_budget
+    invalidate_admin_stats()
+
+    with expect_queries(budget) as queries:
+        response = client.get(url)
+
+    assert response.status_code == 200, response.get_data(as_text=True)
+    if items:
+        assert len(response.get_json()[items]) == ROWS
+    assert len(queries) >= 1
@@ -0,0 +1,173 @@
+# backend/tests/test_query_plans.py
+"""
+Index usage of the hot queries, checked on the SQL the views actually run.
+
+Each case requests a route through the Flask test client, records the
+statements (with their parameters) the view sends to PostgreSQL and
+EXPLAINs them. Sequential scans are disabled for the EXPLAIN, so the
+result does not depend on how many rows the database holds: a statement
+that still plans a Seq Scan on its table, or a plan without one of the
+expected indexes, means an index is missing or the query cannot use it.
+
+Needs a scratch PostgreSQL database (it is migrated and gets test rows):
+
+    TEST_DATABASE_URL=postgresql://postgres@localhost/tp_test python -m pytest tests
+
+Skipped when TEST_DATABASE_URL is not a reachable PostgreSQL database.
+"""
+import os
+import re
+import sys
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+# (description, method, url, form fields, table, SQL the statement must contain,
+#  indexes: 'any' of them or 'all' of them must appear in the plans). A
+# text_pattern_ops index also serves slug equality, so the planner may pick it.
+PLAN_CASES = [
+    ("payments newest first",
+     'GET', '/admin/payments', None,
+     'payments', 'FROM payments JOIN courses', ('any', ['ix_payments_created_at_id'])),
+    ("payments filtered by status, newest first",
+     'GET', '/admin/payments?status=pending', None,
+     'payments', 'FROM payments JOIN courses', ('any', ['ix_payments_status_created_at'])),
+    ("payments search by student, email, payment id and course title",
+     'GET', '/admin/payments?search=sharma', None,
+     'payments', 'FROM payments JOIN courses',
+     ('all', ['ix_payments_student_name_trgm', 'ix_payments_email_trgm', 'ix_payments_payment_id_trgm',
+              'ix_courses_title_trgm'])),
+    ("project enrollments newest first",
+     'GET', '/admin/project-enrollments', None,
+     'project_enrollments', 'FROM project_enrollments JOIN project_postings',
+     ('any', ['ix_project_enrollments_created_at_id'])),
+    ("project enrollments filtered by status, newest first",
+     'GET', '/admin/project-enrollments?status=pending', None,
+     'project_enrollments', 'FROM project_enrollments JOIN project_postings',
+     ('any', ['ix_project_enrollments_status_created_at'])),
+    ("internship applications newest first",
+     'GET', '/admin/internship-applications', None,
+     'internship_applications', 'FROM internship_applications JOIN internship_postings',
+     ('any', ['ix_internship_applications_date_id'])),
+    ("internship applications filtered by status, newest first",
+     'GET', '/admin/internship-applications?status=pending', None,
+     'internship_applications', 'FROM internship_applications JOIN internship_postings',
+     ('any', ['ix_internship_applications_status_date'])),
+    ("active course by slug",
+     'GET', '/api/courses/plan-check', None,
+     'courses', 'FROM courses',
+     ('any', ['ix_courses_active_slug', 'courses_slug_key', 'ix_courses_slug_pattern'])),
+    ("active internship by slug",
+     'GET', '/api/internships/plan-check', None,
+     'internship_postings', 'FROM internship_postings',
+     ('any', ['ix_internship_postings_active_slug', 'internship_postings_slug_key',
+              'ix_internship_postings_slug_pattern'])),
+    ("active project by slug",
+     'GET', '/api/projects/plan-check', None,
+     'project_postings', 'FROM project_postings',
+     ('any', ['ix_project_postings_active_slug', 'project_postings_slug_key',
+              'ix_project_postings_slug_pattern'])),
+    ("course slug allocation",
+     'POST', '/admin/courses', {'title': 'Plan Check', 'total_amount': '1'},
+     'courses', 'LIKE', ('any', ['ix_courses_slug_pattern'])),
+    ("internship slug allocation",
+     'POST', '/admin/internships', {'title': 'Plan Check'},
+     'internship_postings', 'LIKE', ('any', ['ix_internship_postings_slug_pattern'])),
+    ("project slug allocation",
+     'POST', '/admin/projects', {'title': 'Plan Check'},
+     'project_postings', 'LIKE', ('any', ['ix_project_postings_slug_pattern'])),
+]
+
+
+def postgres_available(url):
+    if not url or make_url(url).get_backend_name() != 'postgresql':
+        return False
+    engine = create_engine(url)
+    try:
+        with engine.connect():
+            return True
+    except Exception:
+        return False
+    finally:
+        engine.dispose()
+
+
+pytestmark = pytest.mark.skipif(
+    not postgres_available(TEST_DATABASE_URL), reason="TEST_DATABASE_URL is not a reachable PostgreSQL database")
+
+
+@pytest.fixture(scope='module')
+def app():
+    from connection import create_app
+    return create_app({'SQLALCHEMY_DATABASE_URI': TEST_DATABASE_URL})
+
+
+@pytest.fixture(scope='module')
+def client(app):
+    from flask_jwt_extended import create_access_token
+
+    with app.app_context():
+        token = create_access_token(identity='admin')
+    client = app.test_client()
+    client.environ_base['HTTP_AUTHORIZATION'] = f"Bearer {token}"
+    return client
+
+
+@pytest.fixture(scope='module')
+def statements(app):
+    """Every statement the app runs, as (SQL, parameters)"""
+    from connection import db
+
+    recorded = []
+    with app.app_context():
+        engine = db.engine
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            recorded.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    yield recorded
+    event.remove(engine, 'before_cursor_execute', record)
+
+
+def explain(app, statement, parameters):
+    from connection import db
+
+    with app.app_context(), db.engine.connect() as conn:
+        conn.execute(text("SET enable_seqscan = off"))
+        plan = '\n'.join(row[0] for row in conn.exec_driver_sql(f"EXPLAIN {statement}", parameters))
+        conn.rollback()
+    return plan
+
+
+@pytest.mark.parametrize(
+    'method, url, form, table, marker, expected',
+    [case[1:] for case in PLAN_CASES],
+    ids=[case[0] for case in PLAN_CASES],
+)
+def test_view_queries_use_indexes(app, client, statements, method, url, form, table, marker, expected):
+    del statements[:]
+    response = client.open(url, method=method, data=form)
+    assert response.status_code < 500, response.get_data(as_text=True)
+
+    table_re = re.compile(rf'\bFROM {table}\b')
+    queries = [(sql, params) for sql, params in statements
+               if sql.lstrip().upper().startswith('SELECT') and marker in sql and table_re.search(sql)]
+    assert queries, f"{method} {url} ran no SELECT on {table} containing {marker!r}"
+
+    plans = [explain(app, sql, params) for sql, params in queries]
+    report = '\n\n'.join(f"{sql}\n{plan}" for (sql, _), plan in zip(queries, plans))
+    assert not any(f"Seq Scan on {table}" in plan for plan in plans), report
+
+    mode, indexes = expected
+    used = [index for index in indexes if any(index in plan for plan in plans)]
+    if mode == 'all':
+        assert used == indexes, report
+    else:
+        assert used, report
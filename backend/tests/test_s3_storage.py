@@ -0,0 +1,121 @@
+# backend/tests/test_s3_storage.py
+"""
+S3Storage and the direct-upload flow against a moto-mocked bucket.
+
+Covers put_file / download_url, and presign -> browser PUT -> claim,
+including uploads whose bytes or size do not match the upload link.
+
+    python -m pytest tests/test_s3_storage.py
+"""
+import hashlib
+import os
+import sys
+
+import pytest
+
+moto = pytest.importorskip("moto")
+requests = pytest.importorskip("requests")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage  # noqa: E402
+import uploads  # noqa: E402
+from uploads import UploadError, claim_direct_upload, presign_direct_upload  # noqa: E402
+
+PDF = b'%PDF-1.4\n' + b'resume body ' * 100
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    for name, value in {'AWS_ACCESS_KEY_ID': 'testing', 'AWS_SECRET_ACCESS_KEY': 'testing',
+                        'AWS_SESSION_TOKEN': 'testing', 'AWS_DEFAULT_REGION': 'us-east-1'}.items():
+        monkeypatch.setenv(name, value)
+    with moto.mock_aws():
+        s3 = storage.S3Storage(bucket='test-uploads', prefix='app/', endpoint_url=None, region='us-east-1')
+        s3.client.create_bucket(Bucket='test-uploads')
+        monkeypatch.setattr(storage, 'UPLOAD_STORAGE', 's3')
+        monkeypatch.setattr(storage, 'UPLOAD_SIGNING_KEY', 'test-signing-key')
+        monkeypatch.setattr(storage, 'S3_PUBLIC_URL', None)
+        monkeypatch.setattr(storage, '_storage', s3)
+        yield s3
+
+
+def put(upload, body):
+    response = requests.put(upload['url'], data=body, headers=upload['headers'])
+    assert response.status_code == 200, response.text
+    return response
+
+
+def test_put_file_and_download_url(bucket, tmp_path):
+    source = tmp_path / 'cv.pdf'
+    source.write_bytes(PDF)
+    key = 'resumes/ab/cd/abcd.pdf'
+
+    bucket.put_file(key, str(source), content_type='application/pdf', cache_control='private, max-age=60', move=True)
+
+    assert not source.exists()
+    assert bucket.exists(key) and bucket.size(key) == len(PDF)
+    assert bucket.read_bytes(key, length=8) == PDF[:8]
+    assert [k for k, _ in bucket.iter_keys('resumes/')] == [key]
+    head = bucket.head(key)
+    assert head['ContentType'] == 'application/pdf' and head['CacheControl'] == 'private, max-age=60'
+
+    url = bucket.download_url(key, filename='cv.pdf', private=True)
+    assert '/test-uploads/app/resumes/ab/cd/abcd.pdf?' in url
+    response = requests.get(url)
+    assert response.status_code == 200 and response.content == PDF
+    assert response.headers['Content-Disposition'] == 'inline; filename="cv.pdf"'
+
+
+def test_public_download_url_skips_signing(bucket, monkeypatch):
+    monkeypatch.setattr(storage, 'S3_PUBLIC_URL', 'https://cdn.example.com/')
+    assert bucket.download_url('courses/ab/cd/abcd.webp') == 'https://cdn.example.com/app/courses/ab/cd/abcd.webp'
+    assert 'X-Amz-Signature' in bucket.download_url('resumes/ab/cd/abcd.pdf', private=True)
+
+
+def test_presign_put_claim_round_trip(bucket):
+    sha256 = hashlib.sha256(PDF).hexdigest()
+    started = presign_direct_upload('resume', 'My CV.pdf', len(PDF), sha256)
+    assert started['upload']['method'] == 'PUT'
+
+    put(started['upload'], PDF)
+    stored = claim_direct_upload(started['token'], 'resume')
+
+    assert stored.key == uploads.upload_key(sha256, 'pdf', uploads.UPLOAD_POLICIES['resume'])
+    assert stored.url == f"/uploads/{stored.key}"
+    assert stored.size == len(PDF) and stored.sha256 == sha256
+    assert stored.original_name == 'My_CV.pdf' and stored.path is None
+    assert bucket.read_bytes(stored.key) == PDF
+
+
+def test_claim_without_put_is_rejected(bucket):
+    started = presign_direct_upload('resume', 'cv.pdf', len(PDF), hashlib.sha256(PDF).hexdigest())
+    with pytest.raises(UploadError, match="not found"):
+        claim_direct_upload(started['token'], 'resume')
+
+
+def test_claim_of_other_bytes_is_rejected(bucket):
+    sha256 = hashlib.sha256(PDF).hexdigest()
+    started = presign_direct_upload('resume', 'cv.pdf', len(PDF), sha256)
+    # Same size, different content: the checksum no longer matches
+    put(started['upload'], PDF[:-1] + b'!')
+
+    with pytest.raises(UploadError, match="does not match"):
+        claim_direct_upload(started['token'], 'resume')
+    assert not bucket.exists(uploads.upload_key(sha256, 'pdf', uploads.UPLOAD_POLICIES['resume']))
+
+
+def test_claim_of_other_size_is_rejected(bucket):
+    started = presign_direct_upload('resume', 'cv.pdf', len(PDF), hashlib.sha256(PDF).hexdigest())
+    put(started['upload'], PDF + b'more')
+
+    with pytest.raises(UploadError) as excinfo:
+        claim_direct_upload(started['token'], 'resume')
+    assert excinfo.value.status == 413
+
+
+def test_claim_for_other_kind_is_rejected(bucket):
+    started = presign_direct_upload('resume', 'cv.pdf', len(PDF), hashlib.sha256(PDF).hexdigest())
+    put(started['upload'], PDF)
+    with pytest.raises(UploadError, match="invalid or expired"):
+        claim_direct_upload(started['token'], 'payment_screenshot')
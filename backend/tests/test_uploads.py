@@ -0,0 +1,147 @@
+# backend/tests/test_uploads.py
+"""
+Multipart file parts streamed into StagedUploads while the form is parsed
+(see uploads.UploadFormDataParser), through the Flask test client.
+
+Covers the per-kind byte cap, magic-byte checks, empty files, the
+request-level size limit and cleanup of staged files when parsing is
+aborted. Storage is a LocalStorage in a temp dir, the database a
+throwaway SQLite file:
+
+    python -m pytest tests/test_uploads.py
+"""
+import io
+import os
+import sys
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage  # noqa: E402
+import uploads  # noqa: E402
+
+
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.frombytes('RGB', (48, 48), os.urandom(48 * 48 * 3)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+PNG = png_bytes()
+PAYMENT = {'course_slug': 'upload-course', 'name': 'Student', 'email': 'student@example.com', 'mobile': '9000000000'}
+
+
+@pytest.fixture(scope='module')
+def app(tmp_path_factory):
+    from connection import Course, create_app, db
+    database = tmp_path_factory.mktemp('uploads') / 'uploads.db'
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}'})
+    with app.app_context():
+        db.session.add(Course(title='Upload Course', slug='upload-course', total_amount='1000'))
+        db.session.commit()
+    return app
+
+
+@pytest.fixture
+def upload_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setattr(storage, '_storage', storage.LocalStorage(str(tmp_path)))
+    return tmp_path
+
+
+@pytest.fixture
+def staged_paths(monkeypatch):
+    """Path of every StagedUpload created during the test"""
+    paths = []
+    original_init = uploads.StagedUpload.__init__
+
+    def init(self, kind, filename):
+        original_init(self, kind, filename)
+        paths.append(self.path)
+
+    monkeypatch.setattr(uploads.StagedUpload, '__init__', init)
+    return paths
+
+
+def incoming_files(root):
+    return [name for _, _, names in os.walk(root) for name in names if name.startswith('.incoming-')]
+
+
+def stored_files(root):
+    return [name for _, _, names in os.walk(root) for name in names if not name.startswith('.')]
+
+
+def post_payment(client, content, filename='screenshot.png'):
+    data = dict(PAYMENT, payment_screenshot=(io.BytesIO(content), filename))
+    return client.post('/api/payments', data=data, content_type='multipart/form-data')
+
+
+def test_screenshot_is_staged_and_stored(app, upload_root, staged_paths):
+    response = post_payment(app.test_client(), PNG)
+
+    assert response.status_code == 201, response.get_json()
+    assert len(staged_paths) == 1
+    assert not incoming_files(upload_root)
+    assert len(stored_files(upload_root)) == 1
+
+
+def test_file_over_the_kind_cap_is_rejected(app, upload_root, staged_paths, monkeypatch):
+    policy = uploads.UPLOAD_POLICIES['payment_screenshot']
+    monkeypatch.setitem(uploads.UPLOAD_POLICIES, 'payment_screenshot', policy._replace(max_bytes=1024))
+
+    response = post_payment(app.test_client(), PNG)
+
+    assert response.status_code == 413
+    assert response.get_json()['error'].startswith('File size exceeds')
+    assert len(staged_paths) == 1
+    assert not incoming_files(upload_root) and not stored_files(upload_root)
+
+
+def test_file_with_wrong_magic_bytes_is_rejected(app, upload_root, staged_paths):
+    response = post_payment(app.test_client(), b'MZ' + b'\x00' * 2000, filename='screenshot.png')
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == uploads.UPLOAD_POLICIES['payment_screenshot'].type_error
+    assert len(staged_paths) == 1
+    assert not incoming_files(upload_root) and not stored_files(upload_root)
+
+
+def test_empty_file_is_rejected(app, upload_root, staged_paths):
+    response = post_payment(app.test_client(), b'')
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Uploaded file is empty'
+    assert len(staged_paths) == 1
+    assert not incoming_files(upload_root) and not stored_files(upload_root)
+
+
+def test_request_over_the_size_limit_is_rejected(app, upload_root, monkeypatch):
+    monkeypatch.setitem(app.config, 'MAX_CONTENT_LENGTH', 1024)
+
+    response = post_payment(app.test_client(), PNG)
+
+    assert response.status_code == 413
+    assert response.get_json()['error'] == 'Upload exceeds the maximum request size'
+    assert not incoming_files(upload_root) and not stored_files(upload_root)
+
+
+def test_aborted_parse_removes_staged_file(app, upload_root, staged_paths):
+    # The body ends in the middle of the file part, as when the client disconnects
+    body = (
+        b'--XBOUNDARY\r\n'
+        b'Content-Disposition: form-data; name="course_slug"\r\n\r\n'
+        b'upload-course\r\n'
+        b'--XBOUNDARY\r\n'
+        b'Content-Disposition: form-data; name="payment_screenshot"; filename="screenshot.png"\r\n'
+        b'Content-Type: image/png\r\n\r\n'
+    ) + PNG
+
+    response = app.test_client().post('/api/payments', data=body,
+                                      content_type='multipart/form-data; boundary=XBOUNDARY')
+
+    assert response.status_code < 500
+    assert len(staged_paths) == 1
+    assert not os.path.exists(staged_paths[0])
+    assert not incoming_files(upload_root) and not stored_files(upload_root)
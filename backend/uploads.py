@@ -0,0 +1,634 @@
+# backend/uploads.py
+"""
+Upload ingestion shared by every route that accepts files.
+
+ingest_upload(file_obj, kind) copies the multipart file to disk in
+UPLOAD_CHUNK_SIZE chunks. While copying it enforces the kind's byte cap on
+the bytes actually read (Content-Length is often missing and never trusted),
+computes a SHA-256 of the content and sniffs the real file type from the
+magic bytes of the first chunk. The data is written to a temp file in the
+destination folder and renamed into place only once it passed every check,
+so a rejected or aborted upload never leaves a partial file behind.
+
+Flask views skip that copy: their file fields, declared with
+@upload_fields(field=kind), are written into the temp file while
+Werkzeug parses the request body (UploadFormDataParser / StagedUpload),
+with the same checks applied on the fly, so the bytes hit the disk once.
+
+Files are content addressed: a kind's files live at
+"<folder>/ab/cd/<sha256>.<ext>" (sharded by the first hash bytes), so the
+same bytes uploaded twice are stored once. The name is the hash of the
+bytes as uploaded; image optimization may rewrite the file later but keeps
+the name. Records reference these files by URL, reference counts live in
+the upload_blobs table and unreferenced files are removed by the garbage
+collector (see the UPLOAD STORAGE section of connection.py).
+
+What each kind accepts, where it goes and what happens afterwards
+(image optimization, srcset derivatives) is described by UPLOAD_POLICIES.
+
+Stored files go through the storage backend (storage.py). On the local
+backend the optimizer rewrites the file in place; on a remote one the
+original is published at once and the optimized file, its derivatives and
+manifest are uploaded over it when the background work is done.
+
+Resumes and payment screenshots can also skip the app entirely: the
+browser asks presign_direct_upload() for a URL, PUTs the bytes there and
+submits the returned token, which the route turns into a StoredUpload with
+claim_direct_upload(). The token fixes the key (content hash), size and
+kind, and the type is sniffed again from the stored bytes. Every presign
+gets a PUT, even when the bytes are already stored, and a token can only
+be claimed once the object was written after the token was issued: the
+endpoint is public, so it must not tell anyone knowing a file's hash
+whether that file is stored, or hand them a token for it.
+"""
+import os
+import re
+import json
+import time
+import uuid
+import hashlib
+import logging
+import tempfile
+import threading
+import mimetypes
+from collections import OrderedDict, namedtuple
+
+from werkzeug.formparser import FormDataParser, MultiPartParser
+from werkzeug.utils import secure_filename
+
+from cache import invalidate_cache
+from imaging import existing_derivatives, manifest_path, schedule_image_optimization
+from metrics import timed
+from storage import UPLOAD_FOLDER, direct_uploads_enabled, get_storage, sign_upload, verify_upload
+
+# Local scratch space for uploads bound for a remote storage backend
+UPLOAD_STAGING_DIR = os.environ.get("UPLOAD_STAGING_DIR", os.path.join(tempfile.gettempdir(), "upload-staging"))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Leading bytes sniff_type() gets to look at
+SNIFF_BYTES = 64
+MAX_IMAGE_SIZE = int(os.environ.get("UPLOAD_MAX_IMAGE_BYTES", 5 * 1024 * 1024))  # 5MB
+MAX_DOCUMENT_SIZE = int(os.environ.get("UPLOAD_MAX_DOCUMENT_BYTES", 5 * 1024 * 1024))  # 5MB
+MAX_ATTACHMENT_SIZE = int(os.environ.get("UPLOAD_MAX_ATTACHMENT_BYTES", 10 * 1024 * 1024))  # 10MB
+# Whole request body; Flask answers 413 while reading anything bigger
+MAX_REQUEST_SIZE = int(os.environ.get("UPLOAD_MAX_REQUEST_BYTES", 16 * 1024 * 1024))  # 16MB
+
+# sniffed type -> (file extension, MIME type)
+FILE_TYPES = {
+    'jpeg': ('jpg', 'image/jpeg'),
+    'png': ('png', 'image/png'),
+    'gif': ('gif', 'image/gif'),
+    'webp': ('webp', 'image/webp'),
+    'pdf': ('pdf', 'application/pdf'),
+    'doc': ('doc', 'application/msword'),
+    'docx': ('docx', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'),
+}
+IMAGE_TYPES = {'jpeg', 'png', 'gif', 'webp'}
+DOCUMENT_TYPES = {'pdf', 'doc', 'docx'}
+
+UploadPolicy = namedtuple('UploadPolicy', [
+    'folder',           # sub folder of UPLOAD_FOLDER holding the sharded tree
+    'max_bytes',
+    'types',            # accepted sniffed types, None accepts anything
+    'optimize',         # recompress in the background (imaging.py)
+    'derivatives',      # also build srcset derivatives
+    'cache_namespace',  # response cache to drop once derivatives exist
+    'type_error',       # message for a rejected type
+    'private',          # served with no-store, never cached by browsers or proxies
+])
+
+UPLOAD_POLICIES = {
+    'course_image': UploadPolicy(
+        'courses', MAX_IMAGE_SIZE, IMAGE_TYPES, True, True, 'courses',
+        'Invalid file type', False),
+    'internship_image': UploadPolicy(
+        'internships', MAX_IMAGE_SIZE, IMAGE_TYPES, True, True, 'internships',
+        'Invalid file type', False),
+    'project_image': UploadPolicy(
+        'projects', MAX_IMAGE_SIZE, IMAGE_TYPES, True, True, 'projects',
+        'Invalid file type', False),
+    'payment_screenshot': UploadPolicy(
+        'payment_screenshots', MAX_IMAGE_SIZE, IMAGE_TYPES, True, False, None,
+        'Invalid screenshot format. Please upload JPG, PNG, GIF, or WebP', True),
+    'resume': UploadPolicy(
+        'resumes', MAX_DOCUMENT_SIZE, DOCUMENT_TYPES, False, False, None,
+        'Invalid resume format. Please upload PDF, DOC, or DOCX', True),
+    'attachment': UploadPolicy(
+        'attachments', MAX_ATTACHMENT_SIZE, None, False, False, None,
+        'Invalid file type', True),
+}
+
+StoredUpload = namedtuple('StoredUpload', [
+    'path', 'url', 'key', 'size', 'sha256', 'file_type', 'content_type', 'original_name', 'deduplicated',
+])
+
+# Kinds the browser may upload straight to storage (see presign_direct_upload)
+DIRECT_UPLOAD_KINDS = {'resume', 'payment_screenshot'}
+# Allowed difference between the app's clock and the storage's LastModified
+DIRECT_UPLOAD_CLOCK_SKEW = 5  # seconds
+
+# Cache-Control for served files (serving.py) and remote objects
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+PRIVATE_CACHE_CONTROL = "private, no-store"
+UPLOAD_SHORT_MAX_AGE = int(os.environ.get("UPLOAD_SHORT_MAX_AGE", 300))
+SHORT_CACHE_CONTROL = f"public, max-age={UPLOAD_SHORT_MAX_AGE}"
+
+logger = logging.getLogger(__name__)
+
+# Srcset manifests read from storage, per key (see upload_derivatives)
+MANIFEST_CACHE_SIZE = int(os.environ.get("UPLOAD_MANIFEST_CACHE_SIZE", 4096))
+MANIFEST_MISS_TTL = int(os.environ.get("UPLOAD_MANIFEST_MISS_TTL", 60))  # seconds
+
+# "<folder>/ab/cd/<sha256>.<ext>", relative to UPLOAD_FOLDER
+UPLOAD_KEY_RE = re.compile(r'^[a-z_]+/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.[a-z0-9]+$')
+
+
+class UploadError(ValueError):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def sniff_type(head, filename=''):
+    """Real file type from the leading bytes, or None if unrecognised"""
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    if head.startswith(b'%PDF-'):
+        return 'pdf'
+    if head.startswith(b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'):
+        return 'doc'
+    # DOCX is a ZIP container; trust the name only once the bytes say ZIP
+    if head.startswith(b'PK\x03\x04') and filename.lower().endswith('.docx'):
+        return 'docx'
+    return None
+
+
+def human_size(num_bytes):
+    return f"{num_bytes // (1024 * 1024)}MB" if num_bytes >= 1024 * 1024 else f"{num_bytes // 1024}KB"
+
+
+def upload_key(sha256, extension, policy):
+    return f"{policy.folder}/{sha256[:2]}/{sha256[2:4]}/{sha256}.{extension}"
+
+
+def file_extension(filename, file_type):
+    if file_type:
+        return FILE_TYPES[file_type][0]
+    ext = os.path.splitext(secure_filename(filename))[1].lstrip('.').lower()
+    return ext if ext.isalnum() else 'bin'
+
+
+def copy_stream(stream, out, policy, filename):
+    """
+    Copy `stream` into the open file `out` enforcing the policy's size cap
+    and types. Returns (size, sha256 hex, sniffed type); raises UploadError.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    file_type = None
+    while True:
+        chunk = stream.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        if size == 0:
+            file_type = sniff_type(chunk, filename)
+            if policy.types is not None and file_type not in policy.types:
+                raise UploadError(policy.type_error)
+        size += len(chunk)
+        if size > policy.max_bytes:
+            raise UploadError(f"File size exceeds {human_size(policy.max_bytes)} limit", 413)
+        digest.update(chunk)
+        out.write(chunk)
+
+    if size == 0:
+        raise UploadError("Uploaded file is empty")
+    return size, digest.hexdigest(), file_type
+
+
+def object_cache_control(policy, settled=True):
+    """Cache-Control stored with a remote object (local files get it from serving.py)"""
+    if policy.private:
+        return PRIVATE_CACHE_CONTROL
+    return IMMUTABLE_CACHE_CONTROL if settled else SHORT_CACHE_CONTROL
+
+
+def staging_dir_for(storage, policy):
+    return os.path.join(UPLOAD_FOLDER, policy.folder) if storage.is_local else UPLOAD_STAGING_DIR
+
+
+def store_file(storage, key, tmp_path, policy, content_type):
+    """
+    Move the verified temp file to `key` and start its image processing.
+    Returns True if the same bytes were already stored.
+    """
+    if storage.exists(key):
+        # Same bytes already stored; refresh mtime so the GC grace period restarts
+        storage.touch(key)
+        return True
+
+    def on_done():
+        # Derivatives and manifest now exist
+        forget_derivatives(key)
+        if policy.cache_namespace:
+            invalidate_cache(policy.cache_namespace)
+
+    if not policy.optimize:
+        storage.put_file(key, tmp_path, content_type, object_cache_control(policy), move=True)
+    elif storage.is_local:
+        storage.put_file(key, tmp_path, content_type, move=True)
+        schedule_image_optimization(storage.path(key), derivatives=policy.derivatives, on_done=on_done)
+    else:
+        # Publish the original now; the optimized bytes replace it once ready
+        storage.put_file(key, tmp_path, content_type, object_cache_control(policy, settled=False))
+        staged = os.path.join(UPLOAD_STAGING_DIR, key)
+        os.makedirs(os.path.dirname(staged), exist_ok=True)
+        os.replace(tmp_path, staged)
+        schedule_image_optimization(
+            staged, derivatives=policy.derivatives,
+            on_done=lambda: publish_processed(storage, key, staged, policy, content_type, on_done),
+        )
+    return False
+
+
+def publish_processed(storage, key, staged, policy, content_type, on_done=None):
+    """Upload an image processed in the staging dir, then its derivatives and manifest"""
+    try:
+        if os.path.exists(staged):
+            storage.put_file(key, staged, content_type, object_cache_control(policy))
+        directory = key.rsplit('/', 1)[0]
+        for entries in existing_derivatives(staged).values():
+            for _, derivative in entries:
+                storage.put_file(
+                    f"{directory}/{os.path.basename(derivative)}", derivative,
+                    mimetypes.guess_type(derivative)[0], object_cache_control(policy), move=True)
+        # Manifest last, so readers only ever see complete sets
+        if os.path.exists(manifest_path(staged)):
+            storage.put_file(manifest_path(key), manifest_path(staged), 'application/json',
+                             SHORT_CACHE_CONTROL, move=True)
+    except Exception as e:
+        logger.warning("Publishing processed image %s failed: %s", key, e)
+    finally:
+        leftovers = [derivative for entries in existing_derivatives(staged).values() for _, derivative in entries]
+        for leftover in leftovers + [staged, manifest_path(staged)]:
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    if on_done:
+        on_done()
+
+
+class StagedUpload:
+    """
+    Container Werkzeug writes a multipart file part of `kind` into (see
+    UploadFormDataParser): a temp file in the kind's staging dir, with the
+    policy's byte cap, the SHA-256 and the type sniffing of copy_stream()
+    applied to every write. A part that breaks the policy stops being
+    written and its UploadError is raised by finish(), when the view
+    ingests the file, so the rest of the form still parses. close() (at
+    the end of the request) removes the temp file unless it was stored.
+    """
+
+    def __init__(self, kind, filename):
+        self.kind = kind
+        self.policy = UPLOAD_POLICIES[kind]
+        self.filename = filename or ''
+        target_dir = staging_dir_for(get_storage(), self.policy)
+        os.makedirs(target_dir, exist_ok=True)
+        self.path = os.path.join(target_dir, f".incoming-{uuid.uuid4().hex}")
+        self.file = open(self.path, 'w+b')
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.head = b''
+        self.file_type = None
+        self.error = None
+
+    def __getattr__(self, name):
+        # read(), seek(), ... for FileStorage
+        return getattr(self.file, name)
+
+    def check_type(self):
+        self.file_type = sniff_type(self.head, self.filename)
+        if self.policy.types is not None and self.file_type not in self.policy.types:
+            self.error = UploadError(self.policy.type_error)
+
+    def write(self, data):
+        if self.error is not None:
+            return
+        if len(self.head) < SNIFF_BYTES:
+            self.head += data[:SNIFF_BYTES - len(self.head)]
+            if len(self.head) == SNIFF_BYTES:
+                self.check_type()
+        self.size += len(data)
+        if self.size > self.policy.max_bytes:
+            self.error = UploadError(f"File size exceeds {human_size(self.policy.max_bytes)} limit", 413)
+        if self.error is not None:
+            self.file.truncate(0)
+            return
+        self.digest.update(data)
+        self.file.write(data)
+
+    def finish(self):
+        """(size, sha256 hex, sniffed type) like copy_stream(); raises UploadError"""
+        self.file.close()
+        if self.error is None and self.size == 0:
+            self.error = UploadError("Uploaded file is empty")
+        if self.error is None and len(self.head) < SNIFF_BYTES:
+            self.check_type()
+        if self.error is not None:
+            raise self.error
+        return self.size, self.digest.hexdigest(), self.file_type
+
+    def close(self):
+        self.file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class UploadMultiPartParser(MultiPartParser):
+    def __init__(self, upload_kinds, **kwargs):
+        super().__init__(**kwargs)
+        self.upload_kinds = upload_kinds
+        self.staged = []
+
+    def start_file_streaming(self, event, total_content_length):
+        kind = self.upload_kinds.get(event.name)
+        if kind is None:
+            return super().start_file_streaming(event, total_content_length)
+        staged = StagedUpload(kind, event.filename)
+        self.staged.append(staged)
+        return staged
+
+    def parse(self, stream, boundary, content_length):
+        try:
+            return super().parse(stream, boundary, content_length)
+        except BaseException:
+            # Aborted or oversized bodies: the parts never reach request.files
+            for staged in self.staged:
+                staged.close()
+            raise
+
+
+class UploadFormDataParser(FormDataParser):
+    """
+    FormDataParser writing the file parts named in `upload_kinds`
+    ({field: kind}, see upload_fields) into StagedUploads; other file
+    parts are spooled by Werkzeug as usual
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_kinds = {}
+
+    def _parse_multipart(self, stream, mimetype, content_length, options):
+        if not self.upload_kinds:
+            return super()._parse_multipart(stream, mimetype, content_length, options)
+        parser = UploadMultiPartParser(
+            self.upload_kinds,
+            stream_factory=self.stream_factory,
+            max_form_memory_size=self.max_form_memory_size,
+            max_form_parts=self.max_form_parts,
+            cls=self.cls,
+        )
+        boundary = options.get("boundary", "").encode("ascii")
+        if not boundary:
+            raise ValueError("Missing boundary")
+        form, files = parser.parse(stream, boundary, content_length)
+        return stream, form, files
+
+
+def upload_fields(**kinds):
+    """Declare a view's file fields as {field: kind}; they are staged while the body is parsed"""
+    def decorator(view):
+        # functools.wraps in outer decorators copies this attribute along
+        view.upload_fields = kinds
+        return view
+    return decorator
+
+
+def ingest_upload(file_obj, kind):
+    """
+    Store an uploaded file according to UPLOAD_POLICIES[kind].
+    Returns a StoredUpload, None when no file was sent; raises UploadError.
+    """
+    if not file_obj or not file_obj.filename:
+        return None
+
+    policy = UPLOAD_POLICIES[kind]
+    storage = get_storage()
+    staged = file_obj.stream if isinstance(file_obj.stream, StagedUpload) and file_obj.stream.kind == kind else None
+    if staged is not None:
+        tmp_path = staged.path
+    else:
+        target_dir = staging_dir_for(storage, policy)
+        os.makedirs(target_dir, exist_ok=True)
+        tmp_path = os.path.join(target_dir, f".incoming-{uuid.uuid4().hex}")
+    try:
+        with timed('upload', kind=kind):
+            if staged is not None:
+                size, sha256, file_type = staged.finish()
+            else:
+                with open(tmp_path, 'wb') as out:
+                    size, sha256, file_type = copy_stream(file_obj.stream, out, policy, file_obj.filename)
+            key = upload_key(sha256, file_extension(file_obj.filename, file_type), policy)
+            content_type = FILE_TYPES[file_type][1] if file_type else (file_obj.mimetype or 'application/octet-stream')
+            deduplicated = store_file(storage, key, tmp_path, policy, content_type)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return StoredUpload(storage.path(key) if storage.is_local else None, f"/uploads/{key}", key, size, sha256,
+                        file_type, content_type, secure_filename(file_obj.filename), deduplicated)
+
+
+def declared_type(filename):
+    """File type implied by a file name's extension, None if not one of FILE_TYPES"""
+    ext = os.path.splitext(filename)[1].lstrip('.').lower()
+    ext = 'jpg' if ext == 'jpeg' else ext
+    return next((file_type for file_type, (extension, _) in FILE_TYPES.items() if extension == ext), None)
+
+
+def presign_direct_upload(kind, filename, size, sha256):
+    """
+    Start a browser-to-storage upload. Returns {'token', 'upload'} where
+    `upload` is {'method', 'url', 'headers'} for the PUT. The PUT is always
+    needed, whether or not the same bytes are already stored.
+    """
+    if not direct_uploads_enabled():
+        raise UploadError("Direct uploads are not enabled on this server", 503)
+    if kind not in DIRECT_UPLOAD_KINDS:
+        raise UploadError("Direct uploads are not available for this file")
+    policy = UPLOAD_POLICIES[kind]
+    if not isinstance(size, int) or size <= 0:
+        raise UploadError("File size is required")
+    if size > policy.max_bytes:
+        raise UploadError(f"File size exceeds {human_size(policy.max_bytes)} limit", 413)
+    if not isinstance(sha256, str) or not re.fullmatch(r'[0-9a-f]{64}', sha256):
+        raise UploadError("A SHA-256 of the file is required")
+    file_type = declared_type(filename or '')
+    if file_type not in policy.types:
+        raise UploadError(policy.type_error)
+
+    storage = get_storage()
+    key = upload_key(sha256, FILE_TYPES[file_type][0], policy)
+    claims = {'kind': kind, 'key': key, 'size': size, 'sha256': sha256, 'name': secure_filename(filename),
+              'issued': int(time.time())}
+    upload = storage.presign_upload(key, FILE_TYPES[file_type][1], size, sha256, claims)
+    return {'token': sign_upload(claims), 'upload': upload}
+
+
+def receive_direct_upload(token, stream):
+    """PUT target of the local backend's pre-signed URLs; checks the bytes against the token"""
+    claims = verify_upload(token)
+    storage = get_storage()
+    if claims is None or not storage.is_local:
+        raise UploadError("Upload link is invalid or expired", 403)
+    policy = UPLOAD_POLICIES[claims['kind']]
+
+    target_dir = staging_dir_for(storage, policy)
+    os.makedirs(target_dir, exist_ok=True)
+    tmp_path = os.path.join(target_dir, f".incoming-{uuid.uuid4().hex}")
+    try:
+        with timed('upload', kind=claims['kind']):
+            with open(tmp_path, 'wb') as out:
+                size, sha256, file_type = copy_stream(stream, out, policy, claims['name'])
+            if size != claims['size'] or sha256 != claims['sha256']:
+                raise UploadError("Uploaded bytes do not match the upload link")
+            store_file(storage, claims['key'], tmp_path, policy, FILE_TYPES[file_type][1])
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def claim_direct_upload(token, kind):
+    """StoredUpload for a finished direct upload; raises UploadError"""
+    claims = verify_upload(token)
+    if claims is None or claims.get('kind') != kind:
+        raise UploadError("Upload token is invalid or expired")
+    policy = UPLOAD_POLICIES[kind]
+    storage = get_storage()
+    key = claims['key']
+
+    size = storage.size(key)
+    # A PUT of bytes already stored rewrites the object (S3) or touches it
+    # (local, see store_file); an older object means nothing was uploaded
+    # for this token
+    modified = storage.modified_time(key)
+    if size is None or modified is None or modified < claims.get('issued', 0) - DIRECT_UPLOAD_CLOCK_SKEW:
+        raise UploadError("Uploaded file not found, please upload it again")
+    if size != claims['size'] or size > policy.max_bytes:
+        raise UploadError(f"File size exceeds {human_size(policy.max_bytes)} limit", 413)
+    # The local PUT target checks the bytes itself (receive_direct_upload);
+    # S3 verifies the signed checksum, but not every S3-compatible store does
+    if not storage.is_local and storage.sha256(key) != claims['sha256']:
+        # Other bytes must not stay under a content-addressed key
+        storage.delete(key)
+        raise UploadError("Uploaded file does not match the upload link, please upload it again")
+    # Still check what the bytes are
+    file_type = sniff_type(storage.read_bytes(key, length=64) or b'', claims['name'])
+    if file_type not in policy.types:
+        raise UploadError(policy.type_error)
+
+    return StoredUpload(storage.path(key) if storage.is_local else None, f"/uploads/{key}", key, size,
+                        claims['sha256'], file_type, FILE_TYPES[file_type][1], claims['name'], False)
+
+
+def key_for_reference(reference):
+    """
+    Storage key for what a record stores (URL, absolute URL or disk path),
+    or None if it is not a content-addressed upload (legacy files, external URLs).
+    """
+    if not reference:
+        return None
+    if os.path.isabs(reference) and not reference.startswith('/uploads/'):
+        relative = os.path.relpath(reference, UPLOAD_FOLDER)
+    else:
+        _, marker, relative = reference.partition('/uploads/')
+        if not marker:
+            return None
+    relative = relative.replace(os.sep, '/')
+    return relative if UPLOAD_KEY_RE.match(relative) else None
+
+
+_manifests = OrderedDict()  # key -> (derivatives, published_at, expires_at or None)
+_manifests_lock = threading.Lock()
+
+
+def upload_derivatives(key):
+    """
+    {format: [(width, key), ...]} from the srcset manifest stored next to
+    `key`, {} if none yet. Catalog responses ask for it on every row, and
+    on a bucket each read is a GET, so results are cached: a manifest
+    never changes for a content-addressed key and is kept (LRU, up to
+    MANIFEST_CACHE_SIZE keys); a missing one is looked up again after
+    MANIFEST_MISS_TTL, or at once in the process that built it. Treat
+    the returned dict as read-only.
+    """
+    return cached_manifest(key)[0]
+
+
+def derivatives_published_at(key):
+    """When the srcset manifest of `key` was stored (epoch seconds), None if none yet"""
+    return cached_manifest(key)[1]
+
+
+def cached_manifest(key):
+    now = time.monotonic()
+    with _manifests_lock:
+        entry = _manifests.get(key)
+        if entry is not None and (entry[2] is None or entry[2] > now):
+            _manifests.move_to_end(key)
+            return entry
+
+    derivatives = read_derivatives(key)
+    published_at = get_storage().modified_time(manifest_path(key)) if derivatives else None
+    entry = (derivatives, published_at, None if derivatives else now + MANIFEST_MISS_TTL)
+    with _manifests_lock:
+        _manifests[key] = entry
+        _manifests.move_to_end(key)
+        while len(_manifests) > MANIFEST_CACHE_SIZE:
+            _manifests.popitem(last=False)
+    return entry
+
+
+def forget_derivatives(key):
+    with _manifests_lock:
+        _manifests.pop(key, None)
+
+
+def read_derivatives(key):
+    data = get_storage().read_bytes(manifest_path(key))
+    if not data:
+        return {}
+    try:
+        manifest = json.loads(data)
+    except ValueError:
+        return {}
+    directory = key.rsplit('/', 1)[0]
+    return {
+        image_format: [(width, f"{directory}/{name}") for width, name in entries]
+        for image_format, entries in manifest.items()
+    }
+
+
+def delete_upload_files(key):
+    """Remove a stored file together with its image derivatives and manifest"""
+    storage = get_storage()
+    for entries in upload_derivatives(key).values():
+        for _, derivative in entries:
+            storage.delete(derivative)
+    storage.delete(manifest_path(key))
+    storage.delete(key)
+    forget_derivatives(key)
+
+
+def iter_stored_uploads():
+    """(key, mtime) for every content-addressed file in storage"""
+    storage = get_storage()
+    for policy_folder in sorted({policy.folder for policy in UPLOAD_POLICIES.values()}):
+        for key, mtime in storage.iter_keys(f"{policy_folder}/"):
+            if UPLOAD_KEY_RE.match(key):
+                yield key, mtime
@@ -0,0 +1,15 @@
+# backend/wsgi.py
+"""
+WSGI entry point for production servers:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+gunicorn.conf.py migrates the database once in the master process and sets
+APP_INITIALIZE=false, so the workers only build the app. asyncapi.py is the
+asyncio alternative (uvicorn), for holding many slow clients per process.
+"""
+import os
+
+from connection import create_app
+
+app = create_app(initialize=os.environ.get("APP_INITIALIZE", "true").lower() == "true")
@@ -14,6 +14,18 @@ import ProjectModal from '../components/admin/ProjectModal';
 import ProjectPaymentTab from '../components/admin/ProjectPaymentTab';
 import InternshipEnrollmentTab from '../components/admin/InternshipEnrollmentTab';
 
+// Cursor-paginated admin list route of each tab; `sortKey` is the route's
+// default sort column and `status` whether the tab has a status filter
+const LIST_ROUTES = {
+  'courses': { path: 'courses', sortKey: 'created_at' },
+  'internships': { path: 'internships', sortKey: 'created_at' },
+  'projects': { path: 'projects', sortKey: 'created_at' },
+  'project-payments': { path: 'project-enrollments', sortKey: 'created_at', status: true },
+  'internship-enrollments': { path: 'internship-applications', sortKey: 'date', status: true },
+};
+
+const PAYMENTS_PAGE_SIZE = 50;
+
 export default function AdminPage() {
   const [user, setUser] = useState(null);
   const [activeTab, setActiveTab] = useState('courses');
@@ -32,6 +44,11 @@ export default function AdminPage() {
   const [editingProject, setEditingProject] = useState(null);
   const [searchTerm, setSearchTerm] = useState('');
   const [statusFilter, setStatusFilter] = useState('all');
+  const [dateFrom, setDateFrom] = useState('');
+  const [dateTo, setDateTo] = useState('');
+  const [sortOrder, setSortOrder] = useState('desc');
+  const [nextCursors, setNextCursors] = useState({});
+  const [dashboardStats, setDashboardStats] = useState(null);
 
   // Check for existing session
   useEffect(() => {
@@ -41,43 +58,80 @@ export default function AdminPage() {
     }
   }, []);
 
-  // Fetch data when tab changes
+  // Refresh the dashboard counters when the tab changes
   useEffect(() => {
     if (user) {
-      switch(activeTab) {
-        case 'courses':
-          fetchCourses();
-          break;
-        case 'payments':
-          fetchPayments();
-          break;
-        case 'internships':
-          fetchInternships();
-          break;
-        case 'projects':
-          fetchProjects();
-          break;
-        case 'project-payments':
-          fetchProjectPayments();
-          break;
-        case 'internship-enrollments':
-          fetchInternshipEnrollments();
-          break;
-      }
+      fetchStats();
     }
   }, [user, activeTab]);
 
-  const fetchCourses = async () => {
+  // Filtering happens on the server: reload the active list from its first
+  // page when the tab or a filter changes (typing waits for a pause)
+  useEffect(() => {
+    if (!user) return;
+    setNextCursors(prev => ({ ...prev, [activeTab]: null }));
+    const timer = setTimeout(() => listFetchers[activeTab]?.(), searchTerm ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [user, activeTab, searchTerm, statusFilter, dateFrom, dateTo, sortOrder]);
+
+  // Admin list endpoints are cursor-paginated; pass the previous page's
+  // next_cursor to append the following page with the same filters
+  const adminListUrl = (tab, cursor) => {
+    const { path, sortKey, status } = LIST_ROUTES[tab];
+    const params = new URLSearchParams();
+    if (searchTerm.trim()) params.set('search', searchTerm.trim());
+    if (status && statusFilter !== 'all') params.set('status', statusFilter);
+    if (dateFrom) params.set('date_from', dateFrom);
+    if (dateTo) params.set('date_to', dateTo);
+    params.set('sort', sortOrder === 'asc' ? sortKey : `-${sortKey}`);
+    if (cursor) params.set('cursor', cursor);
+    return `http://localhost:7000/admin/${path}?${params}`;
+  };
+
+  // /admin/payments pages by number and takes only search and status
+  const paymentsUrl = (page) => {
+    const params = new URLSearchParams({ page: String(page || 1), per_page: String(PAYMENTS_PAGE_SIZE) });
+    if (searchTerm.trim()) params.set('search', searchTerm.trim());
+    if (statusFilter !== 'all') params.set('status', statusFilter);
+    return `http://localhost:7000/admin/payments?${params}`;
+  };
+
+  const appendPage = (setter, items, cursor) =>
+    setter(prev => (cursor ? [...prev, ...items] : items));
+
+  const storeNextCursor = (tab, pagination) =>
+    setNextCursors(prev => ({ ...prev, [tab]: pagination?.next_cursor || null }));
+
+  // Dashboard counters come from one aggregate endpoint rather than
+  // from the (paginated) lists loaded in each tab
+  const fetchStats = async () => {
+    try {
+      const response = await fetch('http://localhost:7000/admin/stats', {
+        headers: {
+          'Authorization': `Bearer ${sessionStorage.getItem('admin_token')}`,
+        },
+      });
+      const data = await response.json();
+      if (data.success) {
+        setDashboardStats(data.stats);
+      }
+    } catch (err) {
+      console.error('Error fetching stats:', err);
+    }
+  };
+
+  const fetchCourses = async (cursor = null) => {
     setLoading(true);
     try {
-      const response = await fetch('http://localhost:7000/admin/courses', {
+      const response = await fetch(adminListUrl('courses', cursor), {
         headers: {
           'Authorization': `Bearer ${sessionStorage.getItem('admin_token')}`,
         },
       });
       const data = await response.json();
       if (data.success) {
-        setCourses(data.courses);
+        appendPage(setCourses, data.courses, cursor);
+        storeNextCursor('courses', data.pagination);
       }
     } catch (err) {
       console.error('Error fetching courses:', err);
@@ -86,17 +140,19 @@ export default function AdminPage() {
     }
   };
 
-  const fetchPayments = async () => {
+  const fetchPayments = async (page = null) => {
     setLoading(true);
     try {
-      const response = await fetch('http://localhost:7000/admin/payments', {
+      const response = await fetch(paymentsUrl(page), {
         headers: {
           'Authorization': `Bearer ${sessionStorage.getItem('admin_token')}`,
         },
       });
       const data = await response.json();
       if (data.success) {
-        setPayments(data.payments);
+        appendPage(setPayments, data.payments, page);
+        const { page: current, pages } = data.pagination;
+        storeNextCursor('payments', { next_cursor: current < pages ? current + 1 : null });
       }
     } catch (err) {
       console.error('Error fetching payments:', err);
@@ -105,17 +161,18 @@ export default function AdminPage() {
     }
   };
 
-  const fetchInternships = async () => {
+  const fetchInternships = async (cursor = null) => {
     setLoading(true);
     try {
-      const response = await fetch('http://localhost:7000/admin/internships', {
+      const response = await fetch(adminListUrl('internships', cursor), {
         headers: {
           'Authorization': `Bearer ${sessionStorage.getItem('admin_token')}`,
         },
       });
       const data = await response.json();
       if (data.success) {
-        setInternships(data.internships);
+        appendPage(setInternships, data.internships, cursor);
+        storeNextCursor('internships', data.pagination);
       }
     } catch (err) {
       console.error('Error fetching internships:', err);
@@ -124,17 +181,18 @@ export default function AdminPage() {
     }
   };
 
-  const fetchProjects = async () => {
+  const fetchProjects = async (cursor = null) => {
     setLoading(true);
     try {
-      const response = await fetch('http://localhost:7000/admin/projects', {
+      const response = await fetch(adminListUrl('projects', cursor), {
         headers: {
           'Authorization': `Bearer ${sessionStorage.getItem('admin_token')}`,
         },
       });
       const data = await response.json();
       if (data.success) {
-        setProjects(data.projects);
+        appendPage(setProjects, data.projects, cursor);
+        storeNextCursor('projects', data.pagination);
       }
     } catch (err) {
       console.error('Error fetching projects:', err);
@@ -143,17 +201,18 @@ export default function AdminPage() {
     }
   };
 
-  const fetchProjectPayments = async () => {
+  const fetchProjectPayments = async (cursor = null) => {
     setLoading(true);
     try {
-      const response = await fetch('http://localhost:7000/admin/project-enrollments', {
+      const response = await fetch(adminListUrl('project-payments', cursor), {
         headers: {
           'Authorization': `Bearer ${sessionStorage.getItem('admin_token')}`,
         },
       });
       const data = await response.json();
       if (data.success) {
-        setProjectPayments(data.enrollments);
+        appendPage(setProjectPayments, data.enrollments, cursor);
+        storeNextCursor('project-payments', data.pagination);
       }
     } catch (err) {
       console.error('Error fetching project enrollments:', err);
@@ -162,17 +221,18 @@ export default function AdminPage() {
     }
   };
 
-  const fetchInternshipEnrollments = async () => {
+  const fetchInternshipEnrollments = async (cursor = null) => {
     setLoading(true);
     try {
-      const response = await fetch('http://localhost:7000/admin/internship-applications', {
+      const response = await fetch(adminListUrl('internship-enrollments', cursor), {
         headers: {
           'Authorization': `Bearer ${sessionStorage.getItem('admin_token')}`,
         },
       });
       const data = await response.json();
       if (data.success) {
-        setInternshipEnrollments(data.applications);
+        appendPage(setInternshipEnrollments, data.applications, cursor);
+        storeNextCursor('internship-enrollments', data.pagination);
       }
     } catch (err) {
       console.error('Error fetching internship enrollments:', err);
@@ -181,6 +241,24 @@ export default function AdminPage() {
     }
   };
 
+  const listFetchers = {
+    'courses': fetchCourses,
+    'payments': fetchPayments,
+    'internships': fetchInternships,
+    'projects': fetchProjects,
+    'project-payments': fetchProjectPayments,
+    'internship-enrollments': fetchInternshipEnrollments,
+  };
+
+  const selectTab = (tab) => {
+    setActiveTab(tab);
+    setSearchTerm('');
+    setStatusFilter('all');
+    setDateFrom('');
+    setDateTo('');
+    setSortOrder('desc');
+  };
+
   const handleLogin = (userData, token) => {
     setUser(userData);
     sessionStorage.setItem('admin_token', token);
@@ -206,6 +284,7 @@ export default function AdminPage() {
 
       if (response.ok) {
         fetchCourses();
+        fetchStats();
       }
     } catch (err) {
       console.error('Error deleting course:', err);
@@ -225,6 +304,7 @@ export default function AdminPage() {
 
       if (response.ok) {
         fetchInternships();
+        fetchStats();
       }
     } catch (err) {
       console.error('Error deleting internship:', err);
@@ -244,6 +324,7 @@ export default function AdminPage() {
 
       if (response.ok) {
         fetchProjects();
+        fetchStats();
       }
     } catch (err) {
       console.error('Error deleting project:', err);
@@ -263,6 +344,7 @@ export default function AdminPage() {
 
       if (response.ok) {
         fetchPayments();
+        fetchStats();
       }
     } catch (err) {
       console.error('Error updating payment status:', err);
@@ -282,6 +364,7 @@ export default function AdminPage() {
 
       if (response.ok) {
         fetchProjectPayments();
+        fetchStats();
       }
     } catch (err) {
       console.error('Error updating enrollment status:', err);
@@ -301,75 +384,35 @@ export default function AdminPage() {
 
       if (response.ok) {
         fetchInternshipEnrollments();
+        fetchStats();
       }
     } catch (err) {
       console.error('Error updating internship enrollment status:', err);
     }
   };
 
-  // Filtering logic
-  const filteredCourses = courses.filter(course =>
-    course.title.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    course.category.toLowerCase().includes(searchTerm.toLowerCase())
-  );
-
-  const filteredInternships = internships.filter(internship =>
-    internship.title.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    internship.category.toLowerCase().includes(searchTerm.toLowerCase())
-  );
-
-  const filteredProjects = projects.filter(project =>
-    project.title.toLowerCase().includes(searchTerm.toLowerCase()) ||
-    project.category.toLowerCase().includes(searchTerm.toLowerCase())
-  );
-
-  const filteredPayments = payments.filter(payment => {
-    const matchesSearch = payment.student_name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      payment.email.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      payment.course_title.toLowerCase().includes(searchTerm.toLowerCase());
-
-    if (statusFilter === 'all') return matchesSearch;
-    return matchesSearch && payment.payment_status === statusFilter;
-  });
-
-  const filteredProjectPayments = projectPayments.filter(enrollment => {
-    const matchesSearch = 
-      enrollment.student_name?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      enrollment.email?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      enrollment.project_title?.toLowerCase().includes(searchTerm.toLowerCase());
-
-    if (statusFilter === 'all') return matchesSearch;
-    return matchesSearch && enrollment.payment_status === statusFilter;
-  });
-
-  const filteredInternshipEnrollments = internshipEnrollments.filter(enrollment => {
-    const fullName = `${enrollment.fname} ${enrollment.lname}`.toLowerCase();
-    const matchesSearch = 
-      fullName.includes(searchTerm.toLowerCase()) ||
-      enrollment.email?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      enrollment.internship_title?.toLowerCase().includes(searchTerm.toLowerCase());
-
-    if (statusFilter === 'all') return matchesSearch;
-    return matchesSearch && enrollment.payment_status === statusFilter;
-  });
+  const loadMore = () => {
+    const cursor = nextCursors[activeTab];
+    if (!cursor) return;
+    listFetchers[activeTab]?.(cursor);
+  };
 
   // Statistics
+  const statusCount = (group, status) => group?.by_status?.[status]?.count || 0;
   const stats = {
-    totalCourses: courses.length,
-    activeCourses: courses.filter(c => c.is_active).length,
-    totalInternships: internships.length,
-    activeInternships: internships.filter(i => i.is_active).length,
-    totalProjects: projects.length,
-    activeProjects: projects.filter(p => p.is_active).length,
-    totalPayments: payments.length,
-    completedPayments: payments.filter(p => p.payment_status === 'completed').length,
-    totalRevenue: payments
-      .filter(p => p.payment_status === 'completed')
-      .reduce((sum, p) => sum + (p.amount || 0), 0),
-    totalProjectEnrollments: projectPayments.length,
-    confirmedProjectEnrollments: projectPayments.filter(p => p.payment_status === 'completed').length,
-    totalInternshipApplications: internshipEnrollments.length,
-    approvedInternshipApplications: internshipEnrollments.filter(a => a.payment_status === 'approved').length
+    totalCourses: dashboardStats?.courses.total || 0,
+    activeCourses: dashboardStats?.courses.active || 0,
+    totalInternships: dashboardStats?.internships.total || 0,
+    activeInternships: dashboardStats?.internships.active || 0,
+    totalProjects: dashboardStats?.projects.total || 0,
+    activeProjects: dashboardStats?.projects.active || 0,
+    totalPayments: dashboardStats?.payments.total || 0,
+    completedPayments: statusCount(dashboardStats?.payments, 'completed'),
+    totalRevenue: dashboardStats?.payments.revenue || 0,
+    totalProjectEnrollments: dashboardStats?.project_enrollments.total || 0,
+    confirmedProjectEnrollments: statusCount(dashboardStats?.project_enrollments, 'completed'),
+    totalInternshipApplications: dashboardStats?.internship_applications.total || 0,
+    approvedInternshipApplications: statusCount(dashboardStats?.internship_applications, 'approved')
   };
 
   if (!user) {
@@ -385,10 +428,7 @@ export default function AdminPage() {
         <div className="border-b border-gray-200">
           <nav className="flex space-x-8 px-6 overflow-x-auto" style={{ backgroundColor: "rgb(185, 185, 185)" }}>
             <button
-              onClick={() => {
-                setActiveTab('courses');
-                setSearchTerm('');
-              }}
+              onClick={() => selectTab('courses')}
               className={`py-4 px-1 border-b-2 font-medium text-sm whitespace-nowrap ${
                 activeTab === 'courses'
                   ? 'border-blue-500 text-blue-600'
@@ -399,10 +439,7 @@ export default function AdminPage() {
             </button>
 
             <button
-              onClick={() => {
-                setActiveTab('internships');
-                setSearchTerm('');
-              }}
+              onClick={() => selectTab('internships')}
               className={`py-4 px-1 border-b-2 font-medium text-sm whitespace-nowrap ${
                 activeTab === 'internships'
                   ? 'border-blue-500 text-blue-600'
@@ -413,10 +450,7 @@ export default function AdminPage() {
             </button>
 
             <button
-              onClick={() => {
-                setActiveTab('projects');
-                setSearchTerm('');
-              }}
+              onClick={() => selectTab('projects')}
               className={`py-4 px-1 border-b-2 font-medium text-sm whitespace-nowrap ${
                 activeTab === 'projects'
                   ? 'border-blue-500 text-blue-600'
@@ -427,10 +461,7 @@ export default function AdminPage() {
             </button>
 
             <button
-              onClick={() => {
-                setActiveTab('payments');
-                setSearchTerm('');
-              }}
+              onClick={() => selectTab('payments')}
               className={`py-4 px-1 border-b-2 font-medium text-sm whitespace-nowrap ${
                 activeTab === 'payments'
                   ? 'border-blue-500 text-blue-600'
@@ -441,10 +472,7 @@ export default function AdminPage() {
             </button>
 
             <button
-              onClick={() => {
-                setActiveTab('project-payments');
-                setSearchTerm('');
-              }}
+              onClick={() => selectTab('project-payments')}
               className={`py-4 px-1 border-b-2 font-medium text-sm whitespace-nowrap ${
                 activeTab === 'project-payments'
                   ? 'border-purple-500 text-purple-600'
@@ -455,10 +483,7 @@ export default function AdminPage() {
             </button>
 
             <button
-              onClick={() => {
-                setActiveTab('internship-enrollments');
-                setSearchTerm('');
-              }}
+              onClick={() => selectTab('internship-enrollments')}
               className={`py-4 px-1 border-b-2 font-medium text-sm whitespace-nowrap ${
                 activeTab === 'internship-enrollments'
                   ? 'border-green-500 text-green-600'
@@ -471,9 +496,40 @@ export default function AdminPage() {
         </div>
 
         <div className="p-6">
+          {LIST_ROUTES[activeTab] && (
+            <div className="flex flex-wrap items-center gap-3 mb-4 text-sm text-gray-700">
+              <label className="flex items-center gap-2">
+                From
+                <input
+                  type="date"
+                  value={dateFrom}
+                  onChange={(e) => setDateFrom(e.target.value)}
+                  className="text-black px-3 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500"
+                />
+              </label>
+              <label className="flex items-center gap-2">
+                To
+                <input
+                  type="date"
+                  value={dateTo}
+                  onChange={(e) => setDateTo(e.target.value)}
+                  className="text-black px-3 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500"
+                />
+              </label>
+              <select
+                value={sortOrder}
+                onChange={(e) => setSortOrder(e.target.value)}
+                className="text-black px-3 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500"
+              >
+                <option value="desc">Newest first</option>
+                <option value="asc">Oldest first</option>
+              </select>
+            </div>
+          )}
+
           {activeTab === 'courses' && (
             <CoursesTab
-              courses={filteredCourses}
+              courses={courses}
               loading={loading}
               searchTerm={searchTerm}
               setSearchTerm={setSearchTerm}
@@ -491,7 +547,7 @@ export default function AdminPage() {
 
           {activeTab === 'internships' && (
             <InternshipsTab
-              internships={filteredInternships}
+              internships={internships}
               loading={loading}
               searchTerm={searchTerm}
               setSearchTerm={setSearchTerm}
@@ -509,7 +565,7 @@ export default function AdminPage() {
 
           {activeTab === 'projects' && (
             <ProjectsTab
-              projects={filteredProjects}
+              projects={projects}
               loading={loading}
               searchTerm={searchTerm}
               setSearchTerm={setSearchTerm}
@@ -527,7 +583,7 @@ export default function AdminPage() {
 
           {activeTab === 'payments' && (
             <PaymentsTab
-              payments={filteredPayments}
+              payments={payments}
               loading={loading}
               searchTerm={searchTerm}
               setSearchTerm={setSearchTerm}
@@ -539,7 +595,7 @@ export default function AdminPage() {
 
           {activeTab === 'project-payments' && (
             <ProjectPaymentTab
-              projectPayments={filteredProjectPayments}
+              projectPayments={projectPayments}
               loading={loading}
               searchTerm={searchTerm}
               setSearchTerm={setSearchTerm}
@@ -551,7 +607,7 @@ export default function AdminPage() {
 
           {activeTab === 'internship-enrollments' && (
             <InternshipEnrollmentTab
-              enrollments={filteredInternshipEnrollments}
+              enrollments={internshipEnrollments}
               loading={loading}
               searchTerm={searchTerm}
               setSearchTerm={setSearchTerm}
@@ -560,6 +616,18 @@ export default function AdminPage() {
               onUpdateStatus={updateInternshipEnrollmentStatus}
             />
           )}
+
+          {nextCursors[activeTab] && (
+            <div className="mt-6 text-center">
+              <button
+                onClick={loadMore}
+                disabled={loading}
+                className="px-4 py-2 bg-blue-600 text-white rounded-lg hover:bg-blue-700 disabled:opacity-50"
+              >
+                {loading ? 'Loading...' : 'Load more'}
+              </button>
+            </div>
+          )}
         </div>
       </div>
 
@@ -574,6 +642,7 @@ export default function AdminPage() {
             setShowCourseModal(false);
             setEditingCourse(null);
             fetchCourses();
+            fetchStats();
           }}
         />
       )}
@@ -589,6 +658,7 @@ export default function AdminPage() {
             setShowInternshipModal(false);
             setEditingInternship(null);
             fetchInternships();
+            fetchStats();
           }}
         />
       )}
@@ -604,6 +674,7 @@ export default function AdminPage() {
             setShowProjectModal(false);
             setEditingProject(null);
             fetchProjects();
+            fetchStats();
           }}
         />
       )}
@@ -4,6 +4,7 @@ import React, { useState, useEffect } from 'react';
 import { useParams, useRouter } from 'next/navigation';
 import { ArrowLeft, Upload, CheckCircle, AlertCircle, Calendar, Clock } from 'lucide-react';
 import Layout from '@/components/Layout';
+import { appendUpload } from '@/lib/directUpload';
 
 const InternshipEnrollmentPage = () => {
   const params = useParams();
@@ -178,9 +179,9 @@ const InternshipEnrollmentPage = () => {
       // Append internship slug
       submitData.append('internship_slug', params.slug);
       
-      // Append resume file
+      // Upload resume straight to storage (or append the file as a fallback)
       if (formData.resume) {
-        submitData.append('resume', formData.resume);
+        await appendUpload(submitData, 'resume', formData.resume, 'resume');
         console.log('Resume appended:', formData.resume.name, formData.resume.size, 'bytes');
       }
       
@@ -161,15 +161,20 @@ const InternshipCard = ({ internship }) => {
   return (
     <div className="bg-white rounded-xl shadow-sm hover:shadow-md transition-shadow duration-300 overflow-hidden">
       <div className="relative h-48 overflow-hidden">
-        <img
-          src={getImageUrl(internship.image_url)}
-          alt={internship.title}
-          className="w-full h-full object-cover"
-          onError={(e) => {
-            e.target.onerror = null;
-            e.target.src = '/api/placeholder/400/300';
-          }}
-        />
+        <picture>
+          <source type="image/webp" srcSet={internship.image_srcset?.webp} sizes="(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw" />
+          <img
+            src={getImageUrl(internship.image_url)}
+            srcSet={internship.image_srcset?.jpeg}
+            sizes="(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw"
+            alt={internship.title}
+            className="w-full h-full object-cover"
+            onError={(e) => {
+              e.target.onerror = null;
+              e.target.src = '/api/placeholder/400/300';
+            }}
+          />
+        </picture>
         <div className="absolute top-4 right-4">
           <span className={`px-3 py-1 rounded-full text-xs font-medium ${getTypeColor(internship.internship_type)}`}>
             {internship.internship_type}
@@ -3,6 +3,7 @@
 import React, { useState, useEffect } from 'react';
 import { Check, CreditCard, Smartphone, Zap, ArrowLeft, Clock, Users, Code, AlertCircle, Layers, Upload, X, ImageIcon, DollarSign, Tag, Star } from 'lucide-react';
 import Layout from '@/components/Layout';
+import { appendUpload } from '@/lib/directUpload';
 
 const API_BASE_URL = 'http://localhost:7000';
 
@@ -176,7 +177,7 @@ const DynamicProjectPaymentPage = ({ params }) => {
       
       // Add screenshot if exists
       if (paymentScreenshot) {
-        submitData.append('payment_screenshot', paymentScreenshot);
+        await appendUpload(submitData, 'payment_screenshot', paymentScreenshot, 'payment_screenshot');
       }
 
       console.log('Submitting enrollment...');
@@ -712,14 +712,19 @@ const DynamicProjectsPage = () => {
                 >
                   {/* Project Image */}
                   <div className="relative w-full h-48 overflow-hidden bg-gradient-to-br from-purple-500 to-blue-600">
-                    <img 
-                      src={getImageUrl(project.image_url)} 
-                      alt={project.title}
-                      className="w-full h-full object-cover transition-transform duration-300 group-hover:scale-105"
-                      onError={(e) => {
-                        e.target.style.display = 'none';
-                      }}
-                    />
+                    <picture>
+                      <source type="image/webp" srcSet={project.image_srcset?.webp} sizes="(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw" />
+                      <img 
+                        src={getImageUrl(project.image_url)}
+                        srcSet={project.image_srcset?.jpeg}
+                        sizes="(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw"
+                        alt={project.title}
+                        className="w-full h-full object-cover transition-transform duration-300 group-hover:scale-105"
+                        onError={(e) => {
+                          e.target.style.display = 'none';
+                        }}
+                      />
+                    </picture>
                     
                     <div className="absolute inset-0 bg-black/20"></div>
                     <div className="absolute top-4 left-4">
@@ -364,15 +364,20 @@ const DynamicCoursesPage = () => {
               <div key={course.id} className="bg-white rounded-2xl shadow-lg hover:shadow-2xl transition-all duration-300 transform hover:-translate-y-2 overflow-hidden group cursor-pointer" onClick={() => handleCourseClick(course.slug)} >
                 {/* Course Image */}
                 <div className="relative w-full h-48 overflow-hidden bg-gradient-to-br from-blue-500 to-purple-600">
-                  <img 
-                    src={getImageUrl(course.image_url)} 
-                    alt={course.title}
-                    className="w-full h-full object-cover transition-transform duration-300 group-hover:scale-105"
-                    onError={(e) => {
-                      // Hide broken image and show gradient background
-                      e.target.style.display = 'none';
-                    }}
-                  />
+                  <picture>
+                    <source type="image/webp" srcSet={course.image_srcset?.webp} sizes="(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw" />
+                    <img 
+                      src={getImageUrl(course.image_url)}
+                      srcSet={course.image_srcset?.jpeg}
+                      sizes="(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw"
+                      alt={course.title}
+                      className="w-full h-full object-cover transition-transform duration-300 group-hover:scale-105"
+                      onError={(e) => {
+                        // Hide broken image and show gradient background
+                        e.target.style.display = 'none';
+                      }}
+                    />
+                  </picture>
                   
                   {/* Overlay content */}
                   <div className="absolute inset-0 bg-black/20"></div>
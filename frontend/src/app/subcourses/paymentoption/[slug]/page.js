@@ -3,6 +3,7 @@
   import React, { useState, useEffect, use } from 'react';
   import { ChevronDown, Check, CreditCard, Smartphone, Zap, ArrowLeft, Star, Clock, Users, Book, AlertCircle, Upload, X } from 'lucide-react';
   import Layout from '@/components/Layout';
+  import { appendUpload } from '@/lib/directUpload';
 
   const DynamicPaymentPage = ({ params }) => {
     const unwrappedParams = use(params);
@@ -226,7 +227,7 @@
         
         // NEW: Append payment screenshot if available
         if (paymentScreenshot) {
-          formDataToSend.append('payment_screenshot', paymentScreenshot);
+          await appendUpload(formDataToSend, 'payment_screenshot', paymentScreenshot, 'payment_screenshot');
         }
 
         const response = await fetch('http://localhost:7000/api/payments', {
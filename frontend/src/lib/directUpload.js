@@ -0,0 +1,47 @@
+// frontend/src/lib/directUpload.js
+// Sends a resume / payment screenshot straight to file storage and adds the
+// returned token to the form, so the bytes do not go through the API server.
+// Falls back to appending the file itself if the direct upload fails.
+
+const API_BASE_URL = 'http://localhost:7000';
+
+const sha256Hex = async (file) => {
+  const digest = await crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+  return Array.from(new Uint8Array(digest))
+    .map((byte) => byte.toString(16).padStart(2, '0'))
+    .join('');
+};
+
+export const appendUpload = async (formData, field, file, kind) => {
+  try {
+    const presignResponse = await fetch(`${API_BASE_URL}/api/uploads/presign`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        kind,
+        filename: file.name,
+        size: file.size,
+        sha256: await sha256Hex(file),
+      }),
+    });
+    const presign = await presignResponse.json();
+    if (!presignResponse.ok) {
+      throw new Error(presign.error || 'Presign failed');
+    }
+
+    const { method, url, headers } = presign.upload;
+    const uploadResponse = await fetch(url.startsWith('/') ? `${API_BASE_URL}${url}` : url, {
+      method,
+      headers,
+      body: file,
+    });
+    if (!uploadResponse.ok) {
+      throw new Error(`Upload failed with status ${uploadResponse.status}`);
+    }
+
+    formData.append(`${field}_token`, presign.token);
+  } catch (err) {
+    console.warn('Direct upload failed, sending the file with the form:', err);
+    formData.append(field, file);
+  }
+};